@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import torch
 import matplotlib.pyplot as plt
@@ -18,14 +19,46 @@ set_seed(42)
 
 from huggingface_hub import login
 import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Mapping, Optional, Tuple, Union
 
-login(token=HUGGING_FACE_TOKEN)
+_hf_logged_in = False
+_hf_login_lock = threading.Lock()
+
+
+def _hf_login() -> None:
+    """Log in to the Hugging Face Hub once, when the first forecaster is built."""
+    global _hf_logged_in
+    with _hf_login_lock:
+        if not _hf_logged_in:
+            login(token=HUGGING_FACE_TOKEN)
+            _hf_logged_in = True
+
+# Forecast frames kept per forecaster, keyed on (ledger version, context_length, horizon)
+FORECAST_CACHE_SIZE = int(os.getenv("FINNY_FORECAST_CACHE_SIZE", "16"))
+# Tenants per PatchTST forward pass in forecast_many
+FORECAST_BATCH_SIZE = int(os.getenv("FINNY_FORECAST_BATCH_SIZE", "64"))
+# Intra-op threads for CPU inference; unset leaves torch's default
+FORECAST_THREADS = os.getenv("FINNY_FORECAST_THREADS")
+if FORECAST_THREADS:
+    torch.set_num_threads(int(FORECAST_THREADS))
+
+
+def summarize_forecast(forecast_df: pd.DataFrame) -> dict:
+    return {
+        "min": round(forecast_df['yhat'].min(), 2),
+        "max": round(forecast_df['yhat'].max(), 2),
+        "mean": round(forecast_df['yhat'].mean(), 2),
+        "neg": int((forecast_df['yhat'] < 0).sum())
+    }
 
 
 class CashFlowForecaster:
     def __init__(self, context_length: int = 128, forecast_length: int = 30):
         self.context_length = context_length
         self.forecast_length = forecast_length
+        _hf_login()
 
         # ✅ Load pretrained IBM PatchTSMixer model (CPU only)
         self.config = PatchTSTConfig(
@@ -50,20 +83,38 @@ class CashFlowForecaster:
         )
 
         self.model = PatchTSTForPrediction(config=self.config)
+        self.model.eval()
+
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[Hashable, Tuple[pd.DataFrame, dict]]" = OrderedDict()
+        # Fitted preprocessor for the most recent context window
+        self._fitted_key: Optional[Tuple] = None
+        self._fitted_tsp = None
+        self.model_calls = 0
 
-    def forecast(self, raw_df: pd.DataFrame, days: int = 30) -> pd.DataFrame:
-        df = raw_df[['Date', 'Credit', 'Debit']].copy()
-        df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%y', errors='coerce')
-        df = df.dropna(subset=['Date'])
-        df['cashflow'] = pd.to_numeric(df['Credit'], errors='coerce').fillna(0) - pd.to_numeric(df['Debit'], errors='coerce').fillna(0)
-        df = df.groupby('Date').agg({'cashflow': 'sum'}).reset_index().rename(columns={'Date': 'date'})
-        df = df.sort_values('date')
+    def _daily_cashflow(self, raw_df: pd.DataFrame, require_full_context: bool = True) -> pd.DataFrame:
+        if 'cashflow' in raw_df.columns:
+            # Already one row per day (LedgerRepository.daily_cashflow), no regrouping needed
+            df = raw_df[['date', 'cashflow']].dropna(subset=['date']).sort_values('date')
+        else:
+            df = raw_df[['Date', 'Credit', 'Debit']].copy()
+            df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%y', errors='coerce')
+            df = df.dropna(subset=['Date'])
+            df['cashflow'] = pd.to_numeric(df['Credit'], errors='coerce').fillna(0) - pd.to_numeric(df['Debit'], errors='coerce').fillna(0)
+            df = df.groupby('Date').agg({'cashflow': 'sum'}).reset_index().rename(columns={'Date': 'date'})
+            df = df.sort_values('date')
         df['cashflow'] = df['cashflow'].interpolate()
 
-        if len(df) < self.context_length:
+        if require_full_context and len(df) < self.context_length:
             raise ValueError(f"Need ≥{self.context_length} days; got {len(df)}.")
 
-        context = df.iloc[-self.context_length:].copy()
+        return df.iloc[-self.context_length:].copy()
+
+    def _fitted_preprocessor(self, context: pd.DataFrame, days: int):
+        """Train the scaler only when the context window (or horizon) actually changed."""
+        key = (days, int(pd.util.hash_pandas_object(context, index=False).sum()))
+        if key == self._fitted_key:
+            return self._fitted_tsp
 
         # ✅ Use IBM TimeSeriesPreprocessor
         tsp = TimeSeriesPreprocessor(
@@ -77,13 +128,56 @@ class CashFlowForecaster:
             scaler_type="standard"
         )
         tsp.train(context)
+        self._fitted_key, self._fitted_tsp = key, tsp
+        return tsp
+
+    def forecast(self, raw_df: pd.DataFrame, days: int = 30, version: Optional[Hashable] = None) -> pd.DataFrame:
+        """
+        Forecast daily cashflow from a transactions frame (Date/Credit/Debit)
+        or an already-daily one (date/cashflow, e.g. LedgerRepository.daily_cashflow).
+        Pass the ledger ``version`` the data came from to reuse an earlier
+        result for the same ledger and horizon. Cached results are also keyed
+        on a hash of ``raw_df``, since a bare version counter can repeat
+        across ledgers or after a ledger is recreated.
+        """
+        return self.forecast_with_summary(raw_df, days, version)[0]
+
+    def forecast_with_summary(self, raw_df: pd.DataFrame, days: int = 30,
+                              version: Optional[Hashable] = None) -> Tuple[pd.DataFrame, dict]:
+        """Forecast frame and its summary statistics from a single model pass."""
+        key = None
+        if version is not None:
+            data_hash = int(pd.util.hash_pandas_object(raw_df, index=False).sum())
+            key = (version, data_hash, self.context_length, days)
+        with self._lock:
+            if key is not None and key in self._results:
+                self._results.move_to_end(key)
+                forecast_df, summary = self._results[key]
+                return forecast_df.copy(), dict(summary)
+
+            forecast_df = self._run_model(raw_df, days)
+            summary = summarize_forecast(forecast_df)
+            if key is not None:
+                self._results[key] = (forecast_df, summary)
+                while len(self._results) > FORECAST_CACHE_SIZE:
+                    self._results.popitem(last=False)
+        return forecast_df.copy(), dict(summary)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._fitted_key = self._fitted_tsp = None
+
+    def _run_model(self, raw_df: pd.DataFrame, days: int) -> pd.DataFrame:
+        context = self._daily_cashflow(raw_df)
+        tsp = self._fitted_preprocessor(context, days)
         proc = tsp.preprocess(context)
 
         tensor = torch.tensor(proc["cashflow"].values.reshape(1, -1, 1), dtype=torch.float32).to("cpu")
 
-        self.model.eval()
         with torch.no_grad():
             output = self.model(past_values=tensor).prediction_outputs.cpu()
+        self.model_calls += 1
 
         scaler = tsp.target_scaler_dict["0"]
         yhat_real = scaler.inverse_transform(output.squeeze().numpy().reshape(-1, 1)).flatten()
@@ -96,15 +190,93 @@ class CashFlowForecaster:
 
         return df
 
-    def forecast_summary(self, raw_df: pd.DataFrame, days: int = 30) -> dict:
-        df = self.forecast(raw_df, days)
-        summary = {
-            "min": round(df['yhat'].min(), 2),
-            "max": round(df['yhat'].max(), 2),
-            "mean": round(df['yhat'].mean(), 2),
-            "neg": int((df['yhat'] < 0).sum())
+    def forecast_summary(self, raw_df: pd.DataFrame, days: int = 30, version: Optional[Hashable] = None) -> dict:
+        return self.forecast_with_summary(raw_df, days, version)[1]
+
+    def _align_context(self, series: pd.Series) -> Tuple[np.ndarray, np.ndarray, pd.Timestamp]:
+        """Last context_length points of a daily series, left-padded, with its observed mask."""
+        series = series.sort_index()
+        series.index = pd.to_datetime(series.index)
+        values = pd.to_numeric(series, errors='coerce').interpolate().fillna(0.0).to_numpy(dtype=np.float64)
+        values = values[-self.context_length:]
+
+        padded = np.zeros(self.context_length, dtype=np.float64)
+        observed = np.zeros(self.context_length, dtype=np.float64)
+        if len(values):
+            padded[-len(values):] = values
+            observed[-len(values):] = 1.0
+        return padded, observed, series.index[-1]
+
+    def forecast_many(self, tenant_series: Mapping[Hashable, Union[pd.Series, pd.DataFrame]],
+                      days: int = 30, batch_size: int = FORECAST_BATCH_SIZE) -> Dict[Hashable, pd.DataFrame]:
+        """
+        Forecast many tenants in batched forward passes.
+
+        ``tenant_series`` maps tenant → daily cashflow, either a Series indexed
+        by date, a date/cashflow frame, or a transactions frame with
+        Date/Credit/Debit columns. Short
+        histories are left-padded and masked out via past_observed_mask.
+        Each tenant is standard-scaled on its own context window, matching
+        the single-tenant TimeSeriesPreprocessor path.
+        """
+        horizon = min(days, self.config.prediction_length)
+        tenants, contexts, masks, last_dates = [], [], [], []
+        for tenant, data in tenant_series.items():
+            if isinstance(data, pd.DataFrame):
+                daily = self._daily_cashflow(data, require_full_context=False)
+                data = daily.set_index('date')['cashflow']
+            if data is None or len(data) == 0:
+                print(f"⚠️ No cashflow history for tenant {tenant}; skipping.")
+                continue
+            values, observed, last_date = self._align_context(data)
+            tenants.append(tenant)
+            contexts.append(values)
+            masks.append(observed)
+            last_dates.append(last_date)
+
+        if not tenants:
+            return {}
+
+        contexts = np.stack(contexts)
+        masks = np.stack(masks)
+        counts = np.maximum(masks.sum(axis=1, keepdims=True), 1.0)
+        means = (contexts * masks).sum(axis=1, keepdims=True) / counts
+        stds = np.sqrt((((contexts - means) * masks) ** 2).sum(axis=1, keepdims=True) / counts)
+        stds[stds == 0] = 1.0
+        scaled = (contexts - means) / stds * masks
+
+        predictions = np.empty((len(tenants), horizon), dtype=np.float64)
+        with torch.inference_mode():
+            for start in range(0, len(tenants), max(1, batch_size)):
+                stop = start + max(1, batch_size)
+                past_values = torch.from_numpy(scaled[start:stop, :, None].astype(np.float32))
+                past_mask = torch.from_numpy(masks[start:stop, :, None].astype(np.float32))
+                output = self.model(past_values=past_values, past_observed_mask=past_mask).prediction_outputs
+                predictions[start:stop] = output[:, :horizon, 0].cpu().numpy()
+                self.model_calls += 1
+
+        predictions = predictions * stds + means
+        return {
+            tenant: pd.DataFrame({
+                "ds": pd.date_range(last_date + pd.Timedelta(days=1), periods=horizon),
+                "yhat": predictions[i],
+            })
+            for i, (tenant, last_date) in enumerate(zip(tenants, last_dates))
         }
-        return summary
+
+
+_forecaster: Optional[CashFlowForecaster] = None
+_forecaster_lock = threading.Lock()
+
+
+def get_cash_flow_forecaster() -> CashFlowForecaster:
+    """Get the process-wide CashFlowForecaster (and its forecast cache)."""
+    global _forecaster
+    if _forecaster is None:
+        with _forecaster_lock:
+            if _forecaster is None:
+                _forecaster = CashFlowForecaster()
+    return _forecaster
 
 
 class ForecastExplainer:
@@ -112,14 +284,9 @@ class ForecastExplainer:
         self.granite_client = granite_client
 
     def explain_forecast(self, forecast_df: pd.DataFrame, horizon_days: int = 30) -> str:
-        df = forecast_df.tail(horizon_days)
+        df = forecast_df.tail(horizon_days).copy()
         df['ds'] = df['ds'].dt.strftime('%b %d')
-        summary = {
-            "min": round(df['yhat'].min(), 2),
-            "max": round(df['yhat'].max(), 2),
-            "mean": round(df['yhat'].mean(), 2),
-            "neg": int((df['yhat'] < 0).sum())
-        }
+        summary = summarize_forecast(df)
         prompt = (
             f"Forecast for next {horizon_days} days:\n{df.to_string(index=False)}\n\n"
             f"Summary:\n- Min: ${summary['min']}\n- Max: ${summary['max']}\n"
@@ -5,9 +5,10 @@ from utils.granite import summarize_with_granite
 import json
 import streamlit as st
 from dash_modules.analytics.run_smb_analysis import run_smb_analysis
-from cashflow_forecasting.forecasting_engine import CashFlowForecaster, ForecastExplainer
+from cashflow_forecasting.forecasting_engine import ForecastExplainer, get_cash_flow_forecaster
 from granite.client import GraniteAPI
 from utils.business_profile import load_profile, save_profile, needs_profile_info
+from ledger.ledger_repository import get_ledger_repository
 
 LEDGER_PATH = Path("ledger/ledger.json")
 
@@ -15,39 +16,11 @@ def get_top_customers_and_expenses():
     if not LEDGER_PATH.exists():
         return [], []
 
-    with open(LEDGER_PATH) as f:
-        raw = json.load(f)
+    repo = get_ledger_repository(LEDGER_PATH)
 
-    df = pd.DataFrame(raw["history"])
-
-    if df.empty:
-        return [], []
-
-    df.columns = df.columns.str.lower()
-    df["type"] = df["type"].replace({"credit": "income", "debit": "expense"})
-    df["source"] = df["desc"].fillna("Unknown")
-
-    # Top 3 customers (by income)
-    top_customers = (
-        df[df["type"] == "income"]
-        .groupby("source")["amount"]
-        .sum()
-        .sort_values(ascending=False)
-        .head(3)
-        .reset_index()
-        .to_dict(orient="records")
-    )
-
-    # Top 3 expenses (by source)
-    top_expenses = (
-        df[df["type"] == "expense"]
-        .groupby("source")["amount"]
-        .sum()
-        .sort_values(ascending=False)
-        .head(3)
-        .reset_index()
-        .to_dict(orient="records")
-    )
+    # Top 3 customers (by income) and expenses (by source), from the per-counterparty rollup
+    top_customers = repo.top_counterparties("income", 3)
+    top_expenses = repo.top_counterparties("expense", 3)
 
     return top_customers, top_expenses
 
@@ -100,30 +73,13 @@ def render_analysis():
     st.markdown("---")
     st.subheader("📉 Cash Flow Forecast")
 
-    # Forecast Section
-    with open(LEDGER_PATH) as f:
-        raw = json.load(f)
-
-    df = pd.DataFrame(raw["history"])
-    df.columns = df.columns.str.lower()
-
-    # Filter only credit and debit
-    df = df[df["type"].isin(["credit", "debit"])]
-
-    # Parse date and clean
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df = df.dropna(subset=["date"])
-
-    # Convert to 'Credit' and 'Debit' format expected by forecaster
-    df["credit"] = df.apply(lambda row: row["amount"] if row["type"] == "credit" else 0, axis=1)
-    df["debit"] = df.apply(lambda row: row["amount"] if row["type"] == "debit" else 0, axis=1)
-
-    # Rename for forecaster
-    df = df.rename(columns={"date": "Date", "credit": "Credit", "debit": "Debit"})
+    # Forecast Section: daily net cashflow comes pre-aggregated from the ledger's rollup
+    repo = get_ledger_repository(LEDGER_PATH)
+    daily = repo.daily_cashflow()
 
     # Run forecast
-    forecaster = CashFlowForecaster()
-    forecast_df = forecaster.forecast(df, days=30)
+    forecaster = get_cash_flow_forecaster()
+    forecast_df = forecaster.forecast(daily, days=30, version=repo.version)
 
     # Streamlit plot
     st.line_chart(forecast_df.set_index("ds")["yhat"])
@@ -1,7 +1,7 @@
 from dash_modules.analytics.smb_health_analyzer import SMBFinancialHealthAnalyzer
-import json
 import pandas as pd
 from pathlib import Path
+from ledger.ledger_repository import get_ledger_repository, with_income_expense_types
 
 LEDGER_PATH = Path("ledger/ledger.json")
 
@@ -9,29 +9,34 @@ LEDGER_PATH = Path("ledger/ledger.json")
 def load_ledger():
     if not LEDGER_PATH.exists():
         return pd.DataFrame()
-    with open(LEDGER_PATH) as f:
-        raw = json.load(f)
-    data = raw.get("history", [])
-    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
-        raise ValueError("Invalid ledger format. Expected list of dicts under 'history'.")
-    df = pd.DataFrame(data)
-    df.columns = df.columns.str.lower()
-    df["type"] = df["type"].replace({"credit": "income", "debit": "expense"})
-    return df
-
-
-def derive_metrics(df):
-    total_income = df[df["type"] == "income"]["amount"].sum()
-    total_expense = df[df["type"] == "expense"]["amount"].sum()
+    df = get_ledger_repository(LEDGER_PATH).frame()
+    return with_income_expense_types(df)
+
+
+def derive_metrics(df=None):
+    """
+    Revenue, margin and runway. Without ``df`` they come from the ledger's
+    maintained rollups; pass a frame from load_ledger() to compute from it.
+    """
+    if df is None:
+        repo = get_ledger_repository(LEDGER_PATH)
+        totals = repo.income_expense_totals()
+        total_income, total_expense = totals["income"], totals["expense"]
+        monthly = repo.monthly_income_expense()
+        monthly_expense = monthly.loc[monthly["expense"] != 0, "expense"].mean()
+    else:
+        total_income = df[df["type"] == "income"]["amount"].sum()
+        total_expense = df[df["type"] == "expense"]["amount"].sum()
+        expenses = df[df["type"] == "expense"]
+        monthly_expense = expenses.groupby(
+            pd.to_datetime(expenses["date"], errors="coerce").dt.to_period("M")
+        )["amount"].sum().mean()
+
     net_profit = total_income - total_expense
     net_profit_margin = net_profit / total_income if total_income > 0 else 0
 
-    monthly_expense = df[df["type"] == "expense"].groupby(
-        df["date"].apply(lambda x: pd.to_datetime(x).to_period("M"))
-    ).sum()["amount"].mean()
-
     ending_cash = total_income - total_expense
-    cash_runway = ending_cash / monthly_expense if monthly_expense else 0
+    cash_runway = ending_cash / monthly_expense if monthly_expense and pd.notna(monthly_expense) else 0
 
     return {
         "annual_revenue": total_income,
@@ -42,8 +47,7 @@ def derive_metrics(df):
 
 def run_smb_analysis(user_inputs):
     analyzer = SMBFinancialHealthAnalyzer()
-    df = load_ledger()
-    derived = derive_metrics(df)
+    derived = derive_metrics()
 
     company_profile = {
         "name": user_inputs["name"],
@@ -1,10 +1,10 @@
 # smb_health_analyzer_enhanced.py
-from dash_modules.analytics.smb_rag import SMBBenchmarkRAG
+from dash_modules.analytics.smb_rag import get_smb_benchmark_rag
 from utils.granite import summarize_with_granite
 
 class SMBFinancialHealthAnalyzer:
     def __init__(self):
-        self.smb_benchmarks_rag = SMBBenchmarkRAG()
+        self.smb_benchmarks_rag = get_smb_benchmark_rag()
     
     def calculate_smb_health_score(self, company_profile):
         """Main method to calculate SMB health score"""
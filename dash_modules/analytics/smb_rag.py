@@ -1,6 +1,7 @@
 # smb_rag.py
 
 import json
+import threading
 from typing import Dict, Any
 
 from langchain_ibm import WatsonxEmbeddings
@@ -49,3 +50,16 @@ class SMBBenchmarkRAG:
             print(f"⚠️ Query error: {e}")
             return []
 
+
+_smb_rag = None
+_smb_rag_lock = threading.Lock()
+
+
+def get_smb_benchmark_rag() -> SMBBenchmarkRAG:
+    """Get the process-wide SMBBenchmarkRAG (its Chroma store opens once)."""
+    global _smb_rag
+    if _smb_rag is None:
+        with _smb_rag_lock:
+            if _smb_rag is None:
+                _smb_rag = SMBBenchmarkRAG()
+    return _smb_rag
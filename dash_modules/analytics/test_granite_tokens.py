@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import utils.granite as granite
+from utils.granite import IAMTokenManager
+
+
+class _IAMStubHandler(BaseHTTPRequestHandler):
+    # Shared state, reset by the fixture
+    token_posts = 0
+    generation_posts = 0
+    expires_in = 3600
+    revoked = set()  # Tokens the generation endpoint answers with 401
+    lock = threading.Lock()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        cls = type(self)
+        if self.path.startswith("/identity/token"):
+            with cls.lock:
+                cls.token_posts += 1
+                token = f"tok-{cls.token_posts}"
+            self._reply(200, {"access_token": token, "expires_in": cls.expires_in})
+        elif self.path.startswith("/ml/v1/text/generation"):
+            with cls.lock:
+                cls.generation_posts += 1
+            token = self.headers.get("Authorization", "").replace("Bearer ", "")
+            if token in cls.revoked:
+                self._reply(401, {"errors": [{"code": "authentication_token_expired"}]})
+            else:
+                self._reply(200, {"results": [{"generated_text": f"ok with {token}"}]})
+        else:
+            self._reply(404, {})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def iam_stub(monkeypatch):
+    handler = _IAMStubHandler
+    handler.token_posts, handler.generation_posts, handler.expires_in = 0, 0, 3600
+    handler.revoked = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    monkeypatch.setattr(granite, "ML_API_BASE", base)
+    managers = []
+
+    def install(**kwargs):
+        manager = IAMTokenManager("test-key", token_url=f"{base}/identity/token", **kwargs)
+        monkeypatch.setattr(granite, "_token_manager", manager)
+        managers.append(manager)
+        return manager
+
+    yield handler, install
+    for manager in managers:
+        manager.stop()
+    server.shutdown()
+    server.server_close()
+
+
+def test_many_calls_share_one_token(iam_stub):
+    handler, install = iam_stub
+    manager = install()
+
+    for i in range(20):
+        assert granite.summarize_with_granite(f"prompt {i}", use_cache=False) == "ok with tok-1"
+
+    assert handler.generation_posts == 20
+    assert handler.token_posts == 1
+    assert manager.token_requests == 1
+
+
+def test_concurrent_first_calls_fetch_one_token(iam_stub):
+    handler, install = iam_stub
+    install()
+
+    threads = [threading.Thread(target=granite.summarize_with_granite, args=(f"prompt {i}",),
+                                kwargs={"use_cache": False}) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert handler.generation_posts == 8
+    assert handler.token_posts == 1
+
+
+def test_token_near_expiry_refreshes_in_background(iam_stub):
+    handler, install = iam_stub
+    # Expires in 2s with a 1s margin: the timer refreshes after about 1s
+    handler.expires_in = 2
+    manager = install(refresh_margin=1)
+
+    assert manager.get_token() == "tok-1"
+    deadline = time.time() + 5
+    while handler.token_posts < 2 and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert handler.token_posts == 2
+    # The refreshed token is already cached; the caller doesn't wait on IAM
+    assert manager._is_fresh()
+    assert manager.get_token() == "tok-2"
+    assert handler.token_posts == 2
+
+
+def test_401_invalidates_and_retries_once(iam_stub):
+    handler, install = iam_stub
+    manager = install(background_refresh=False)
+    assert manager.get_token() == "tok-1"
+    handler.revoked.add("tok-1")
+
+    assert granite.summarize_with_granite("after revoke", use_cache=False) == "ok with tok-2"
+    assert handler.token_posts == 2
+    assert handler.generation_posts == 2  # The rejected call plus its retry
@@ -0,0 +1,122 @@
+import pandas as pd
+import pytest
+
+import utils.intent_router as intent_router
+from utils.intent_classifier import IntentClassifier
+from utils.intent_router import GraniteEnhancedRouter, IntentRouter
+
+# Calibration set for INTENT_CLASSIFIER_MIN_SCORE / _MARGIN: the classifier may abstain on a
+# labelled message but must not mislabel it, and must abstain on every unrelated one
+LABELLED = [
+    ("can I get a bank loan", "loan_help"),
+    ("what interest rate would i get", "loan_help"),
+    ("need financing for new equipment", "loan_help"),
+    ("how much tax do I owe", "tax_help"),
+    ("when is my tax filing due", "tax_help"),
+    ("what deductions can i claim", "tax_help"),
+    ("how healthy is my business", "financial_score"),
+    ("what will my cash look like next month", "forecast_cashflow"),
+    ("project my cashflow", "forecast_cashflow"),
+    ("why is my cash going down", "forecast_explainer"),
+    ("explain the forecast", "forecast_explainer"),
+    ("what if i hire two more people", "simulate_scenario"),
+    ("here is my invoice", "invoice_upload"),
+    ("i want to upload a receipt", "invoice_upload"),
+    ("show me the report", "dashboard_view"),
+    ("give me an overview", "dashboard_view"),
+]
+UNRELATED = [
+    "can you lend me some cash", "hello", "what's the weather today", "tell me a joke",
+    "who won the game last night", "thanks", "good morning", "where is the nearest coffee shop",
+    "play some music", "what time is it", "book a flight to paris", "send me a recipe",
+]
+
+
+class _StubBot:
+    transactions = pd.DataFrame({"Amount": []})
+
+    def __init__(self, granite_client=None):
+        self.granite_client = granite_client
+
+    def __getattr__(self, name):
+        # loan_advice, score_financials, forecast_summary, ... are only referenced, never called
+        return lambda *args, **kwargs: name
+
+
+class _FakeGranite:
+    def __init__(self, intent):
+        self.intent = intent
+        self.calls = 0
+
+    def generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        return f'{{"intent": "{self.intent}", "reason": "stub"}}'
+
+
+def _original_scores(patterns, text):
+    # IntentRouter.route_intent's keyword loop before KeywordMatcher
+    scores = {}
+    for intent_name, cfg in patterns.items():
+        score = 0
+        for kw in cfg["keywords"]:
+            if kw in text:
+                score += cfg["weight"]
+                if len(kw.split()) > 1:
+                    score += 2
+        if score:
+            scores[intent_name] = score
+    return scores
+
+
+@pytest.fixture(autouse=True)
+def profile(monkeypatch):
+    monkeypatch.setattr(intent_router, "load_profile", lambda: {"country": "india"})
+
+
+@pytest.fixture
+def router():
+    granite = _FakeGranite("loan_help")
+    router = GraniteEnhancedRouter(_StubBot(granite), granite_endpoint="http://granite.test", api_key="key")
+    router.classifier.log_path = None
+    return router, granite
+
+
+@pytest.mark.parametrize("text", [
+    "what can you do", "i need a loan to manage cash flow", "credit card interest rate",
+    "what if i cut my rent", "upload this invoice and show the dashboard summary",
+    "why is my forecast trend down", "help", "nothing relevant here",
+] + [text for text, _ in LABELLED] + UNRELATED)
+def test_keyword_scores_match_original_loop(text):
+    router = IntentRouter(_StubBot())
+    assert router.keyword_matcher.scores(text) == _original_scores(router.route_patterns, text)
+
+
+def test_classifier_is_calibrated():
+    classifier = IntentClassifier(log_path=None).fit(IntentRouter(_StubBot()).route_patterns)
+
+    for text in UNRELATED:
+        assert classifier.predict(text) is None, text
+    answered = [(text, classifier.predict(text), label) for text, label in LABELLED]
+    assert [(text, label) for text, predicted, label in answered if predicted and predicted[0] != label] == []
+    assert sum(predicted is not None for _, predicted, _ in answered) >= len(LABELLED) // 2
+
+
+def test_memo_hit_skips_granite(router):
+    router, granite = router
+
+    first = router.route_intent("can you lend me some cash")
+    again = router.route_intent("Can you lend me some cash?")
+
+    assert first.intent_type == again.intent_type == "loan_help"
+    assert granite.calls == 1
+    assert router.memo.stats()["hits"] == 1
+
+
+def test_classifier_answers_are_not_memoized(router):
+    router, granite = router
+
+    for _ in range(2):
+        assert router.route_intent("how much tax do I owe").intent_type == "tax_help"
+
+    assert granite.calls == 0
+    assert router.memo.stats()["entries"] == 0
@@ -0,0 +1,112 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.media_fetcher import MediaFetchError, MediaFetcher, MediaTooLarge, UnexpectedMediaType
+
+PDF_BODY = b"%PDF-1.4\n" + b"0" * 4096
+CSV_BODY = b"Date,Description,Amount\n2024-01-01,Coffee,-3.50\n"
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    # path -> list of (status, body, send Content-Length) served in order; the last one repeats
+    routes = {}
+    hits = {}
+
+    def do_GET(self):
+        responses = self.routes[self.path]
+        count = self.hits.get(self.path, 0)
+        self.hits[self.path] = count + 1
+        status, body, with_length = responses[min(count, len(responses) - 1)]
+
+        self.send_response(status)
+        if with_length:
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            # No declared size: the body runs until the connection closes
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def media_server():
+    _MediaHandler.routes, _MediaHandler.hits = {}, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", _MediaHandler
+    server.shutdown()
+    server.server_close()
+
+
+def _leftovers(directory):
+    return sorted(p.name for p in directory.iterdir() if p.name.endswith(".part"))
+
+
+def test_retries_503_then_succeeds(media_server, tmp_path):
+    base, handler = media_server
+    handler.routes["/invoice"] = [(503, b"busy", True), (503, b"busy", True), (200, PDF_BODY, True)]
+
+    media = MediaFetcher(retries=3, backoff=0).fetch_to_file(f"{base}/invoice", tmp_path / "invoice.pdf",
+                                                             expect={"pdf"})
+
+    assert handler.hits["/invoice"] == 3
+    assert media["kind"] == "pdf"
+    assert media["size"] == len(PDF_BODY)
+    assert (tmp_path / "invoice.pdf").read_bytes() == PDF_BODY
+    assert _leftovers(tmp_path) == []
+
+
+def test_gives_up_after_retries(media_server, tmp_path):
+    base, handler = media_server
+    handler.routes["/down"] = [(503, b"busy", True)]
+
+    with pytest.raises(MediaFetchError):
+        MediaFetcher(retries=2, backoff=0).fetch_to_file(f"{base}/down", tmp_path / "down.pdf")
+
+    assert handler.hits["/down"] == 3
+    assert not (tmp_path / "down.pdf").exists()
+    assert _leftovers(tmp_path) == []
+
+
+@pytest.mark.parametrize("with_length", [True, False])
+def test_aborts_oversize_download(media_server, tmp_path, with_length):
+    base, handler = media_server
+    handler.routes["/big"] = [(200, PDF_BODY * 64, with_length)]
+
+    with pytest.raises(MediaTooLarge):
+        MediaFetcher(retries=0, max_bytes=16 * 1024).fetch_to_file(f"{base}/big", tmp_path / "big.pdf")
+
+    assert not (tmp_path / "big.pdf").exists()
+    assert _leftovers(tmp_path) == []
+
+
+def test_rejects_unexpected_type(media_server, tmp_path):
+    base, handler = media_server
+    handler.routes["/statement"] = [(200, CSV_BODY, True)]
+
+    with pytest.raises(UnexpectedMediaType):
+        MediaFetcher(retries=0).fetch_to_file(f"{base}/statement", tmp_path / "statement.pdf", expect={"pdf"})
+
+    assert handler.hits["/statement"] == 1  # Not retried
+    assert not (tmp_path / "statement.pdf").exists()
+    assert _leftovers(tmp_path) == []
+
+
+def test_accepts_csv_in_any_encoding(media_server, tmp_path):
+    base, handler = media_server
+    handler.routes["/cp1252"] = [(200, "Date,Description\n2024-01-01,Café Crème Brûlée\n".encode("cp1252"), True)]
+    handler.routes["/utf16"] = [(200, CSV_BODY.decode().encode("utf-16"), True)]
+
+    fetcher = MediaFetcher(retries=0)
+    for name in ("cp1252", "utf16"):
+        media = fetcher.fetch_to_file(f"{base}/{name}", tmp_path / f"{name}.csv", expect={"text", "binary"})
+        assert media["kind"] in ("text", "binary")
+        assert (tmp_path / f"{name}.csv").exists()
+    assert _leftovers(tmp_path) == []
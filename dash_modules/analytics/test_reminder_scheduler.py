@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+import invoice_reminder.db as db
+import invoice_reminder.invoice_store as invoice_store
+from invoice_reminder.invoice_store import InvoiceStore
+from invoice_reminder.scheduler import ReminderScheduler
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = InvoiceStore(tmp_path / "invoices.db")
+    monkeypatch.setattr(invoice_store, "_store", store)
+    store.insert({
+        "user_id": "whatsapp:+15550001", "invoice_number": "INV-1", "due_date": "2025-07-01",
+        "status": "pending", "status_pending": True, "invoice_type": "pay",
+    })
+    yield store
+    store.close()
+
+
+def _run(scheduler, outbox, day):
+    scheduler.run_due(datetime.strptime(day, "%Y-%m-%d"), whole_day=True)
+    sent, outbox[:] = list(outbox), []
+    return sent
+
+
+def test_rescheduled_invoice_gets_reminders_for_new_date(store):
+    outbox = []
+    scheduler = ReminderScheduler(store=store, offsets=[7, 1, 0, -1], send=lambda user, msg: outbox.append(msg))
+
+    assert len(_run(scheduler, outbox, "2025-06-30")) == 1  # T-1 for the original date
+    assert store.get_by_number("INV-1")["reminders_sent"] == ["T-1", "T-7"]
+
+    assert db.update_due_date_by_id("INV-1", "2025-07-20", user_id="whatsapp:+15550001")
+    invoice = store.get_by_number("INV-1")
+    assert invoice["reminders_sent"] == [] and invoice["reminder_sent"] is False
+
+    assert _run(scheduler, outbox, "2025-07-01") == []
+    for day, expected in [("2025-07-13", "in 7 days"), ("2025-07-19", "Tomorrow"),
+                          ("2025-07-20", "TODAY"), ("2025-07-21", "1 day(s) overdue")]:
+        sent = _run(scheduler, outbox, day)
+        assert len(sent) == 1 and expected in sent[0], (day, sent)
+    assert store.get_by_number("INV-1")["reminders_sent"] == ["T-0", "T-1", "T-7", "overdue"]
+
+
+def test_other_updates_keep_reminder_labels(store):
+    invoice_id = store.reminder_candidates()[0][0]
+    store.mark_reminders_sent({invoice_id: ["T-7"]})
+
+    store.update_by_number("INV-1", {"amount": "120.00"})
+    assert store.get_by_number("INV-1")["reminders_sent"] == ["T-7"]
+
+    store.update_by_number("INV-1", {"due_date": "2025-07-01"})  # Same date
+    assert store.get_by_number("INV-1")["reminders_sent"] == ["T-7"]
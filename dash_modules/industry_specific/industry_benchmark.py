@@ -6,7 +6,6 @@ from utils.granite import summarize_with_granite
 from utils.business_profile import load_profile
 import plotly.express as px
 import plotly.graph_objects as go
-from dash_modules.analytics.run_smb_analysis import load_ledger
 from dash_modules.analytics.run_smb_analysis import derive_metrics
 
 def render_industry_benchmark():
@@ -124,8 +123,7 @@ def extract_company_metrics(business_profile):
     """Extract metrics from business profile to use for comparison"""
     # This would extract relevant metrics from your business profile
     # Adjust according to your actual data structure
-    df = load_ledger()
-    derived = derive_metrics(df)
+    derived = derive_metrics()
     metrics = {
         'revenue': derived["annual_revenue"],
         'employees': business_profile.get('employee_count', 0),
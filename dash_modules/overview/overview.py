@@ -6,6 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".
 import pandas as pd
 from pathlib import Path
 from utils.granite import summarize_with_granite
+from ledger.ledger_repository import get_ledger_repository
 
 LEDGER_PATH = Path("ledger/ledger.json")
 
@@ -13,23 +14,8 @@ def get_overview_metrics():
     if not LEDGER_PATH.exists():
         return 0, 0, 0, 0, 0, 0, 0, 0
 
-    import json
-    with open(LEDGER_PATH) as f:
-        raw = json.load(f)
-
-    df = pd.DataFrame(raw["history"])
-    df.columns = [col.lower() for col in df.columns]
-
-    if "date" not in df.columns:
-        raise ValueError("Missing 'date' column in ledger history")
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-
-    # Normalize types to match income/expense logic
-    df["type"] = df["type"].replace({"credit": "income", "debit": "expense"})
-    df["month"] = df["date"].dt.to_period("M").astype(str)
-
-    monthly = df.groupby(["month", "type"])["amount"].sum().unstack(fill_value=0).reset_index()
+    # Monthly income/expense straight from the ledger's rollup table
+    monthly = get_ledger_repository(LEDGER_PATH).monthly_income_expense()
     monthly["net_profit"] = monthly.get("income", 0) - monthly.get("expense", 0)
     monthly["tax"] = 0.25 * monthly["net_profit"]
 
@@ -78,21 +64,7 @@ def get_monthly_overview():
     if not LEDGER_PATH.exists():
         return pd.DataFrame()
 
-    import json
-    with open(LEDGER_PATH) as f:
-        raw = json.load(f)
-
-    df = pd.DataFrame(raw["history"])
-    df.columns = [col.lower() for col in df.columns]
-
-    if "date" not in df.columns:
-        raise ValueError("Missing 'date' column in ledger history")
-
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["type"] = df["type"].replace({"credit": "income", "debit": "expense"})
-    df["month"] = df["date"].dt.to_period("M").astype(str)
-
-    summary = df.groupby(["month", "type"])["amount"].sum().unstack(fill_value=0).reset_index()
+    summary = get_ledger_repository(LEDGER_PATH).monthly_income_expense()
     summary["net_profit"] = summary.get("income", 0) - summary.get("expense", 0)
     summary["tax_liability"] = 0.25 * summary["net_profit"]
     return summary
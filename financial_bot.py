@@ -1,21 +1,14 @@
 # ─── main.py ───────────────────────────────────────────────────────────────────
 
-import pandas as pd
+import threading
+import time
 
-from granite.client import GraniteAPI
-from granite.expense_categorizer import ExpenseCategorizer
-from granite.invoice_parser import InvoiceParser
-from granite.financial_scorer_granite import FinancialScorerGranite
+import pandas as pd
 
 #from utils.prophet_forecast import CashFlowForecaster
-from utils.tax_estimator import TaxEstimator
-from utils.vector_index import RAGLoanAdvisor
-from utils.financial_scorer_rules import FinancialScorerRules
-from cashflow_forecasting.forecasting_engine import CashFlowForecaster
-from cashflow_forecasting.forecasting_engine import ForecastExplainer
-from cashflow_forecasting.scenario_manager import apply_scenario
 from utils.business_profile import load_profile
-from dash_modules.analytics.run_smb_analysis import run_smb_analysis
+from ledger.ledger_repository import get_ledger_repository
+from ledger.ledger_utils import normalize_transactions
 
 print("✅ financial_bot.py loaded")
 
@@ -29,23 +22,102 @@ class FinancialBot:
     def __init__(self):
         print("✅ financial_bot.py loaded")
 
-        # Initialize Granite client
-        self.granite_client = GraniteAPI()
-
-        # Module instances
-        self.expense_categorizer    = ExpenseCategorizer(self.granite_client)
-        self.invoice_parser         = InvoiceParser(self.granite_client)
-        self.cash_flow_forecaster   = CashFlowForecaster()
-        self.tax_estimator          = TaxEstimator(self.granite_client)
-        self.loan_advisor           = RAGLoanAdvisor()
-        self.scorer_rules           = FinancialScorerRules()
-        self.scorer_granite         = FinancialScorerGranite(self.granite_client)
-        self.forecast_explainer = ForecastExplainer(self.granite_client)
-        
-
+        # Modules (Granite client, RAG advisors, PatchTST, ...) are built on
+        # first use by the accessors below, so importing the bot stays cheap
+        self._modules = {}
+        self._module_locks = {}
+        self._modules_lock = threading.Lock()
+        self.module_init_times = {}
 
         # Data container
         self.transactions = pd.DataFrame()
+        self.ledger_version = None
+        self._ledger_frame = None
+        self._ledger_path = None
+
+    # ─── Lazy module accessors ───────────────────
+
+    def _module(self, name: str, factory):
+        module = self._modules.get(name)
+        if module is None:
+            # One lock per module so independent modules can warm up in parallel
+            with self._modules_lock:
+                lock = self._module_locks.setdefault(name, threading.Lock())
+            with lock:
+                module = self._modules.get(name)
+                if module is None:
+                    start = time.perf_counter()
+                    module = factory()
+                    self.module_init_times[name] = round(time.perf_counter() - start, 3)
+                    self._modules[name] = module
+                    print(f"⚙️ {name} initialized in {self.module_init_times[name]}s")
+        return module
+
+    def is_initialized(self, name: str) -> bool:
+        return name in self._modules
+
+    @property
+    def granite_client(self):
+        def build():
+            from granite.client import GraniteAPI
+            return GraniteAPI()
+        return self._module("granite_client", build)
+
+    @property
+    def expense_categorizer(self):
+        def build():
+            from granite.expense_categorizer import ExpenseCategorizer
+            return ExpenseCategorizer(self.granite_client)
+        return self._module("expense_categorizer", build)
+
+    @property
+    def invoice_parser(self):
+        def build():
+            from granite.invoice_parser import InvoiceParser
+            return InvoiceParser(self.granite_client)
+        return self._module("invoice_parser", build)
+
+    @property
+    def cash_flow_forecaster(self):
+        def build():
+            from cashflow_forecasting.forecasting_engine import get_cash_flow_forecaster
+            return get_cash_flow_forecaster()
+        return self._module("cash_flow_forecaster", build)
+
+    @property
+    def tax_estimator(self):
+        def build():
+            from utils.tax_estimator import TaxEstimator
+            return TaxEstimator(self.granite_client)
+        return self._module("tax_estimator", build)
+
+    @property
+    def loan_advisor(self):
+        def build():
+            from utils.vector_index import RAGLoanAdvisor
+            return RAGLoanAdvisor()
+        return self._module("loan_advisor", build)
+
+    @property
+    def scorer_rules(self):
+        def build():
+            from utils.financial_scorer_rules import FinancialScorerRules
+            return FinancialScorerRules()
+        return self._module("scorer_rules", build)
+
+    @property
+    def scorer_granite(self):
+        def build():
+            from granite.financial_scorer_granite import FinancialScorerGranite
+            return FinancialScorerGranite(self.granite_client)
+        return self._module("scorer_granite", build)
+
+    @property
+    def forecast_explainer(self):
+        def build():
+            from cashflow_forecasting.forecasting_engine import ForecastExplainer
+            return ForecastExplainer(self.granite_client)
+        return self._module("forecast_explainer", build)
 
     def load_ledger_json(self, json_path: str) -> bool:
         """
@@ -65,35 +137,25 @@ class FinancialBot:
             }
         }
         """
-        import json
-        from pathlib import Path
-    
         try:
-            path = Path(json_path)
-            if not path.exists():
+            # SQLite is the source of truth; ledger.json is only a periodic snapshot of it
+            repo = get_ledger_repository(json_path)
+            if not repo.exists():
                 print(f"❌ File not found: {json_path}")
                 return False
     
-            with open(path, 'r') as f:
-                raw = json.load(f)
+            frame = repo.frame(copy=False)
+            if frame is self._ledger_frame:
+                # Ledger unchanged since the last load — keep the prepared transactions
+                return True
     
-            df = pd.DataFrame(raw["history"])
-            
-            df['Date'] = pd.to_datetime(df['date'], errors='coerce')
-            df['Amount'] = pd.to_numeric(df['amount'], errors='coerce')
-            df["credit"] = df.apply(lambda row: row["amount"] if row["type"] == "credit" else 0, axis=1)
-            df["debit"] = df.apply(lambda row: row["amount"] if row["type"] == "debit" else 0, axis=1)
-            # Debit amounts are negative
-            df['Amount'] = df.apply(
-                lambda row: -row['Amount'] if row.get('type', '').lower() == 'debit' else row['Amount'],
-                axis=1
-            )
-    
-            df['Description'] = df['desc'].astype(str).str.strip()
-            df = df[abs(df['Amount']) > 0.01].copy()
+            # Vectorized Credit/Debit/signed Amount (debits negative) and Description
+            df = normalize_transactions(frame)
     
-            df = df.rename(columns={"credit": "Credit", "debit": "Debit"})
             self.transactions = df
+            self._ledger_frame = frame
+            self.ledger_version = repo.frame_version
+            self._ledger_path = json_path
             print(f"✅ Loaded {len(df)} transactions from JSON.")
             return True
     
@@ -106,19 +168,35 @@ class FinancialBot:
         if self.transactions.empty:
             print("No transactions loaded.")
             return
-        self.transactions['Category'] = self.transactions.apply(
-            lambda row: self.expense_categorizer.categorize(row['Description'], row['Amount']),
-            axis=1
+        self.transactions['Category'] = self.expense_categorizer.categorize_batch(
+            self.transactions['Description'].tolist(),
+            self.transactions['Amount'].tolist()
         )
-        print("✅ All transactions categorized.")
+        stats = self.expense_categorizer.last_stats
+        print(f"✅ All transactions categorized ({stats['unique']} unique descriptions, "
+              f"{stats['store_hits']} from the category store, "
+              f"{stats['llm_items']} sent to Granite in {stats['llm_calls']} calls; "
+              f"store hit rate {stats['store_hit_rate']:.0%}).")
+
+    def _forecast_input(self):
+        """
+        (data, ledger version) for the forecaster: daily net cashflow from the
+        ledger's rollup once a ledger is loaded, else the raw transactions.
+        """
+        if self._ledger_path is None:
+            return self.transactions, self.ledger_version
+        repo = get_ledger_repository(self._ledger_path)
+        return repo.daily_cashflow(), repo.version
 
     def forecast_cash_flow(self) -> dict:
-        return self.cash_flow_forecaster.forecast(self.transactions)
+        daily, version = self._forecast_input()
+        return self.cash_flow_forecaster.forecast(daily, version=version)
 
     def loan_advice(self, question: str) -> str:
         return self.loan_advisor.answer_loan_question(question)
 
     def score_financials(self) -> dict:
+            from dash_modules.analytics.run_smb_analysis import run_smb_analysis
             business_profile = load_profile()
             results = run_smb_analysis(business_profile)
 
@@ -132,13 +210,16 @@ class FinancialBot:
             }
     
     def explain_cashflow_forecast(self, days=30) -> str:
-        forecast_df = self.cash_flow_forecaster.forecast(self.transactions, days)
+        # Served from the forecaster's cache when the ledger hasn't changed
+        daily, version = self._forecast_input()
+        forecast_df = self.cash_flow_forecaster.forecast(daily, days, version=version)
         return self.forecast_explainer.explain_forecast(forecast_df, days)
     
     def simulate_and_explain(self, scenario: dict) -> str:
         print("Scene:",scenario)
         from cashflow_forecasting.scenario_manager import apply_scenario
-        forecast_df = self.cash_flow_forecaster.forecast(self.transactions, 30)
+        daily, version = self._forecast_input()
+        forecast_df = self.cash_flow_forecaster.forecast(daily, 30, version=version)
         adjusted_df = apply_scenario(forecast_df, scenario)
         return self.forecast_explainer.explain_forecast(adjusted_df,30)
 
@@ -206,7 +287,8 @@ class FinancialBot:
         print("✅ forecast_summary method called")
         print(self.transactions)
 
-        forecast_df = self.cash_flow_forecaster.forecast_summary(self.transactions, days)
+        daily, version = self._forecast_input()
+        forecast_df = self.cash_flow_forecaster.forecast_summary(daily, days, version=version)
 
         neg_days = forecast_df.get("neg", 0)
 
@@ -5,6 +5,7 @@ from ibm_watsonx_ai.foundation_models import ModelInference
 from ibm_watsonx_ai import Credentials
 from datetime import datetime, timezone
 from config import settings
+from utils.llm_cache import get_llm_cache
 
 
 class GenericFinancialAdvisor:
@@ -73,7 +74,8 @@ User Question: {user_question}{context_info}
 
 Please provide specific, actionable financial advice for this small/medium business question. Structure your response with clear steps and practical recommendations."""
 
-    def generate_advice(self, user_question: str, user_context: Dict[str, Any] = None) -> str:
+    def generate_advice(self, user_question: str, user_context: Dict[str, Any] = None,
+                        use_cache: bool = None) -> str:
         """Generate advice using Watsonx Granite"""
         try:
             prompt = self._format_thinking_prompt(user_question, user_context)
@@ -89,18 +91,12 @@ Please provide specific, actionable financial advice for this small/medium busin
                 "top_k": 50
             }
             
-            response = self.model.generate(
-                prompt=prompt,
-                params=generation_params
+            generated = get_llm_cache().get_or_generate(
+                self.model_id, prompt, generation_params,
+                lambda: self._generate_raw(prompt, generation_params),
+                use_cache=use_cache
             )
-            
-            # Handle different possible response structures
-            if "results" in response and len(response["results"]) > 0:
-                generated = response["results"][0]["generated_text"]
-            elif "generated_text" in response:
-                generated = response["generated_text"]
-            else:
-                logging.error(f"Unexpected response structure: {response}")
+            if not generated:
                 return self._fallback_response()
             
             # Clean up the generated text
@@ -112,6 +108,22 @@ Please provide specific, actionable financial advice for this small/medium busin
             logging.error(f"Watsonx Granite error: {e}")
             return self._fallback_response()
 
+    def _generate_raw(self, prompt: str, generation_params: Dict[str, Any]) -> str:
+        """Call the model and return its raw text, or "" on an unexpected response"""
+        response = self.model.generate(
+            prompt=prompt,
+            params=generation_params
+        )
+
+        # Handle different possible response structures
+        if "results" in response and len(response["results"]) > 0:
+            return response["results"][0]["generated_text"]
+        elif "generated_text" in response:
+            return response["generated_text"]
+
+        logging.error(f"Unexpected response structure: {response}")
+        return ""
+
     def _clean_generated_text(self, text: str) -> str:
         """Clean up generated text from model artifacts"""
         # Remove any repetitive patterns
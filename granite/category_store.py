@@ -0,0 +1,184 @@
+# ─── granite/category_store.py ─────────────────────────────────────────────────
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+CATEGORY_DB_PATH = Path(os.getenv("FINNY_CATEGORY_DB", "data/category_store.db"))
+FUZZY_THRESHOLD = float(os.getenv("FINNY_CATEGORY_FUZZY_THRESHOLD", "0.8"))
+
+# MinHash / LSH shape: 16 bands x 4 rows puts the candidate cut-off near 0.5 Jaccard,
+# comfortably below FUZZY_THRESHOLD, and every candidate is re-scored exactly
+NUM_PERM = 64
+LSH_BANDS = 16
+_ROWS_PER_BAND = NUM_PERM // LSH_BANDS
+_MERSENNE = (1 << 61) - 1
+_PERMS = [
+    ((i * 0x9E3779B97F4A7C15 + 0x632BE59BD9B4E019) % _MERSENNE | 1,
+     (i * 0xBF58476D1CE4E5B9 + 0x94D049BB133111EB) % _MERSENNE)
+    for i in range(1, NUM_PERM + 1)
+]
+
+_DATE_RE = re.compile(
+    r"\b(\d{1,4}[/\-.]\d{1,2}[/\-.]\d{1,4}"
+    r"|\d{1,2}[\s\-]?(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s\-]?\d{2,4})\b"
+)
+_AMOUNT_RE = re.compile(r"(sgd|usd|inr|rs\.?|\$|€|£)?\s*\d[\d,]*\.\d{1,2}\b")
+_TOKEN_RE = re.compile(r"[a-z][a-z&'\-]*")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS merchant_categories (
+    signature TEXT NOT NULL,
+    inflow INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (signature, inflow)
+);
+"""
+
+
+def merchant_signature(description) -> str:
+    """
+    Reduce a bank description to its merchant words: dates, amounts and any
+    token carrying digits (reference numbers) are dropped.
+    "GIRO PAYMENT 123 ACME" and "GIRO PAYMENT 987 ACME" both become
+    "giro payment acme".
+    """
+    text = str(description).lower()
+    text = _DATE_RE.sub(" ", text)
+    text = _AMOUNT_RE.sub(" ", text)
+    words = [t for t in text.split() if not any(ch.isdigit() for ch in t)]
+    return " ".join(_TOKEN_RE.findall(" ".join(words)))
+
+
+def _shingles(signature: str) -> Set[str]:
+    padded = f" {signature} "
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _minhash(shingles: Set[str]) -> List[int]:
+    hashed = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [min((a * h + b) % _MERSENNE for h in hashed) for a, b in _PERMS]
+
+
+def _bands(signature_hash: List[int]) -> List[Tuple]:
+    return [
+        (band, tuple(signature_hash[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]))
+        for band in range(LSH_BANDS)
+    ]
+
+
+class CategoryStore:
+    """
+    Persistent merchant-signature → category memo. Exact signature hits are a
+    dictionary lookup; near-duplicates are found through a MinHash LSH index
+    and confirmed by trigram Jaccard similarity.
+    """
+
+    def __init__(self, db_path: Path = CATEGORY_DB_PATH, fuzzy_threshold: float = FUZZY_THRESHOLD):
+        self.db_path = str(db_path)
+        self.fuzzy_threshold = fuzzy_threshold
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self._exact: Dict[Tuple[str, bool], str] = {}
+        self._shingles: Dict[Tuple[str, bool], Set[str]] = {}
+        self._buckets: Dict[Tuple, List[Tuple[str, bool]]] = {}
+
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+        for signature, inflow, category in self._conn.execute(
+            "SELECT signature, inflow, category FROM merchant_categories"
+        ):
+            self._index((signature, bool(inflow)), category)
+
+    # ─── Index ───────────────────────────────────
+
+    def _index(self, key: Tuple[str, bool], category: str) -> None:
+        if key not in self._exact:
+            shingles = _shingles(key[0])
+            self._shingles[key] = shingles
+            for band in _bands(_minhash(shingles)):
+                self._buckets.setdefault((key[1],) + band, []).append(key)
+        self._exact[key] = category
+
+    def _fuzzy_match(self, signature: str, inflow: bool) -> Optional[Tuple[str, bool]]:
+        shingles = _shingles(signature)
+        candidates = set()
+        for band in _bands(_minhash(shingles)):
+            candidates.update(self._buckets.get((inflow,) + band, ()))
+
+        best, best_score = None, self.fuzzy_threshold
+        for key in candidates:
+            other = self._shingles[key]
+            score = len(shingles & other) / len(shingles | other)
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    # ─── Public API ──────────────────────────────
+
+    def lookup(self, signature: str, inflow: bool) -> Optional[str]:
+        """Category for a merchant signature, exact or fuzzy; None on a miss."""
+        with self._lock:
+            key = (signature, inflow)
+            if key in self._exact:
+                self.exact_hits += 1
+            else:
+                key = self._fuzzy_match(signature, inflow) if signature else None
+                if key is None:
+                    self.misses += 1
+                    return None
+                self.fuzzy_hits += 1
+            return self._exact[key]
+
+    def remember_many(self, entries: Dict[Tuple[str, bool], str], source: str = "granite") -> None:
+        entries = {k: v for k, v in entries.items() if k[0]}
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO merchant_categories (signature, inflow, category, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(signature, inflow) DO UPDATE SET "
+                    "category = excluded.category, source = excluded.source, updated_at = excluded.updated_at",
+                    [(sig, int(inflow), cat, source, now) for (sig, inflow), cat in entries.items()]
+                )
+            for key, category in entries.items():
+                self._index(key, category)
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.exact_hits + self.fuzzy_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._exact),
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        return len(self._exact)
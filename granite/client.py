@@ -1,6 +1,7 @@
 from ibm_watsonx_ai.foundation_models import ModelInference
 from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
 from config.settings import GRANITE_API_KEY, GRANITE_ENDPOINT, GRANITE_MODEL_NAME, GRANITE_PROJECT_ID
+from utils.llm_cache import get_llm_cache
 
 class GraniteAPI:
     """
@@ -20,13 +21,20 @@ class GraniteAPI:
             project_id=GRANITE_PROJECT_ID    # Must be valid UUID
         )
 
-    def generate_text(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> str:
+    def generate_text(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                      use_cache: bool = None) -> str:
         params = {
             GenParams.MAX_NEW_TOKENS: max_tokens,
             GenParams.TEMPERATURE: temperature,
             GenParams.STOP_SEQUENCES: []
         }
+        return get_llm_cache().get_or_generate(
+            GRANITE_MODEL_NAME, prompt, params,
+            lambda: self._generate_text(prompt, params),
+            use_cache=use_cache
+        )
 
+    def _generate_text(self, prompt: str, params: dict) -> str:
         try:
             response = self.model.generate_text(prompt=prompt, params=params)
             return response.strip()
@@ -1,16 +1,87 @@
 # ─── granite/expense_categorizer.py ────────────────────────────────────────────
 
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
 from granite.client import GraniteAPI
+from granite.category_store import CATEGORY_DB_PATH, CategoryStore, merchant_signature
+
+CATEGORIES = [
+    'Revenue - Client Payments',
+    'Revenue - Internal Transfer',
+    'Revenue - Other',
+    'Expense - Salary Payments',
+    'Expense - Vendor Payments',
+    'Expense - Bank Charges & Fees',
+    'Expense - Reimbursements',
+    'Expense - Government/Tax',
+    'Expense - Office/Tax‐Deductible',
+    'Expense - Other',
+]
+
+# Rule buckets in priority order for each direction, with the category they map to
+REVENUE_RULES = [
+    ('revenue',           'Revenue - Client Payments'),
+    ('internal_transfer', 'Revenue - Internal Transfer'),
+]
+EXPENSE_RULES = [
+    ('salary',     'Expense - Salary Payments'),
+    ('vendor',     'Expense - Vendor Payments'),
+    ('bank_fees',  'Expense - Bank Charges & Fees'),
+    ('reimburs',   'Expense - Reimbursements'),
+    ('government', 'Expense - Government/Tax'),
+    ('office',     'Expense - Office/Tax‐Deductible'),
+]
+
+CATEGORIZE_BATCH_SIZE = int(os.getenv("FINNY_CATEGORIZE_BATCH", "25"))
+CATEGORIZE_WORKERS = int(os.getenv("FINNY_CATEGORIZE_WORKERS", "4"))
+
+_LINE_RE = re.compile(r"^\s*(\d+)\s*[\.\):\-]\s*(.+?)\s*$")
+
+
+def normalize_description(description) -> str:
+    """Lowercase and collapse whitespace so repeated merchant strings dedupe."""
+    return " ".join(str(description).lower().split())
+
+
+def _canonical(text: str) -> str:
+    return text.replace('‐', '-').strip().strip('"\'').lower()
+
+
+_CATEGORY_LOOKUP = {_canonical(c): c for c in CATEGORIES}
+
+
+def match_category(text: str) -> Optional[str]:
+    """Map a model's answer (name, number or a sentence containing a name) to a category."""
+    answer = _canonical(text)
+    if answer in _CATEGORY_LOOKUP:
+        return _CATEGORY_LOOKUP[answer]
+    if answer.isdigit() and 1 <= int(answer) <= len(CATEGORIES):
+        return CATEGORIES[int(answer) - 1]
+    for key, category in _CATEGORY_LOOKUP.items():
+        if key in answer:
+            return category
+    return None
+
 
 class ExpenseCategorizer:
     """
     Uses rule‐based + Granite fallback to classify each transaction into expense categories.
     """
-    def __init__(self, granite_client: GraniteAPI):
+    def __init__(self, granite_client: GraniteAPI, store_path: Path = CATEGORY_DB_PATH,
+                 batch_size: int = CATEGORIZE_BATCH_SIZE, max_workers: int = CATEGORIZE_WORKERS):
         self.granite = granite_client
+        self.store = CategoryStore(store_path)
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.last_stats: Dict[str, int] = {}
         # Define your rule‐based keywords here as needed
         self.rule_keywords = {
             'revenue':      ['meps receipts', 'payment received', 'tt-sgd'],
+            'internal_transfer': ['transfer fund transfer from'],
             'salary':       ['salary', 'sala '],
             'vendor':       ['ivpt', 'fast payment ivpt', 'giro payment'],
             'bank_fees':    ['bank charges', 'fast charges', 'debit purchase'],
@@ -18,61 +89,155 @@ class ExpenseCategorizer:
             'government':   ['iras', 'cpf', 'ministry of manpower'],
             'office':       ['office', 'supplies', 'software', 'internet', 'equipment', 'maintenance'],
         }
+        self.compile_rules()
+
+    # ─── Rules ───────────────────────────────────
+
+    def compile_rules(self) -> None:
+        """
+        Build one regex over every keyword. Call again after editing rule_keywords.
+        """
+        buckets_by_keyword: Dict[str, set] = {}
+        for bucket, keywords in self.rule_keywords.items():
+            for kw in keywords:
+                buckets_by_keyword.setdefault(kw, set()).add(bucket)
+
+        # Longest-first alternation inside a lookahead reports a match at every
+        # position; a longer hit also implies any keyword that is its prefix
+        keywords = sorted(buckets_by_keyword, key=len, reverse=True)
+        self._keyword_buckets = {
+            kw: set().union(*(buckets_by_keyword[p] for p in keywords if kw.startswith(p)))
+            for kw in keywords
+        }
+        self._rule_re = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+
+    def _matched_buckets(self, desc: str) -> set:
+        buckets = set()
+        for kw in self._rule_re.findall(desc):
+            buckets |= self._keyword_buckets[kw]
+        return buckets
 
     def _rule_based_category(self, description: str, amount: float) -> str:
-        desc = description.lower()
+        desc = normalize_description(description)
+        buckets = self._matched_buckets(desc)
         if amount > 0:
-            # Revenue categories
-            if any(k in desc for k in self.rule_keywords['revenue']):
-                return 'Revenue - Client Payments'
-            if 'transfer fund transfer from' in desc:
-                return 'Revenue - Internal Transfer'
-            return 'Revenue - Other'
+            rules, default = REVENUE_RULES, 'Revenue - Other'
         else:
-            # Expense categories
-            if any(k in desc for k in self.rule_keywords['salary']):
-                return 'Expense - Salary Payments'
-            if any(k in desc for k in self.rule_keywords['vendor']):
-                return 'Expense - Vendor Payments'
-            if any(k in desc for k in self.rule_keywords['bank_fees']):
-                return 'Expense - Bank Charges & Fees'
-            if any(k in desc for k in self.rule_keywords['reimburs']):
-                return 'Expense - Reimbursements'
-            if any(k in desc for k in self.rule_keywords['government']):
-                return 'Expense - Government/Tax'
-            if any(k in desc for k in self.rule_keywords['office']):
-                return 'Expense - Office/Tax‐Deductible'
-            return 'Expense - Other'
+            rules, default = EXPENSE_RULES, 'Expense - Other'
+        for bucket, category in rules:
+            if bucket in buckets:
+                return category
+        return default
+
+    # ─── Granite ─────────────────────────────────
+
+    def _build_batch_prompt(self, items: List[Tuple[str, bool]]) -> str:
+        categories = "\n".join(f"{i}. {c}" for i, c in enumerate(CATEGORIES, 1))
+        transactions = "\n".join(
+            f'{i}. [{"inflow" if inflow else "outflow"}] "{desc}"'
+            for i, (desc, inflow) in enumerate(items, 1)
+        )
+        return f"""
+You are a financial assistant. Categorize each transaction below into exactly one of:
+{categories}
+
+Transactions:
+{transactions}
+
+Respond with one line per transaction, in the same order, formatted as
+"<transaction number>. <category name>", and nothing else.
+"""
+
+    def _categorize_with_granite(self, items: List[Tuple[str, bool]]) -> List[Optional[str]]:
+        """Categorize a batch of (description, inflow) pairs with one model call."""
+        prompt = self._build_batch_prompt(items)
+        try:
+            response = self.granite.generate_text(
+                prompt, max_tokens=20 * len(items) + 20, temperature=0.0
+            )
+        except Exception as e:
+            print(f"⚠️ Granite categorization failed: {e}")
+            return [None] * len(items)
+
+        results: List[Optional[str]] = [None] * len(items)
+        for line in response.splitlines():
+            m = _LINE_RE.match(line)
+            if not m:
+                continue
+            idx = int(m.group(1)) - 1
+            if 0 <= idx < len(items) and results[idx] is None:
+                results[idx] = match_category(m.group(2))
+        return results
+
+    # ─── Public API ──────────────────────────────
+
+    def categorize_batch(self, descriptions: Sequence[str], amounts: Sequence[float]) -> List[str]:
+        """
+        Categorize many transactions at once. Rows sharing a normalized
+        description and direction are resolved once: rules first, then the
+        merchant category store (exact or fuzzy signature match), then
+        multi-item Granite prompts run concurrently for whatever is left.
+        """
+        keys = [
+            (normalize_description(desc), float(amount) > 0)
+            for desc, amount in zip(descriptions, amounts)
+        ]
+
+        resolved: Dict[Tuple[str, bool], str] = {}
+        # Merchant signature → the descriptions waiting on it
+        pending: Dict[Tuple[str, bool], List[Tuple[str, bool]]] = {}
+        rule_hits = store_hits = 0
+
+        for key in dict.fromkeys(keys):
+            desc, inflow = key
+            base_cat = self._rule_based_category(desc, 1.0 if inflow else -1.0)
+            resolved[key] = base_cat  # Fallback if nothing better turns up
+            if 'Other' not in base_cat:
+                rule_hits += 1
+                continue
+            signature = (merchant_signature(desc) or desc, inflow)
+            if signature not in pending:
+                remembered = self.store.lookup(*signature)
+                if remembered:
+                    resolved[key] = remembered
+                    store_hits += 1
+                    continue
+                pending[signature] = []
+            pending[signature].append(key)
+
+        # One representative description per signature goes to the model
+        signatures = list(pending)
+        items = [pending[sig][0] for sig in signatures]
+        batches = [
+            (signatures[i:i + self.batch_size], items[i:i + self.batch_size])
+            for i in range(0, len(items), self.batch_size)
+        ]
+        learned: Dict[Tuple[str, bool], str] = {}
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                answers = pool.map(self._categorize_with_granite, [b[1] for b in batches])
+                for (batch_sigs, _), batch_answers in zip(batches, answers):
+                    for sig, category in zip(batch_sigs, batch_answers):
+                        if category:
+                            learned[sig] = category
+                            for key in pending[sig]:
+                                resolved[key] = category
+            self.store.remember_many(learned)
+
+        self.last_stats = {
+            "rows": len(keys),
+            "unique": len(resolved),
+            "rule_hits": rule_hits,
+            "store_hits": store_hits,
+            "llm_items": len(items),
+            "llm_calls": len(batches),
+            "store_hit_rate": round(store_hits / (store_hits + len(items)), 3)
+                              if store_hits + len(items) else 0.0,
+        }
+        return [resolved[key] for key in keys]
 
     def categorize(self, description: str, amount: float) -> str:
         """
         First try rule‐based. If it returns “Other,” use Granite to refine.
         """
-        base_cat = self._rule_based_category(description, amount)
-        if 'Other' in base_cat:
-            # Granite fallback
-            prompt = f"""
-You are a financial assistant. Categorize this transaction into exactly one of:
-1. Revenue - Client Payments
-2. Revenue - Internal Transfer
-3. Revenue - Other
-4. Expense - Salary Payments
-5. Expense - Vendor Payments
-6. Expense - Bank Charges & Fees
-7. Expense - Reimbursements
-8. Expense - Government/Tax
-9. Expense - Office/Tax‐Deductible
-10. Expense - Other
-
-Description: "{description}"
-Amount: ${amount:.2f} (positive=inflow, negative=outflow)
-
-Respond with exactly one of the above category names.
-"""
-            try:
-                granite_response = self.granite.generate_text(prompt, max_tokens=50, temperature=0.0)
-                return granite_response.split("\n")[0].strip()
-            except Exception:
-                return base_cat  # Fallback
-        else:
-            return base_cat
+        return self.categorize_batch([description], [amount])[0]
@@ -1,80 +1,26 @@
-import re
+import argparse
 from datetime import datetime
-from invoice_reminder.db import load_all_invoices
-
-def parse_amount(amount):
-    """Parse amount string or number to float"""
-    if amount is None:
-        return 0.0
-
-    if isinstance(amount, (int, float)):
-        return float(amount)
-
-    if isinstance(amount, str):
-        cleaned = re.sub(r'[₹$€£,\s]', '', amount)
-        try:
-            return float(cleaned)
-        except ValueError:
-            return 0.0
-
-    return 0.0
+from invoice_reminder.invoice_store import get_invoice_store, parse_amount
 
 def get_monthly_summary(user_id: str) -> dict:
     """Generate a summary of invoice data for the current month"""
-    now = datetime.now()
-    month_start = now.replace(day=1)
-    invoices = load_all_invoices()
-
-    def is_in_month(date_str):
-        try:
-            date = datetime.fromisoformat(date_str)
-            return date >= month_start
-        except Exception:
-            return False
-
-    # Unpaid invoices to pay
-    pay_due = sum(
-        parse_amount(i.get("total_amount"))
-        for i in invoices
-        if i.get("user_id") == user_id
-        and i.get("invoice_type") == "pay"
-        and i.get("status", "pending") == "pending"
-        and is_in_month(i.get("due_date", ""))
-    )
-
-    # Uncollected invoices to collect
-    collect_due = sum(
-        parse_amount(i.get("total_amount"))
-        for i in invoices
-        if i.get("user_id") == user_id
-        and i.get("invoice_type") == "collect"
-        and i.get("status", "pending") == "pending"
-        and is_in_month(i.get("due_date", ""))
-    )
-
-    # Paid invoices this month
-    paid_total = sum(
-        parse_amount(i.get("total_amount"))
-        for i in invoices
-        if i.get("user_id") == user_id
-        and i.get("invoice_type") == "pay"
-        and i.get("status") == "paid"
-        and is_in_month(i.get("completed_date", ""))
-    )
-
-    # Collected invoices this month
-    collected_total = sum(
-        parse_amount(i.get("total_amount"))
-        for i in invoices
-        if i.get("user_id") == user_id
-        and i.get("invoice_type") == "collect"
-        and i.get("status") == "collected"
-        and is_in_month(i.get("completed_date", ""))
-    )
-
-    return {
-        "pay_due": pay_due,
-        "collect_due": collect_due,
-        "paid_total": paid_total,
-        "collected_total": collected_total
-    }
+    # Totals are kept up to date by the invoice store on every write, so this
+    # is a lookup over the user's rows from this month onwards
+    return get_invoice_store().monthly_summary(user_id, datetime.now().strftime("%Y-%m"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the per-user monthly invoice totals")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the totals from every invoice")
+    parser.add_argument("--check", action="store_true", help="Compare the totals with a fresh recompute")
+    args = parser.parse_args()
+
+    store = get_invoice_store()
+    if args.rebuild:
+        print(f"✅ Rebuilt {store.rebuild_summaries()} monthly total row(s)")
+    if args.check or not args.rebuild:
+        mismatches = store.check_summaries()
+        if not mismatches:
+            print("✅ Monthly totals are consistent")
+        for m in mismatches:
+            print(f"❌ {m['user_id']} {m['month']} {m['metric']}: stored {m['stored']} "
+                  f"({m['stored_invoices']} invoices), expected {m['expected']} ({m['expected_invoices']} invoices)")
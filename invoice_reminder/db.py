@@ -1,81 +1,50 @@
 # invoice_reminder/db.py
 
-import json
 from datetime import datetime, timedelta
-from pathlib import Path
 from invoice_reminder.whatsapp import send_whatsapp_prompt
-
-INVOICE_PATH = Path("invoice_reminder/invoice.json")
+from invoice_reminder.invoice_store import get_invoice_store, invoice_number_filter
 
 # ─── HELPERS ─────────────────────────────
 
 def load_all_invoices():
-    if not INVOICE_PATH.exists():
-        return []
-    with open(INVOICE_PATH, "r") as f:
-        return json.load(f)
+    return get_invoice_store().all()
 
 def save_all_invoices(data):
-    with open(INVOICE_PATH, "w") as f:
-        json.dump(data, f, indent=2)
+    get_invoice_store().replace_all(data)
 
 def find_invoice(filter_fn):
+    # Arbitrary predicates can't use an index; the functions below query directly
     return next((inv for inv in load_all_invoices() if filter_fn(inv)), None)
 
 def update_invoice(filter_fn, updater):
-    data = load_all_invoices()
-    updated = False
-    for idx, invoice in enumerate(data):
-        if filter_fn(invoice):
-            invoice.update(updater(invoice))
-            data[idx] = invoice
-            updated = True
-            break
-    if updated:
-        save_all_invoices(data)
-    return updated
+    return get_invoice_store().update_matching(filter_fn, updater) is not None
 
 # ─── CORE CRUD ───────────────────────────
 
 def save_invoice(data):
-    INVOICE_PATH.parent.mkdir(parents=True, exist_ok=True)
-
-    if not INVOICE_PATH.exists():
-        INVOICE_PATH.write_text("[]")
-
-    all_data = load_all_invoices()
-
-    existing_invoice_numbers = {inv.get("invoice_number") for inv in all_data if "invoice_number" in inv}
-    new_invoice_number = data.get("invoice_number")
-
-    if new_invoice_number in existing_invoice_numbers:
-        print(f"Invoice {new_invoice_number} already exists. Skipping save.")
+    if not get_invoice_store().insert(data):
+        print(f"Invoice {data.get('invoice_number')} already exists. Skipping save.")
         return
 
-    # ✅ Save if it's new
-    all_data.append(data)
-    save_all_invoices(all_data)
-
 
 def flag_for_due_date(data):
     data["awaiting_due"] = True
     save_invoice(data)
 
 def update_due_date(user_id, due_date):
-    return update_invoice(
-        lambda i: i.get("user_id") == user_id and i.get("awaiting_due") is True,
+    return get_invoice_store().update_first(
+        "user_id = ? AND awaiting_due = 1", (user_id,),
         lambda i: {"due_date": due_date, "awaiting_due": False}
-    )
+    ) is not None
 
 def set_invoice_type(user_id, invoice_type):
-    invoice = find_invoice(lambda i: i.get("user_id") == user_id and i.get("awaiting_type", False) is True)
+    invoice = get_invoice_store().update_first(
+        "user_id = ? AND awaiting_type = 1", (user_id,),
+        lambda i: {"invoice_type": invoice_type.lower(), "awaiting_type": False}
+    )
     if not invoice:
         return False
 
-    invoice["invoice_type"] = invoice_type.lower()
-    invoice["awaiting_type"] = False
-    update_invoice(lambda i: i["invoice_number"] == invoice["invoice_number"], lambda i: invoice)
-
     # Compose WhatsApp message
     summary = [
         f"👤 Party: {invoice.get('party_name')}",
@@ -88,14 +57,13 @@ def set_invoice_type(user_id, invoice_type):
     return True
 
 def update_due_date_and_notify(user_id, due_date):
-    invoice = find_invoice(lambda i: i.get("user_id") == user_id and i.get("awaiting_due", False))
+    invoice = get_invoice_store().update_first(
+        "user_id = ? AND awaiting_due = 1", (user_id,),
+        lambda i: {"due_date": due_date, "awaiting_due": False}
+    )
     if not invoice:
         return
 
-    invoice["due_date"] = due_date
-    invoice["awaiting_due"] = False
-    update_invoice(lambda i: i["invoice_number"] == invoice["invoice_number"], lambda i: invoice)
-
     if invoice.get("awaiting_type"):
         send_whatsapp_prompt(user_id, f"✅ Due date set to {due_date}!\n\n💸 Reply 'PAY' if you need to pay this invoice or 'COLLECT' if you need to collect money.")
     else:
@@ -109,35 +77,25 @@ def update_due_date_and_notify(user_id, due_date):
 
 def get_due_invoices(days_ahead=1):
     target = (datetime.now() + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
-    return [
-        i for i in load_all_invoices()
-        if i.get("due_date") and
-        i.get("status", "pending") == "pending" and
-        i.get("reminder_sent") is not True and
-        not i.get("awaiting_due") and
-        not i.get("awaiting_type") and
-        i["due_date"] <= target
-    ]
+    return get_invoice_store().due_on_or_before(target)
 
 def mark_reminder_sent(invoice_number):
-    update_invoice(
-        lambda i: i.get("invoice_number") == invoice_number,
-        lambda i: {"reminder_sent": True}
+    get_invoice_store().update_by_number(invoice_number, {"reminder_sent": True})
+
+def mark_as_done(invoice_number, user_id=None):
+    where, params = invoice_number_filter(invoice_number, user_id)
+    invoice = get_invoice_store().update_first(
+        where, params,
+        lambda i: {
+            "status": "paid" if i.get("invoice_type") == "pay" else "collected",
+            "completed_date": datetime.now().isoformat()
+        }
     )
-
-def mark_as_done(invoice_number):
-    invoice = find_invoice(lambda i: i.get("invoice_number") == invoice_number)
     if not invoice:
         return False, "Invoice not found"
+    return True, invoice["status"]
 
-    new_status = "paid" if invoice.get("invoice_type") == "pay" else "collected"
-    invoice["status"] = new_status
-    invoice["completed_date"] = datetime.now().isoformat()
-    update_invoice(lambda i: i["invoice_number"] == invoice_number, lambda i: invoice)
-    return True, new_status
-
-def update_due_date_by_id(invoice_number, new_due_date):
-    return update_invoice(
-        lambda i: i.get("invoice_number") == invoice_number,
-        lambda i: {"due_date": new_due_date, "reminder_sent": False}
-    )
\ No newline at end of file
+def update_due_date_by_id(invoice_number, new_due_date, user_id=None):
+    return get_invoice_store().update_by_number(
+        invoice_number, {"due_date": new_due_date, "reminder_sent": False}, user_id=user_id
+    ) is not None
\ No newline at end of file
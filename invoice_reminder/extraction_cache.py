@@ -0,0 +1,131 @@
+# invoice_reminder/extraction_cache.py — Content-addressed cache of invoice PDF conversions
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+EXTRACTION_CACHE_PATH = Path(os.getenv("FINNY_EXTRACTION_CACHE_DB", "invoice_reminder/extraction_cache.db"))
+
+# Bump when the extraction prompt or cleaning changes: cached fields from an
+# older version are ignored (the markdown is still reused)
+EXTRACTOR_VERSION = "2"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_extractions (
+    sha256 TEXT PRIMARY KEY,
+    markdown TEXT,
+    fields TEXT,
+    fields_version TEXT,
+    created_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Docling markdown and extracted invoice fields keyed by the SHA-256 of the
+    PDF bytes, so a re-sent invoice skips conversion and the Granite call.
+    """
+
+    def __init__(self, db_path: Path = EXTRACTION_CACHE_PATH):
+        self.db_path = str(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        self.field_hits = 0
+        self.markdown_hits = 0
+        self.misses = 0
+
+    def get(self, sha256: str) -> Optional[Dict]:
+        """{"markdown": str or None, "fields": dict or None} for a known PDF, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT markdown, fields, fields_version FROM pdf_extractions WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            markdown, fields, version = row
+            fields = json.loads(fields) if fields and version == EXTRACTOR_VERSION else None
+            if fields is not None:
+                self.field_hits += 1
+            elif markdown:
+                self.markdown_hits += 1
+            else:
+                self.misses += 1
+            with self._conn:
+                self._conn.execute("UPDATE pdf_extractions SET hits = hits + 1 WHERE sha256 = ?", (sha256,))
+        return {"markdown": markdown, "fields": fields}
+
+    def get_fields(self, sha256: str) -> Optional[Dict]:
+        cached = self.get(sha256)
+        return cached["fields"] if cached else None
+
+    def put_markdown(self, sha256: str, markdown: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pdf_extractions (sha256, markdown, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET markdown = excluded.markdown",
+                (sha256, markdown, time.time())
+            )
+
+    def put_fields(self, sha256: str, fields: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO pdf_extractions (sha256, fields, fields_version, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET fields = excluded.fields, fields_version = excluded.fields_version",
+                (sha256, json.dumps(fields), EXTRACTOR_VERSION, time.time())
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM pdf_extractions").fetchone()[0]
+        return {
+            "entries": entries,
+            "field_hits": self.field_hits,
+            "markdown_hits": self.markdown_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Get the process-wide ExtractionCache instance."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
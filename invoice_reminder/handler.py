@@ -1,14 +1,16 @@
 # invoice_reminder/handler.py (Enhanced Version)
 
 import os
-import requests
 from flask import Blueprint, request, jsonify
 from invoice_reminder.parser import extract_invoice_data
 from invoice_reminder.db import save_invoice, flag_for_due_date
+from invoice_reminder.extraction_cache import get_extraction_cache
+from invoice_reminder.invoice_store import get_invoice_store
 from invoice_reminder.whatsapp import send_whatsapp_prompt
 from bson import ObjectId
 from datetime import datetime
 from config.settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+from utils.media_fetcher import MediaFetchError, UnexpectedMediaType, get_media_fetcher
 
 invoice_routes = Blueprint('invoice_routes', __name__)
 
@@ -95,22 +97,52 @@ def upload_invoice():
     return jsonify({"message": "Invoice saved, awaiting additional information from user."})
 
 
+def duplicate_invoice_message(data, user_id):
+    """Reply for an invoice number this user has already saved, or None if it is new to them."""
+    invoice_number = data.get("invoice_number")
+    if not invoice_number:
+        return None
+    existing = get_invoice_store().get_by_number(invoice_number, user_id=user_id)
+    if not existing:
+        return None
+    status = existing.get("status", "pending")
+    return (f"📎 Invoice {invoice_number} is already saved (status: {status}).\n\n"
+            f"Reply 'DONE {invoice_number}' once it is settled.")
+
+
 def upload_invoice_from_url(media_url, user_id):
     """Enhanced version to handle invoice uploads from WhatsApp"""
     try:
         filename = f"{user_id.replace(':', '_')}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
         local_path = os.path.join(UPLOAD_FOLDER, filename)
 
-        # Download the file
-        res = requests.get(media_url, auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN))
-        if res.status_code != 200:
+        # Stream the file to disk, hashing it on the way
+        try:
+            media = get_media_fetcher().fetch_to_file(
+                media_url, local_path, auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), expect={"pdf"}
+            )
+        except UnexpectedMediaType:
+            return "⚠️ That attachment isn't a PDF. Please send the invoice as a PDF."
+        except MediaFetchError as e:
+            print("❌ Invoice download failed:", e)
             return "⚠️ Failed to download invoice from WhatsApp."
 
-        with open(local_path, "wb") as f:
-            f.write(res.content)
+        # A PDF we've seen before answers from the cache, before any conversion or Granite call
+        digest = media["sha256"]
+        cached_fields = get_extraction_cache().get_fields(digest)
+        if cached_fields:
+            duplicate = duplicate_invoice_message(cached_fields, user_id)
+            if duplicate:
+                os.remove(local_path)
+                return duplicate
 
         # Extract invoice data using OCR and AI
-        data = extract_invoice_data(local_path)
+        data = extract_invoice_data(local_path, digest=digest)
+
+        duplicate = duplicate_invoice_message(data, user_id)
+        if duplicate:
+            os.remove(local_path)
+            return duplicate
 
         for key in ["invoice_number", "invoice_date", "due_date", "party_name", "total_amount"]:
             data.setdefault(key, None)
@@ -123,7 +155,8 @@ def upload_invoice_from_url(media_url, user_id):
             "status": "pending",
             "invoice_type": None,
             "awaiting_type": True,
-            "created_at": datetime.now().isoformat()
+            "created_at": datetime.now().isoformat(),
+            "content_sha256": digest
         }
 
         save_invoice(invoice_record)
@@ -0,0 +1,479 @@
+# invoice_reminder/invoice_store.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+INVOICE_PATH = Path("invoice_reminder/invoice.json")
+INVOICE_DB_PATH = Path(os.getenv("FINNY_INVOICE_DB", "invoice_reminder/invoices.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_number TEXT,
+    user_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    invoice_type TEXT,
+    due_date TEXT,
+    awaiting_due INTEGER NOT NULL DEFAULT 0,
+    awaiting_type INTEGER NOT NULL DEFAULT 0,
+    reminder_sent INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+-- Invoice numbers are unique per user, not globally; stores created before that had this index
+DROP INDEX IF EXISTS idx_invoices_number;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_user_number ON invoices(user_id, invoice_number);
+CREATE INDEX IF NOT EXISTS idx_invoices_number_lookup ON invoices(invoice_number);
+CREATE INDEX IF NOT EXISTS idx_invoices_awaiting_due ON invoices(user_id, awaiting_due);
+CREATE INDEX IF NOT EXISTS idx_invoices_awaiting_type ON invoices(user_id, awaiting_type);
+CREATE INDEX IF NOT EXISTS idx_invoices_status_due ON invoices(status, due_date);
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    user_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    cents INTEGER NOT NULL,
+    invoices INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, metric)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Formats seen in extracted invoices and WhatsApp replies, tried in order
+DUE_DATE_FORMATS = [
+    "%b %d, %Y",        # Feb 4, 2024
+    "%B %d, %Y",        # February 4, 2024
+    "%d %B %Y",         # 01 July 2025, 05 July 2025
+    "%b. %d, %Y",       # Mar. 15, 2024
+    "%d.%m.%Y",         # 27.09.2019
+    "%Y-%m-%d",         # 2024-02-04 (ISO format)
+    "%d-%m-%Y",         # 04-02-2024 (what the bot asks users to reply with)
+    "%m/%d/%Y",         # 02/04/2024
+    "%d/%m/%Y",         # 04/02/2024
+    "%Y/%m/%d",         # 2024/02/04
+]
+
+_COLUMNS = ("invoice_number", "user_id", "status", "invoice_type", "due_date",
+            "awaiting_due", "awaiting_type", "reminder_sent")
+
+
+def _index_columns(record: Dict) -> tuple:
+    """Indexed columns derived from a record, mirroring how db.py tested each field."""
+    return (
+        record.get("invoice_number"),
+        record.get("user_id"),
+        record.get("status") or "pending",
+        record.get("invoice_type"),
+        record.get("due_date"),
+        int(record.get("awaiting_due") is True),
+        int(record.get("awaiting_type") is True),
+        int(record.get("reminder_sent") is True),
+    )
+
+
+def parse_due_date(due_date_str) -> Optional[datetime]:
+    """Parse a due date in any of DUE_DATE_FORMATS; None if it matches none."""
+    if not due_date_str:
+        return None
+    due_date_str = str(due_date_str).strip()
+    for date_format in DUE_DATE_FORMATS:
+        try:
+            return datetime.strptime(due_date_str, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(amount):
+    """Parse amount string or number to float"""
+    if amount is None:
+        return 0.0
+
+    if isinstance(amount, (int, float)):
+        return float(amount)
+
+    if isinstance(amount, str):
+        cleaned = re.sub(r'[₹$€£,\s]', '', amount)
+        try:
+            return float(cleaned)
+        except ValueError:
+            return 0.0
+
+    return 0.0
+
+
+SUMMARY_METRICS = ("pay_due", "collect_due", "paid_total", "collected_total")
+
+
+def _month_of(value) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        date = datetime.fromisoformat(str(value))
+    except ValueError:
+        date = parse_due_date(value)
+    return date.strftime("%Y-%m") if date else None
+
+
+def summary_contribution(record: Dict) -> Optional[Tuple[str, str, str, int]]:
+    """
+    The (user_id, month, metric, cents) an invoice adds to the monthly summary,
+    or None. Open invoices count in their due month, settled ones in the
+    month they were completed.
+    """
+    invoice_type = record.get("invoice_type")
+    status = record.get("status", "pending")
+    if invoice_type == "pay":
+        metric, date = {"pending": ("pay_due", "due_date"), "paid": ("paid_total", "completed_date")}.get(status, (None, None))
+    elif invoice_type == "collect":
+        metric, date = {"pending": ("collect_due", "due_date"), "collected": ("collected_total", "completed_date")}.get(status, (None, None))
+    else:
+        return None
+    month = _month_of(record.get(date)) if metric else None
+    if month is None:
+        return None
+    return str(record.get("user_id") or ""), month, metric, int(round(parse_amount(record.get("total_amount")) * 100))
+
+
+def invoice_number_filter(invoice_number: str, user_id: Optional[str] = None) -> Tuple[str, tuple]:
+    """WHERE clause and params for an invoice number, optionally scoped to one user."""
+    if user_id is None:
+        return "invoice_number = ?", (invoice_number,)
+    return "user_id = ? AND invoice_number = ?", (user_id, invoice_number)
+
+
+class InvoiceStore:
+    """
+    SQLite storage for invoices. Each invoice keeps its full record as JSON
+    plus the handful of columns the bot filters on, each indexed, so a
+    WhatsApp reply touches one row instead of rewriting invoice.json.
+    """
+
+    def __init__(self, db_path: Path = INVOICE_DB_PATH):
+        self.db_path = str(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._writes = 0
+        # Autocommit mode; writes take BEGIN IMMEDIATE so the reminder job
+        # (a separate process) and the web app never interleave read-modify-writes
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._writes += 1
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict:
+        return json.loads(row["data"])
+
+    # ─── Writes ──────────────────────────────────
+
+    def _insert(self, conn, record: Dict) -> bool:
+        # The unique index treats NULLs as distinct; IS compares them as values, so a
+        # missing user or number still counts as one key (as invoice.json did)
+        if conn.execute(
+            "SELECT 1 FROM invoices WHERE user_id IS ? AND invoice_number IS ? LIMIT 1",
+            (record.get("user_id"), record.get("invoice_number"))
+        ).fetchone():
+            return False
+        cur = conn.execute(
+            f"INSERT INTO invoices ({', '.join(_COLUMNS)}, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id, invoice_number) DO NOTHING",
+            (*_index_columns(record), json.dumps(record))
+        )
+        if cur.rowcount != 1:
+            return False
+        self._apply_summary(conn, summary_contribution(record), 1)
+        return True
+
+    def insert(self, record: Dict) -> bool:
+        """Add an invoice; False if the same user already has one with this invoice_number."""
+        with self._transaction() as conn:
+            return self._insert(conn, record)
+
+    def _write(self, conn, invoice_id: int, record: Dict) -> None:
+        old = conn.execute("SELECT data FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+        old_record = self._to_record(old) if old else {}
+        if old and record.get("due_date") != old_record.get("due_date"):
+            # Reminders sent for the old due date say nothing about the new one
+            record["reminders_sent"] = []
+            record["reminder_sent"] = False
+        before = summary_contribution(old_record) if old else None
+        after = summary_contribution(record)
+        if before != after:
+            self._apply_summary(conn, before, -1)
+            self._apply_summary(conn, after, 1)
+        conn.execute(
+            f"UPDATE invoices SET {', '.join(f'{c} = ?' for c in _COLUMNS)}, data = ? WHERE id = ?",
+            (*_index_columns(record), json.dumps(record), invoice_id)
+        )
+
+    def update_first(self, where: str, params: tuple,
+                     updater: Callable[[Dict], Dict]) -> Optional[Dict]:
+        """
+        Atomically apply ``updater`` to the first invoice (in insertion order)
+        matching ``where`` and return the updated record, or None if none matched.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"SELECT id, data FROM invoices WHERE {where} ORDER BY id LIMIT 1", params
+            ).fetchone()
+            if row is None:
+                return None
+            record = self._to_record(row)
+            record.update(updater(dict(record)))
+            self._write(conn, row["id"], record)
+            return record
+
+    def update_matching(self, filter_fn: Callable[[Dict], bool],
+                        updater: Callable[[Dict], Dict]) -> Optional[Dict]:
+        """update_first for an arbitrary Python predicate (full scan; prefer an indexed where)."""
+        with self._transaction() as conn:
+            for row in conn.execute("SELECT id, data FROM invoices ORDER BY id"):
+                record = self._to_record(row)
+                if filter_fn(record):
+                    record.update(updater(dict(record)))
+                    self._write(conn, row["id"], record)
+                    return record
+        return None
+
+    def update_by_number(self, invoice_number: str, changes: Dict, user_id: Optional[str] = None) -> Optional[Dict]:
+        where, params = invoice_number_filter(invoice_number, user_id)
+        return self.update_first(where, params, lambda _: changes)
+
+    def mark_reminders_sent(self, sent: Dict[int, Iterable[str]]) -> int:
+        """
+        Record reminder labels ("T-1", "overdue", ...) against invoice row ids
+        in one transaction. Also sets the legacy ``reminder_sent`` flag.
+        """
+        if not sent:
+            return 0
+        updated = 0
+        with self._transaction() as conn:
+            for invoice_id, labels in sent.items():
+                row = conn.execute("SELECT id, data FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+                if row is None:
+                    continue
+                record = self._to_record(row)
+                record["reminders_sent"] = sorted(set(record.get("reminders_sent") or []) | set(labels))
+                record["reminder_sent"] = True
+                self._write(conn, invoice_id, record)
+                updated += 1
+        return updated
+
+    def replace_all(self, records: List[Dict]) -> int:
+        """Swap the whole table for ``records`` in one transaction (duplicates dropped)."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM invoices")
+            conn.execute("DELETE FROM monthly_totals")
+            return sum(self._insert(conn, r) for r in records)
+
+    # ─── Reads ───────────────────────────────────
+
+    def _select(self, where: str = "1", params: tuple = (), limit: Optional[int] = None) -> List[Dict]:
+        sql = f"SELECT data FROM invoices WHERE {where} ORDER BY id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def find_first(self, where: str, params: tuple = ()) -> Optional[Dict]:
+        found = self._select(where, params, limit=1)
+        return found[0] if found else None
+
+    def get_by_number(self, invoice_number: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """First invoice with this number; pass ``user_id`` to look only at that user's invoices."""
+        return self.find_first(*invoice_number_filter(invoice_number, user_id))
+
+    def find_awaiting_due(self, user_id: str) -> Optional[Dict]:
+        return self.find_first("user_id = ? AND awaiting_due = 1", (user_id,))
+
+    def find_awaiting_type(self, user_id: str) -> Optional[Dict]:
+        return self.find_first("user_id = ? AND awaiting_type = 1", (user_id,))
+
+    def by_status(self, status: str) -> List[Dict]:
+        return self._select("status = ?", (status,))
+
+    def due_on_or_before(self, day: str) -> List[Dict]:
+        """Pending, fully specified invoices with no reminder sent and due_date <= ``day``."""
+        return self._select(
+            "status = 'pending' AND due_date IS NOT NULL AND due_date != '' AND due_date <= ? "
+            "AND reminder_sent = 0 AND awaiting_due = 0 AND awaiting_type = 0",
+            (day,)
+        )
+
+    def reminder_candidates(self) -> List[Tuple[int, Dict]]:
+        """(row id, record) for pending invoices that have a due date and need no more answers."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, data FROM invoices WHERE status = 'pending' "
+                "AND due_date IS NOT NULL AND due_date != '' "
+                "AND awaiting_due = 0 AND awaiting_type = 0 ORDER BY id"
+            ).fetchall()
+        return [(row["id"], self._to_record(row)) for row in rows]
+
+    def change_token(self) -> Tuple[int, int]:
+        """Changes whenever any connection (this one included) commits a write."""
+        with self._lock:
+            # data_version only moves for commits made by *other* connections
+            return self._conn.execute("PRAGMA data_version").fetchone()[0], self._writes
+
+    def all(self) -> List[Dict]:
+        return self._select()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+
+    # ─── Monthly summary ─────────────────────────
+
+    @staticmethod
+    def _apply_summary(conn, contribution: Optional[Tuple], sign: int) -> None:
+        if contribution is None:
+            return
+        user_id, month, metric, cents = contribution
+        conn.execute(
+            "INSERT INTO monthly_totals (user_id, month, metric, cents, invoices) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id, month, metric) DO UPDATE SET "
+            "cents = cents + excluded.cents, invoices = invoices + excluded.invoices",
+            (user_id, month, metric, sign * cents, sign)
+        )
+        if sign < 0:
+            conn.execute(
+                "DELETE FROM monthly_totals WHERE user_id = ? AND month = ? AND metric = ? AND invoices <= 0",
+                (user_id, month, metric)
+            )
+
+    @staticmethod
+    def _compute_totals(conn) -> Dict[Tuple[str, str, str], List[int]]:
+        totals: Dict[Tuple[str, str, str], List[int]] = {}
+        for row in conn.execute("SELECT data FROM invoices"):
+            contribution = summary_contribution(json.loads(row["data"]))
+            if contribution:
+                entry = totals.setdefault(contribution[:3], [0, 0])
+                entry[0] += contribution[3]
+                entry[1] += 1
+        return totals
+
+    def monthly_summary(self, user_id: str, from_month: str) -> Dict[str, float]:
+        """Summary totals for ``user_id`` over ``from_month`` (YYYY-MM) and every later month."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT metric, SUM(cents) FROM monthly_totals WHERE user_id = ? AND month >= ? GROUP BY metric",
+                (str(user_id or ""), from_month)
+            ).fetchall()
+        summary = dict.fromkeys(SUMMARY_METRICS, 0.0)
+        summary.update({metric: cents / 100 for metric, cents in rows})
+        return summary
+
+    def rebuild_summaries(self) -> int:
+        """Recompute monthly_totals from the invoices themselves; returns rows written."""
+        with self._transaction() as conn:
+            totals = self._compute_totals(conn)
+            conn.execute("DELETE FROM monthly_totals")
+            conn.executemany(
+                "INSERT INTO monthly_totals (user_id, month, metric, cents, invoices) VALUES (?, ?, ?, ?, ?)",
+                [(*key, cents, count) for key, (cents, count) in totals.items()]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('monthly_totals', '1')")
+        return len(totals)
+
+    def check_summaries(self) -> List[Dict]:
+        """Compare monthly_totals with a from-scratch recompute; returns the rows that disagree."""
+        with self._lock:
+            expected = self._compute_totals(self._conn)
+            stored = {
+                (r["user_id"], r["month"], r["metric"]): [r["cents"], r["invoices"]]
+                for r in self._conn.execute("SELECT * FROM monthly_totals")
+            }
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            want, have = expected.get(key, [0, 0]), stored.get(key, [0, 0])
+            if want != have:
+                mismatches.append({
+                    "user_id": key[0], "month": key[1], "metric": key[2],
+                    "expected": want[0] / 100, "stored": have[0] / 100,
+                    "expected_invoices": want[1], "stored_invoices": have[1],
+                })
+        return mismatches
+
+    def ensure_summaries(self) -> None:
+        """Build monthly_totals once for stores created before it existed."""
+        with self._lock:
+            built = self._conn.execute("SELECT value FROM meta WHERE key = 'monthly_totals'").fetchone()
+        if not built:
+            self.rebuild_summaries()
+
+    # ─── JSON interop ────────────────────────────
+
+    def migrate_from_json(self, json_path: Path = INVOICE_PATH) -> None:
+        """One-time import of the legacy invoice.json into an empty store."""
+        with self._transaction() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done:
+                return
+            written = 0
+            empty = conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 0
+            if empty and os.path.exists(json_path):
+                with open(json_path, "r") as f:
+                    try:
+                        records = json.load(f)
+                    except json.JSONDecodeError:
+                        records = []
+                written = sum(self._insert(conn, r) for r in records)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', '1')")
+        if written:
+            print(f"✅ Migrated {written} invoices from {json_path} into {self.db_path}")
+
+    def export_json(self, json_path: Path = INVOICE_PATH) -> None:
+        """Write every invoice in the legacy invoice.json shape (for backups and tooling)."""
+        json_path = Path(json_path)
+        tmp_path = json_path.with_suffix(json_path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.all(), f, indent=2)
+        os.replace(tmp_path, json_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[InvoiceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_invoice_store() -> InvoiceStore:
+    """Get the process-wide InvoiceStore, migrating invoice.json on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = InvoiceStore()
+                store.migrate_from_json(INVOICE_PATH)
+                store.ensure_summaries()
+                _store = store
+    return _store
@@ -2,23 +2,138 @@ import os
 import sys
 import json
 import re
-from datetime import datetime
-from typing import Dict, Any, Optional
-from docling.document_converter import DocumentConverter
-from ibm_watsonx_ai.foundation_models import ModelInference
-from ibm_watsonx_ai.foundation_models.utils.enums import DecodingMethods
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 from config.settings import (
     GRANITE_API_KEY, 
     GRANITE_ENDPOINT, 
     GRANITE_PROJECT_ID
 )
 
+# Upper bound on Granite extraction calls in flight across the process
+GRANITE_CONCURRENCY = int(os.getenv("FINNY_GRANITE_CONCURRENCY", "4"))
+_granite_slots = threading.BoundedSemaphore(GRANITE_CONCURRENCY)
+
+INVOICE_FIELDS = ["invoice_number", "invoice_date", "due_date", "party_name", "total_amount"]
+
+# Fields the rule-based pass finds with at least this confidence skip Granite
+FAST_PATH_CONFIDENCE = float(os.getenv("FINNY_INVOICE_FAST_PATH_CONFIDENCE", "0.8"))
+
+# Short answers for the targeted prompt: a small JSON object, no reasoning
+TARGETED_PARAMS = {
+    "decoding_method": "greedy",
+    "min_new_tokens": 1,
+    "max_new_tokens": 200,
+}
+
+# Separator between a label and its value: colons, dashes, markdown bold and table pipes
+_SEP = r"[\s*_|:#\-–.]*"
+_ID = r"([A-Z0-9][A-Z0-9\-_/.]{1,29})"
+_DATE = r"([^\n|]{6,40})"
+_AMOUNT = r"((?:[A-Z]{3}|Rs\.?)?\s*[$€£₹]?\s*\d[\d,]*(?:\.\d{1,2})?)"
+_PARTY = r"([^\n|]{2,80})"
+
+# field -> [(pattern, confidence, use_last_match)], strongest first
+_FIELD_RULES = {
+    "invoice_number": [
+        (r"invoice\s*(?:number|no\.?|num|#)" + _SEP + _ID, 0.95, False),
+        (r"invoice\s*id" + _SEP + _ID, 0.9, False),
+        (r"(?:bill|receipt)\s*(?:number|no\.?|#)" + _SEP + _ID, 0.85, False),
+        (r"(?:reference|ref)\s*(?:number|no\.?|#)?" + _SEP + _ID, 0.6, False),
+    ],
+    "invoice_date": [
+        (r"(?:(?:invoice|issue|billing)\s*date|date\s*of\s*issue|issued\s*on)" + _SEP + _DATE, 0.95, False),
+        (r"(?<![a-z])date" + _SEP + _DATE, 0.7, False),
+    ],
+    "due_date": [
+        (r"(?:due\s*date|payment\s*due(?:\s*date)?|due\s*by|pay\s*by)" + _SEP + _DATE, 0.95, False),
+        (r"(?<![a-z])due" + _SEP + _DATE, 0.75, False),
+    ],
+    "total_amount": [
+        (r"(?:grand\s*total|total\s*amount\s*due|amount\s*due|balance\s*due|total\s*due|"
+         r"amount\s*payable|total\s*payable)" + _SEP + _AMOUNT, 0.95, True),
+        (r"(?<![a-z])(?<!sub)(?<!sub-)(?<!sub )total(?:\s*amount)?" + _SEP + _AMOUNT, 0.85, True),
+    ],
+    "party_name": [
+        (r"(?m)^[\s*_#|]*(?:from|vendor|supplier|seller|sold\s*by|bill(?:ed)?\s*(?:from|by)|issued\s*by)"
+         + _SEP + _PARTY, 0.85, False),
+    ],
+}
+_FIELD_RULES = {
+    field: [(re.compile(p, re.IGNORECASE), c, last) for p, c, last in rules]
+    for field, rules in _FIELD_RULES.items()
+}
+_NET_TERMS_RE = re.compile(r"\bnet\s*(\d{1,3})\b(?:\s*days)?", re.IGNORECASE)
+_HEADING_RE = re.compile(r"^#{1,3}\s+(.+?)\s*$", re.MULTILINE)
+_COMPANY_RE = re.compile(
+    r"\b(?:ltd|limited|llc|llp|inc|corp|corporation|co\.|company|pte|pvt|gmbh|plc|sdn\s*bhd|solutions|enterprises)\b\.?",
+    re.IGNORECASE
+)
+_NOT_PARTY_RE = re.compile(r"\b(?:invoice|receipt|bill\s*to|ship\s*to|tax|statement|quotation)\b", re.IGNORECASE)
+_TABLE_SEPARATOR_RE = re.compile(r"^:?-{2,}:?$")
+_AMBIGUOUS_DATE_RE = re.compile(r"\b(\d{1,2})[/\-.](\d{1,2})[/\-.]\d{4}\b")
+
+
+def _flatten_tables(markdown: str) -> str:
+    """
+    Add "label: value" lines for docling markdown tables, pairing each cell
+    with its column header and with its left neighbour, so the label rules
+    also see values laid out in tables.
+    """
+    out, header = [], None
+    for line in markdown.splitlines():
+        out.append(line)
+        stripped = line.strip()
+        if not (stripped.startswith("|") and stripped.endswith("|")):
+            header = None
+            continue
+        cells = [c.strip() for c in stripped.strip("|").split("|")]
+        if all(not c or _TABLE_SEPARATOR_RE.match(c) for c in cells):
+            continue
+        if header is None:
+            header = cells
+        elif len(cells) == len(header):
+            out.extend(f"{h}: {c}" for h, c in zip(header, cells) if h and c)
+        out.extend(f"{a}: {b}" for a, b in zip(cells, cells[1:]) if a and b)
+    return "\n".join(out)
+
+_converter = None
+_converter_lock = threading.Lock()
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_document_converter():
+    """Shared docling DocumentConverter; its layout models load once per process."""
+    global _converter
+    if _converter is None:
+        with _converter_lock:
+            if _converter is None:
+                from docling.document_converter import DocumentConverter
+                _converter = DocumentConverter()
+    return _converter
+
 class IntelligentInvoiceExtractor:
-    def __init__(self):
+    def __init__(self, model=None):
         """
-        Initialize the intelligent invoice field extractor using Granite 3-3-8B
+        Initialize the intelligent invoice field extractor using Granite 3-3-8B.
+        ``model`` replaces the Granite client with anything that has a
+        ``generate(prompt=...)`` method (e.g. a local stub in tests).
         """
-        self.model = ModelInference(
+        self.model = model if model is not None else self._build_granite_model()
+        self.fast_path_confidence = FAST_PATH_CONFIDENCE
+        self._stats_lock = threading.Lock()
+        self.stats = {"invoices": 0, "llm_free": 0, "targeted_calls": 0, "full_calls": 0,
+                      "fields_by_rules": 0, "fields_by_llm": 0}
+
+    @staticmethod
+    def _build_granite_model():
+        # Heavy SDKs load here, not when the webhook imports this module
+        from ibm_watsonx_ai.foundation_models import ModelInference
+        from ibm_watsonx_ai.foundation_models.utils.enums import DecodingMethods
+
+        return ModelInference(
             model_id="ibm/granite-3-3-8b-instruct",
             params={
                 "decoding_method": DecodingMethods.SAMPLE,
@@ -34,7 +149,11 @@ class IntelligentInvoiceExtractor:
             },
             project_id=GRANITE_PROJECT_ID
         )
-        self.converter = DocumentConverter()
+
+    @property
+    def converter(self):
+        # Only needed when converting in this process; batch runs convert in worker processes
+        return get_document_converter()
 
     def convert_pdf_to_markdown(self, pdf_path: str) -> str:
         """Convert PDF to markdown using docling"""
@@ -155,7 +274,197 @@ json
             if not markdown_content:
                 print(f"❌ Failed to convert PDF to markdown: {pdf_path}")
                 return result
-            
+
+            return self.extract_from_markdown(markdown_content)
+
+        except Exception as e:
+            print(f"❌ Error extracting invoice data from {pdf_path}: {e}")
+            return result
+
+    def _generate(self, prompt: str, params: Optional[Dict] = None):
+        with _granite_slots:
+            if params:
+                return self.model.generate(prompt=prompt, params=params)
+            return self.model.generate(prompt=prompt)
+
+    # ─── Rule-based pass ─────────────────────────
+
+    def _score_date(self, raw: str, confidence: float) -> Tuple[Optional[str], float]:
+        value = self._validate_date_format(raw)
+        if value is None:
+            # Spelled-out forms such as "March 5, 2024"
+            from invoice_reminder.invoice_store import parse_due_date
+            parsed = parse_due_date(raw.strip(" .,"))
+            if parsed is None:
+                return None, 0.0
+            value = parsed.strftime("%Y-%m-%d")
+        ambiguous = _AMBIGUOUS_DATE_RE.search(raw)
+        if ambiguous and ambiguous.group(1) != ambiguous.group(2) and max(map(int, ambiguous.groups())) <= 12:
+            confidence -= 0.2  # 04/05/2024: day and month could be either way round
+        return value, confidence
+
+    @staticmethod
+    def _score_amount(raw: str, confidence: float) -> Tuple[Optional[float], float]:
+        digits = re.sub(r"[^\d.]", "", raw)
+        try:
+            value = float(digits)
+        except ValueError:
+            return None, 0.0
+        return (value, confidence) if value > 0 else (None, 0.0)
+
+    @staticmethod
+    def _score_party(raw: str, confidence: float) -> Tuple[Optional[str], float]:
+        value = re.sub(r"[*_#`]+", "", raw).strip(" :-–,.")
+        if len(value) < 2 or sum(ch.isdigit() for ch in value) > len(value) // 3 or _NOT_PARTY_RE.search(value):
+            return None, 0.0
+        return value, confidence
+
+    def _party_from_layout(self, text: str) -> Tuple[Optional[str], float]:
+        """Vendors usually head the document: a company-like heading or top line."""
+        for match in _HEADING_RE.finditer(text[:1500]):
+            value, _ = self._score_party(match.group(1), 0.0)
+            if value:
+                return value, 0.85 if _COMPANY_RE.search(value) else 0.6
+        for line in text.splitlines()[:12]:
+            if _COMPANY_RE.search(line) and "|" not in line:
+                value, _ = self._score_party(line, 0.0)
+                if value:
+                    return value, 0.8
+        return None, 0.0
+
+    def extract_fields_deterministic(self, markdown_content: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Locate the five fields with label rules over the markdown (tables
+        flattened). Returns the values and a 0-1 confidence for each.
+        """
+        text = _flatten_tables(markdown_content)
+        fields = dict.fromkeys(INVOICE_FIELDS)
+        confidence = dict.fromkeys(INVOICE_FIELDS, 0.0)
+
+        for field, rules in _FIELD_RULES.items():
+            for pattern, rule_confidence, use_last in rules:
+                matches = list(pattern.finditer(text))
+                for match in (reversed(matches) if use_last else matches):
+                    raw = match.group(1).strip()
+                    if field in ("invoice_date", "due_date"):
+                        value, score = self._score_date(raw, rule_confidence)
+                    elif field == "total_amount":
+                        value, score = self._score_amount(raw, rule_confidence)
+                    elif field == "party_name":
+                        value, score = self._score_party(raw, rule_confidence)
+                    else:
+                        value = raw.rstrip(".-/")
+                        score = rule_confidence if any(ch.isdigit() for ch in value) else 0.0
+                    if value is not None and score > confidence[field]:
+                        fields[field], confidence[field] = value, score
+                        break
+                if confidence[field] >= self.fast_path_confidence:
+                    break
+
+        if confidence["party_name"] < self.fast_path_confidence:
+            value, score = self._party_from_layout(markdown_content)
+            if score > confidence["party_name"]:
+                fields["party_name"], confidence["party_name"] = value, score
+
+        # "Net 30" terms give the due date when none is printed
+        if confidence["due_date"] < self.fast_path_confidence and fields["invoice_date"]:
+            terms = _NET_TERMS_RE.search(text)
+            if terms:
+                issued = datetime.strptime(fields["invoice_date"], "%Y-%m-%d")
+                fields["due_date"] = (issued + timedelta(days=int(terms.group(1)))).strftime("%Y-%m-%d")
+                confidence["due_date"] = min(confidence["invoice_date"], 0.85)
+
+        if fields["invoice_date"] and fields["due_date"] and fields["due_date"] < fields["invoice_date"]:
+            confidence["due_date"] = min(confidence["due_date"], 0.5)
+
+        return fields, confidence
+
+    # ─── Tiered extraction ───────────────────────
+
+    def create_targeted_prompt(self, markdown_content: str, missing: List[str], found: Dict[str, Any]) -> str:
+        """A short prompt asking only for the fields the rule-based pass could not settle"""
+        descriptions = {
+            "invoice_number": "the unique invoice identifier",
+            "invoice_date": "the date the invoice was issued, YYYY-MM-DD",
+            "due_date": "the payment deadline, YYYY-MM-DD",
+            "party_name": "the name of the company that issued the invoice",
+            "total_amount": "the final total amount due, as a number without currency symbols",
+        }
+        wanted = "\n".join(f"- {field}: {descriptions[field]}" for field in missing)
+        known = "\n".join(f"- {k}: {v}" for k, v in found.items() if k not in missing and v is not None)
+        template = ", ".join(f'"{field}": ...' for field in missing)
+        return f"""Extract fields from this invoice.
+
+<document>
+{markdown_content[:5000]}
+</document>
+
+Already known:
+{known or "- nothing"}
+
+Return only a JSON object with these keys (use null when a field is not in the document):
+{wanted}
+
+{{{template}}}
+"""
+
+    def extract_from_markdown(self, markdown_content: str) -> Dict[str, Any]:
+        """
+        Tiered extraction: rule-based fields first, then Granite only for the
+        fields below FAST_PATH_CONFIDENCE (the full reasoning prompt when the
+        rules found nothing at all).
+        """
+        fields, confidence = self.extract_fields_deterministic(markdown_content)
+        missing = [f for f in INVOICE_FIELDS if confidence[f] < self.fast_path_confidence]
+
+        if len(missing) == len(INVOICE_FIELDS) and not any(fields.values()):
+            self._record(rules=0, llm_call="full_calls")
+            return self._extract_with_full_prompt(markdown_content)
+
+        filled = 0
+        if missing:
+            try:
+                prompt = self.create_targeted_prompt(markdown_content, missing, fields)
+                answer = self._extract_json_from_response(self._generate(prompt, TARGETED_PARAMS))
+                for field in missing:
+                    if answer.get(field) is not None:
+                        fields[field] = answer[field]
+                        filled += 1
+            except Exception as e:
+                # Keep whatever the rules found, even at low confidence
+                print(f"❌ Targeted extraction failed, keeping rule-based fields: {e}")
+
+        self._record(rules=len(INVOICE_FIELDS) - len(missing), llm=filled,
+                     llm_call="targeted_calls" if missing else None)
+        return self._clean_extracted_data(fields)
+
+    def _record(self, rules: int, llm: int = 0, llm_call: Optional[str] = None) -> None:
+        with self._stats_lock:
+            self.stats["invoices"] += 1
+            self.stats["fields_by_rules"] += rules
+            self.stats["fields_by_llm"] += llm
+            if llm_call:
+                self.stats[llm_call] += 1
+            else:
+                self.stats["llm_free"] += 1
+
+    def extraction_stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["llm_free_rate"] = round(stats["llm_free"] / stats["invoices"], 3) if stats["invoices"] else 0.0
+        return stats
+
+    def _extract_with_full_prompt(self, markdown_content: str) -> Dict[str, Any]:
+        """Extract invoice fields from docling markdown with one Granite call"""
+        result = {
+            "invoice_number": None,
+            "invoice_date": None,
+            "due_date": None,
+            "party_name": None,
+            "total_amount": None
+        }
+
+        try:
             # Diagnostic logging
             #print(f"\n🔍 Diagnostic Information for {os.path.basename(pdf_path)}:")
             #print(f"Document Length: {len(markdown_content)} characters")
@@ -165,7 +474,7 @@ json
             prompt = self.create_extraction_prompt(markdown_content)
             
             # Generate response
-            response = self.model.generate(prompt=prompt)
+            response = self._generate(prompt)
             
             # Full response logging
             #print("\n🤖 Model Response:")
@@ -188,7 +497,7 @@ json
             return result
 
         except Exception as e:
-            print(f"❌ Error extracting invoice data from {pdf_path}: {e}")
+            print(f"❌ Error extracting invoice data: {e}")
             return result
 
     def _extract_json_from_response(self, response: str) -> Dict[str, Any]:
@@ -457,18 +766,53 @@ json
         return None
 
 
-def extract_invoice_data(pdf_path: str) -> Dict[str, Any]:
+def get_invoice_extractor() -> IntelligentInvoiceExtractor:
+    """Get the process-wide extractor (one Granite client for every upload)."""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                _extractor = IntelligentInvoiceExtractor()
+    return _extractor
+
+
+def extract_invoice_data(pdf_path: str, digest: Optional[str] = None) -> Dict[str, Any]:
     """
-    Wrapper function to extract invoice data from a PDF
+    Wrapper function to extract invoice data from a PDF.
+    Results are cached by the SHA-256 of the file (pass ``digest`` if it is
+    already known), so a re-sent invoice costs a hash and a lookup.
     """
-    extractor = IntelligentInvoiceExtractor()
-    return extractor.extract_invoice_data(pdf_path)
+    from invoice_reminder.extraction_cache import file_hash, get_extraction_cache
+
+    cache = get_extraction_cache()
+    digest = digest or file_hash(pdf_path)
+    cached = cache.get(digest) or {}
+    if cached.get("fields") is not None:
+        print(f"♻️ Using cached extraction for {os.path.basename(pdf_path)}")
+        return dict(cached["fields"])
+
+    extractor = get_invoice_extractor()
+    markdown_content = cached.get("markdown")
+    if not markdown_content:
+        markdown_content = extractor.convert_pdf_to_markdown(pdf_path)
+        if not markdown_content:
+            print(f"❌ Failed to convert PDF to markdown: {pdf_path}")
+            return dict.fromkeys(["invoice_number", "invoice_date", "due_date", "party_name", "total_amount"])
+        cache.put_markdown(digest, markdown_content)
+
+    result = extractor.extract_from_markdown(markdown_content)
+    # An all-empty result is more likely a failed call than a blank invoice: don't pin it
+    if any(v is not None for v in result.values()):
+        cache.put_fields(digest, result)
+    return result
 
 
 def extract_invoices_from_folder(folder_path: str) -> Dict[str, Dict[str, Any]]:
     """
     Extract invoices from all PDF files in a folder
     """
+    from invoice_reminder.batch_extractor import BatchInvoiceExtractor
+
     all_results = {}
 
     # Validate folder exists
@@ -476,30 +820,27 @@ def extract_invoices_from_folder(folder_path: str) -> Dict[str, Dict[str, Any]]:
         print(f"Folder not found: {folder_path}")
         return all_results
 
-    # Process each PDF file
-    for filename in os.listdir(folder_path):
-        # Check if it's a PDF file
-        if not filename.lower().endswith('.pdf'):
-            continue
+    pdf_paths = [
+        os.path.join(folder_path, filename)
+        for filename in sorted(os.listdir(folder_path))
+        if filename.lower().endswith('.pdf')
+    ]
+    print(f"\n🔎 Processing {len(pdf_paths)} PDF(s) from {folder_path}")
 
-        file_path = os.path.join(folder_path, filename)
-        print(f"\n🔎 Processing: {filename}")
-        
-        try:
-            result = extract_invoice_data(file_path)
-            
-            # Filter out results with no data
-            filtered_result = {k: v for k, v in result.items() if v is not None}
-            
-            if filtered_result:
-                all_results[filename] = filtered_result
-                print(f"✅ Successfully extracted data from {filename}")
-            else:
-                print(f"❌ Skipped {filename} — no valid invoice fields found.")
-        
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
+    batch = BatchInvoiceExtractor()
+    for file_path, result in batch.iter_extract(pdf_paths):
+        filename = os.path.basename(file_path)
+
+        # Filter out results with no data
+        filtered_result = {k: v for k, v in (result or {}).items() if v is not None}
+
+        if filtered_result:
+            all_results[filename] = filtered_result
+            print(f"✅ Successfully extracted data from {filename}")
+        else:
+            print(f"❌ Skipped {filename} — no valid invoice fields found.")
 
+    batch.print_stats()
     return all_results
 
 
@@ -521,12 +862,13 @@ def main():
 
     # ✅ Save results using your own DB logic
     from invoice_reminder.db import save_invoice
+    from invoice_reminder.invoice_store import get_invoice_store
 
     for fields in parsed.values():
         fields.setdefault("status_pending", True)
         save_invoice(fields)
 
-    print(f"\n💾 Results successfully saved to invoice_reminder/invoice.json")
+    print(f"\n💾 Results successfully saved to {get_invoice_store().db_path}")
 
 
 
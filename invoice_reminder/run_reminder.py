@@ -4,6 +4,10 @@ import os
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from invoice_reminder.scheduler import run_reminders
+from invoice_reminder.scheduler import ReminderScheduler, run_reminders
 
-run_reminders()
+# One pass for cron by default; --daemon keeps a timer running instead
+if "--daemon" in sys.argv:
+    ReminderScheduler().run_forever()
+else:
+    run_reminders()
@@ -1,53 +1,177 @@
 # invoice_reminder/scheduler.py (Enhanced Version)
 
-from invoice_reminder.db import get_due_invoices, mark_reminder_sent
-from invoice_reminder.whatsapp import send_whatsapp_prompt
+import heapq
+import itertools
+import os
+import time
 from datetime import datetime, timedelta
+from datetime import time as day_time
+from typing import Callable, Dict, List, Optional
+
+from invoice_reminder.invoice_store import InvoiceStore, get_invoice_store, parse_due_date
+from invoice_reminder.whatsapp import send_whatsapp_prompt
+
+# Days before the due date to remind on; negative values are days after it (overdue)
+REMINDER_OFFSETS = [int(d) for d in os.getenv("FINNY_REMINDER_OFFSETS", "7,1,0,-1").split(",") if d.strip()]
+REMINDER_HOUR = int(os.getenv("FINNY_REMINDER_HOUR", "9"))
+# Longest the daemon sleeps before checking the store for new or changed invoices
+REMINDER_POLL_SECONDS = float(os.getenv("FINNY_REMINDER_POLL_SECONDS", "60"))
+RETRY_SECONDS = 300
+
+
+def offset_label(days: int) -> str:
+    return "overdue" if days < 0 else f"T-{days}"
+
+
+def build_reminder_message(inv: Dict, days: int, today) -> str:
+    invoice_type = inv.get('invoice_type', 'unknown')
+    due = parse_due_date(inv.get("due_date"))
+    # Word it from the days actually left: a reminder can fire after its offset (late add, missed run)
+    if due is not None:
+        days = (due.date() - today).days
+
+    if days < 0:
+        header = f"⚠️ OVERDUE: {'💸 PAY' if invoice_type == 'pay' else '💰 COLLECT'}"
+        when = f"{-days} day(s) overdue"
+    elif days == 0:
+        header = f"🚨 URGENT: {'💸 PAY NOW' if invoice_type == 'pay' else '💰 COLLECT NOW'}"
+        when = "TODAY"
+    else:
+        header = f"⏰ Reminder: {'💸 PAY' if invoice_type == 'pay' else '💰 COLLECT'}"
+        when = "Tomorrow" if days == 1 else f"in {days} days"
+
+    return (
+        f"{header}\n\n"
+        f"👤 Party: {inv.get('party_name', 'N/A')}\n"
+        f"🧾 Invoice: {inv.get('invoice_number', 'N/A')}\n"
+        f"💰 Amount: {inv.get('total_amount', 'N/A')}\n"
+        f"📅 Due: {inv['due_date']} ({when})\n\n"
+        f"Reply 'DONE {inv.get('invoice_number')}' when completed."
+    )
+
+
+class ReminderScheduler:
+    """
+    Keeps every pending reminder in a heap ordered by when it should fire, so
+    a run only pops what is due instead of rescanning all invoices. The heap
+    is rebuilt only when the invoice store has changed since the last build.
+    """
+
+    def __init__(self, store: Optional[InvoiceStore] = None, offsets: List[int] = None,
+                 send: Callable[[str, str], object] = send_whatsapp_prompt, hour: int = REMINDER_HOUR):
+        self.store = store or get_invoice_store()
+        self.offsets = sorted(set(REMINDER_OFFSETS if offsets is None else offsets), reverse=True)
+        self.send = send
+        self.hour = hour
+
+        self._heap: List[tuple] = []
+        self._invoices: Dict[int, Dict] = {}
+        self._seq = itertools.count()
+        self._token = None
+        self.unparseable = 0
+        self.sent_total = 0
+
+    # ─── Heap ────────────────────────────────────
+
+    def _already_sent(self, inv: Dict) -> set:
+        sent = set(inv.get("reminders_sent") or [])
+        if inv.get("reminder_sent") is True and not sent:
+            # Marked by the old scheduler, which sent a single T-1 / T-0 reminder
+            sent = {offset_label(d) for d in self.offsets if d >= 0}
+        return sent
+
+    def _schedule(self, invoice_id: int, inv: Dict) -> None:
+        due = parse_due_date(inv.get("due_date"))
+        if due is None:
+            self.unparseable += 1
+            return
+        sent = self._already_sent(inv)
+        # A reminder closer to the due date already went out; earlier offsets are obsolete
+        floor = min((d for d in self.offsets if offset_label(d) in sent), default=None)
+        for days in self.offsets:
+            if offset_label(days) in sent or (floor is not None and days > floor):
+                continue
+            fire_at = datetime.combine(due.date() - timedelta(days=days), day_time(self.hour))
+            heapq.heappush(self._heap, (fire_at, next(self._seq), invoice_id, days))
+        self._invoices[invoice_id] = inv
+
+    def rebuild(self) -> None:
+        token = self.store.change_token()
+        self._heap, self._invoices, self.unparseable = [], {}, 0
+        for invoice_id, inv in self.store.reminder_candidates():
+            self._schedule(invoice_id, inv)
+        self._token = token
+        if self.unparseable:
+            print(f"⚠️ {self.unparseable} pending invoice(s) have a due date that could not be parsed")
+
+    def refresh_if_changed(self) -> bool:
+        if self._token != self.store.change_token():
+            self.rebuild()
+            return True
+        return False
+
+    def next_fire_time(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    # ─── Sending ─────────────────────────────────
+
+    def run_due(self, now: Optional[datetime] = None, whole_day: bool = False) -> int:
+        """
+        Send every reminder that is due at ``now``; returns how many messages
+        went out. With ``whole_day`` everything due on ``now``'s date or
+        earlier goes out regardless of REMINDER_HOUR, for one-shot cron runs.
+        """
+        now = now or datetime.now()
+        cutoff = datetime.combine(now.date(), day_time.max) if whole_day else now
+        self.refresh_if_changed()
+
+        due: Dict[int, List[int]] = {}
+        while self._heap and self._heap[0][0] <= cutoff:
+            _, _, invoice_id, days = heapq.heappop(self._heap)
+            due.setdefault(invoice_id, []).append(days)
+
+        sent: Dict[int, List[str]] = {}
+        for invoice_id, offsets in due.items():
+            inv = self._invoices[invoice_id]
+            # Several offsets can be due at once (e.g. an invoice added two days
+            # before its due date); only the closest one is worth a message
+            days = min(offsets)
+            try:
+                self.send(inv["user_id"], build_reminder_message(inv, days, now.date()))
+            except Exception as e:
+                print(f"❌ Reminder for invoice {inv.get('invoice_number')} failed: {e}")
+                retry_at = now + timedelta(seconds=RETRY_SECONDS)
+                for d in offsets:
+                    heapq.heappush(self._heap, (retry_at, next(self._seq), invoice_id, d))
+                continue
+            print(f"📤 Sent {offset_label(days)} reminder for {inv.get('invoice_number')} to {inv['user_id']}")
+            sent[invoice_id] = [offset_label(d) for d in offsets]
+
+        if sent:
+            token = self.store.change_token()
+            self.store.mark_reminders_sent(sent)
+            # Our own write shouldn't force a rebuild, anyone else's should
+            if token == self._token:
+                self._token = self.store.change_token()
+            self.sent_total += len(sent)
+        return len(sent)
+
+    def run_forever(self, max_sleep: float = REMINDER_POLL_SECONDS) -> None:
+        """Sleep until the next reminder is due, waking at least every ``max_sleep`` seconds for store changes."""
+        print(f"⏰ Reminder scheduler running (offsets: {', '.join(offset_label(d) for d in self.offsets)})")
+        while True:
+            self.run_due()
+            next_at = self.next_fire_time()
+            wait = max_sleep if next_at is None else (next_at - datetime.now()).total_seconds()
+            time.sleep(min(max(wait, 1.0), max_sleep))
+
 
 def run_reminders():
     """Send reminders for due invoices"""
-    
-    # Get invoices due tomorrow
-    tomorrow_invoices = get_due_invoices(days_ahead=1)
-    
-    # Get invoices due today
-    today_invoices = get_due_invoices(days_ahead=0)
-    
-    print(f"📊 Found {len(tomorrow_invoices)} invoice(s) due tomorrow")
-    print(f"📊 Found {len(today_invoices)} invoice(s) due today")
-
-    # Send tomorrow reminders
-    for inv in tomorrow_invoices:
-        invoice_type = inv.get('invoice_type', 'unknown')
-        action = "💸 PAY" if invoice_type == "pay" else "💰 COLLECT"
-        
-        message = (
-            f"⏰ Reminder: {action}\n\n"
-            f"👤 Party: {inv.get('party_name', 'N/A')}\n"
-            f"🧾 Invoice: {inv.get('invoice_number', 'N/A')}\n"
-            f"💰 Amount: {inv.get('total_amount', 'N/A')}\n"
-            f"📅 Due: {inv['due_date']} (Tomorrow)\n\n"
-            f"Reply 'DONE {inv.get('invoice_number')}' when completed."
-        )
-        
-        print(f"📤 Sending tomorrow reminder to {inv['user_id']}")
-        send_whatsapp_prompt(inv["user_id"], message)
-        mark_reminder_sent(inv["_id"])
-
-    # Send today reminders  
-    for inv in today_invoices:
-        invoice_type = inv.get('invoice_type', 'unknown')
-        action = "💸 PAY NOW" if invoice_type == "pay" else "💰 COLLECT NOW"
-        
-        message = (
-            f"🚨 URGENT: {action}\n\n"
-            f"👤 Party: {inv.get('party_name', 'N/A')}\n"
-            f"🧾 Invoice: {inv.get('invoice_number', 'N/A')}\n"
-            f"💰 Amount: {inv.get('total_amount', 'N/A')}\n"
-            f"📅 Due: {inv['due_date']} (TODAY)\n\n"
-            f"Reply 'DONE {inv.get('invoice_number')}' when completed."
-        )
-        
-        print(f"📤 Sending today reminder to {inv['user_id']}")
-        send_whatsapp_prompt(inv["user_id"], message)
-        mark_reminder_sent(inv["_id"])
\ No newline at end of file
+    scheduler = ReminderScheduler()
+    scheduler.rebuild()
+    print(f"📊 {len(scheduler._heap)} reminder(s) scheduled across {len(scheduler._invoices)} invoice(s)")
+    # Cron may run at any hour; the REMINDER_HOUR gate only applies to the --daemon timer
+    sent = scheduler.run_due(whole_day=True)
+    print(f"📊 Sent {sent} reminder(s)")
+    return sent
@@ -1,4 +1,48 @@
 # invoice_reminder/whatsapp.py
 
+import os
+import threading
+
+# Twilio sender, e.g. "whatsapp:+14155238886"; without it messages are only logged
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
+# WhatsApp rejects bodies longer than this
+MAX_MESSAGE_LENGTH = 1600
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_twilio_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from twilio.rest import Client
+                from config.settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
+                _client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _client
+
+
+def _split_message(message: str):
+    chunks = []
+    while len(message) > MAX_MESSAGE_LENGTH:
+        cut = message.rfind("\n", 0, MAX_MESSAGE_LENGTH)
+        if cut <= 0:
+            cut = MAX_MESSAGE_LENGTH
+        chunks.append(message[:cut])
+        message = message[cut:].lstrip("\n")
+    chunks.append(message)
+    return chunks
+
+
 def send_whatsapp_prompt(user_id, message):
     print(f"📤 WhatsApp Message → {user_id}: {message}")
+    if not TWILIO_WHATSAPP_FROM or not user_id or not message:
+        return
+
+    try:
+        client = _get_twilio_client()
+        for chunk in _split_message(message):
+            client.messages.create(from_=TWILIO_WHATSAPP_FROM, to=user_id, body=chunk)
+    except Exception as e:
+        print(f"❌ Failed to send WhatsApp message to {user_id}: {e}")
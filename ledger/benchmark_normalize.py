@@ -0,0 +1,69 @@
+# ledger/benchmark_normalize.py — row-wise vs vectorized ledger normalization
+#
+#   python -m ledger.benchmark_normalize [rows ...]
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ledger.ledger_utils import normalize_transactions
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def legacy_normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """The row-wise implementation FinancialBot.load_ledger_json used before."""
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['date'], errors='coerce')
+    df['Amount'] = pd.to_numeric(df['amount'], errors='coerce')
+    df["credit"] = df.apply(lambda row: row["amount"] if row["type"] == "credit" else 0, axis=1)
+    df["debit"] = df.apply(lambda row: row["amount"] if row["type"] == "debit" else 0, axis=1)
+    df['Amount'] = df.apply(
+        lambda row: -row['Amount'] if row.get('type', '').lower() == 'debit' else row['Amount'],
+        axis=1
+    )
+    df['Description'] = df['desc'].astype(str).str.strip()
+    df = df[abs(df['Amount']) > 0.01].copy()
+    return df.rename(columns={"credit": "Credit", "debit": "Debit"})
+
+
+def make_history(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Synthetic ledger history shaped like ledger.json's ``history`` list."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2024-04-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    return pd.DataFrame({
+        "amount": rng.uniform(1, 50_000, rows).round(2),
+        "type": np.where(rng.random(rows) < 0.5, "credit", "debit"),
+        "desc": rng.choice(["ICON ENTERPRISES", " Rachit Path Lab ", "GIRO PAYMENT 123", "BANK CHARGES"], rows),
+        "date": days.strftime(DATE_FORMAT),
+    })
+
+
+def _time(fn, df: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+def run(sizes=DEFAULT_SIZES) -> None:
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in sizes:
+        df = make_history(rows)
+
+        vectorized = normalize_transactions(df, date_format=DATE_FORMAT)
+        legacy = legacy_normalize(df)
+        # Same rows, same signed amounts
+        assert np.allclose(legacy["Amount"].to_numpy(), vectorized["Amount"].to_numpy())
+        assert np.allclose(legacy["Credit"].to_numpy(), vectorized["Credit"].to_numpy())
+
+        t_legacy = _time(legacy_normalize, df)
+        t_vector = _time(lambda d: normalize_transactions(d, date_format=DATE_FORMAT), df)
+        print(f"{rows:>10,} {t_legacy:>12.3f} {t_vector:>15.3f} {t_legacy / t_vector:>8.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    run(sizes)
@@ -1,115 +1,112 @@
 import json
 import os
 from datetime import datetime
+from pathlib import Path
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, List, Optional
+
+from ledger.ledger_store import LedgerStore
+
+# Refresh the ledger.json snapshot after this many single-transaction appends
+SNAPSHOT_EVERY = 500
 
 
 class LedgerManager:
-    def __init__(self, ledger_path: str = "ledger/ledger.json"):
+    def __init__(self, ledger_path: str = "ledger/ledger.json", db_path: Optional[str] = None,
+                 snapshot_every: int = SNAPSHOT_EVERY):
         self.ledger_path = ledger_path
-        self.ledger = self._load_ledger()
-        self._dirty = False  # Track if ledger needs saving
-    
+        self.db_path = db_path or str(Path(ledger_path).with_suffix(".db"))
+        self.snapshot_every = snapshot_every
+
+        # SQLite is the source of truth; ledger.json is a compacted snapshot of it
+        self.store = LedgerStore(self.db_path)
+        self.store.migrate_from_json(self.ledger_path)
+
+        self._dirty = False  # Track if the JSON snapshot is stale
+        self._appends_since_snapshot = 0
+
+    @property
+    def ledger(self) -> Dict:
+        """The ledger in its legacy JSON shape: {"balance": float, "history": [...]}."""
+        return self.store.to_json_dict()
+
     def _load_ledger(self) -> Dict:
-        if os.path.exists(self.ledger_path):
-            with open(self.ledger_path, "r") as f:
-                return json.load(f)
-        return {"balance": 0.0, "history": []}
-    
+        return self.ledger
+
     def _save_ledger(self) -> None:
         if not self._dirty:
             return
-        
-        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
-        with open(self.ledger_path, "w") as f:
-            json.dump(self.ledger, f, indent=2)
+
+        self.store.export_json(self.ledger_path)
         self._dirty = False
-    
-    def apply_transaction(self, amount: float, txn_type: str, description: str, 
+        self._appends_since_snapshot = 0
+
+    def apply_transaction(self, amount: float, txn_type: str, description: str,
                          date: Optional[str] = None, auto_save: bool = True) -> None:
         if not date:
             date = datetime.today().strftime("%Y-%m-%d")
-        
-        if txn_type == "debit":
-            self.ledger["balance"] -= amount
-        elif txn_type == "credit":
-            self.ledger["balance"] += amount
-        else:
+
+        if txn_type not in ("debit", "credit"):
             raise ValueError("txn_type must be 'debit' or 'credit'")
-        
-        self.ledger["history"].append({
-            "amount": amount,
-            "type": txn_type,
-            "desc": description,
-            "date": date
-        })
-        
+
+        # Committed to SQLite immediately — one row written, not the whole ledger
+        self.store.append(amount, txn_type, description, date)
+
         self._dirty = True
-        if auto_save:
+        self._appends_since_snapshot += 1
+        # Also snapshot straight away when there is no ledger.json yet, for readers that still open the file
+        if auto_save and (self._appends_since_snapshot >= self.snapshot_every or not os.path.exists(self.ledger_path)):
             self._save_ledger()
-    
+
     def bulk_apply_csv(self, csv_path: str) -> None:
         # Read CSV with optimized settings
         df = pd.read_csv(csv_path, dtype={'Transaction Amount': 'float64'})
-        
+
         # Vectorized data cleaning and preparation
         valid_mask = (
-            df["Transaction Amount"].notna() & 
+            df["Transaction Amount"].notna() &
             (df["Transaction Amount"] != 0)
         )
         df_clean = df[valid_mask].copy()
-        
+
         if df_clean.empty:
             print("⚠️ No valid transactions found in CSV.")
             return
-        
+
         # Vectorized operations for transaction preparation
         amounts = df_clean["Transaction Amount"].abs().values
         txn_types = ["credit" if x > 0 else "debit" for x in df_clean["Transaction Amount"]]
         dates = df_clean["Date"].values
-        
+
         # Efficient description handling
         descriptions = df_clean["Client Ref"].fillna(
             df_clean.get("Receiver", "Transaction")
         ).values
-        
-        # Batch transaction processing
-        new_transactions = []
-        balance_delta = 0.0
-        
-        for i in range(len(amounts)):
-            amount = amounts[i]
-            txn_type = txn_types[i]
-            
-            # Update balance delta
-            if txn_type == "credit":
-                balance_delta += amount
-            else:
-                balance_delta -= amount
-            
-            # Prepare transaction record
-            new_transactions.append({
-                "amount": amount,
-                "type": txn_type,
+
+        new_transactions = [
+            {
+                "amount": float(amounts[i]),
+                "type": txn_types[i],
                 "desc": str(descriptions[i]),
                 "date": str(dates[i])
-            })
-        
-        # Batch update ledger
-        self.ledger["balance"] += balance_delta
-        self.ledger["history"].extend(new_transactions)
-        
-        # Single save operation
+            }
+            for i in range(len(amounts))
+        ]
+
+        # Single batched merge: rows already in the ledger (re-run on the same file) are skipped
+        merged = self.store.merge_many(new_transactions)
+
         self._dirty = True
         self._save_ledger()
-        
-        success_count = len(new_transactions)
+
+        success_count = merged["inserted"]
         skipped_count = len(df) - success_count
-        
+
         print(f"✅ Processed {success_count} transactions.")
-        if skipped_count:
-            print(f"⚠️ Skipped {skipped_count} rows.")
+        if merged["skipped"]:
+            print(f"⚠️ {merged['skipped']} transactions were already in the ledger.")
+        if skipped_count - merged["skipped"]:
+            print(f"⚠️ Skipped {skipped_count - merged['skipped']} rows.")
 
     def bulk_apply_df(self, df: pd.DataFrame) -> None:
         """
@@ -118,63 +115,123 @@ class LedgerManager:
         if df.empty or not all(col in df.columns for col in ['date', 'description', 'amount']):
             print("❌ DataFrame is missing required columns or is empty.")
             return
-    
-        df_clean = df[df['amount'].notna() & (df['amount'] != 0)].copy()
-        if df_clean.empty:
+
+        new_transactions = self._transactions_from_df(df)
+        if not new_transactions:
             print("⚠ No valid transactions found in DataFrame.")
             return
-    
-        # 🔁 Replace ledger (instead of adding)
-        self.ledger = {"balance": 0.0, "history": []}
-        self._dirty = True  # Mark as changed
-    
+
+        # 🔁 Replace ledger (instead of adding) in one atomic write
+        self.store.replace_all(new_transactions)
+        self._dirty = True
+        self._save_ledger()
+
+        print(f"✅ Replaced ledger with {len(new_transactions)} transactions.")
+
+    def bulk_apply_chunks(self, frames: Iterable[pd.DataFrame]) -> int:
+        """
+        bulk_apply_df for a stream of standardized DataFrames (see utils.csv_ingest).
+        Each chunk is staged as it arrives; the ledger is replaced once the stream
+        is exhausted, and left as it was if the stream raises.
+        """
+        count = self.store.replace_all_chunked(self._transactions_from_df(df) for df in frames)
+        if not count:
+            print("⚠ No valid transactions found in DataFrame.")
+            return 0
+
+        self._dirty = True
+        self._save_ledger()
+
+        print(f"✅ Replaced ledger with {count} transactions.")
+        return count
+
+    def merge_df(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Adds only the transactions from a standardized DataFrame that the ledger
+        doesn't already hold, so overlapping statements can be uploaded again.
+        Returns {"inserted", "skipped"}.
+        """
+        return self.merge_chunks([df])
+
+    def merge_chunks(self, frames: Iterable[pd.DataFrame]) -> Dict[str, int]:
+        """merge_df for a stream of standardized DataFrames; each chunk is committed as it arrives."""
+        totals = {"inserted": 0, "skipped": 0}
+        occurrences: Dict[str, int] = {}
+        try:
+            for df in frames:
+                merged = self.store.merge_many(self._transactions_from_df(df), occurrences)
+                totals["inserted"] += merged["inserted"]
+                totals["skipped"] += merged["skipped"]
+        finally:
+            # Chunks merged before a failure stay; uploading the file again skips them
+            if totals["inserted"]:
+                self._dirty = True
+                self._save_ledger()
+
+        print(f"✅ Merged {totals['inserted']} new transactions ({totals['skipped']} already in the ledger).")
+        return totals
+
+    @staticmethod
+    def _transactions_from_df(df: pd.DataFrame) -> List[Dict]:
+        if df.empty or not all(col in df.columns for col in ['date', 'description', 'amount']):
+            return []
+
+        df_clean = df[df['amount'].notna() & (df['amount'] != 0)]
+        if df_clean.empty:
+            return []
+
         amounts = df_clean['amount'].abs().values
         txn_types = ["credit" if x > 0 else "debit" for x in df_clean["amount"]]
         dates = pd.to_datetime(df_clean["date"]).dt.strftime("%-m/%-d/%y").values
         descriptions = df_clean["description"].fillna("No Description").astype(str).values
-    
-        new_transactions = []
-        balance_delta = 0.0
-    
-        for i in range(len(amounts)):
-            amount = float(amounts[i])
-            txn_type = txn_types[i]
-            if txn_type == "credit":
-                balance_delta += amount
-            else:
-                balance_delta -= amount
-    
-            new_transactions.append({
-                "amount": amount,
-                "type": txn_type,
+
+        transactions = [
+            {
+                "amount": float(amounts[i]),
+                "type": txn_types[i],
                 "desc": descriptions[i],
                 "date": dates[i]
-            })
-    
-        # ✅ Write fresh transactions
-        self.ledger["balance"] = balance_delta
-        self.ledger["history"] = new_transactions
-        self._save_ledger()
-    
-        print(f"✅ Replaced ledger with {len(new_transactions)} transactions.")
-    
+            }
+            for i in range(len(amounts))
+        ]
+
+        # Bank reference, when the mapper found one: only used to fingerprint for merges
+        if "reference" in df_clean.columns:
+            for txn, ref in zip(transactions, df_clean["reference"].values):
+                if pd.notna(ref) and str(ref).strip():
+                    txn["ref"] = str(ref).strip()
+        return transactions
+
     def get_balance(self) -> float:
-        return self.ledger["balance"]
-    
+        return self.store.balance
+
     def get_history(self) -> List[Dict]:
-        return self.ledger["history"]
-    
+        return self.store.history()
+
+    def get_transactions(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                         txn_type: Optional[str] = None) -> List[Dict]:
+        """Indexed range query by date (YYYY-MM-DD bounds, inclusive) and optional type."""
+        return self.store.query_range(start_date, end_date, txn_type)
+
+    @property
+    def version(self) -> int:
+        return self.store.version
+
     def reset(self) -> None:
-        self.ledger = {"balance": 0.0, "history": []}
+        self.store.reset()
         self._dirty = True
         self._save_ledger()
-    
+
     def save(self) -> None:
         """Explicitly save the ledger if needed."""
         self._save_ledger()
-    
+
+    def export_json(self, json_path: Optional[str] = None) -> None:
+        """Write the ledger in its legacy JSON shape (defaults to ledger_path)."""
+        self.store.export_json(json_path or self.ledger_path)
+
     def __enter__(self):
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._save_ledger()  # Ensure save on context exit
@@ -0,0 +1,152 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from ledger.ledger_store import LedgerStore
+
+LEDGER_PATH = Path("ledger/ledger.json")
+
+LEDGER_COLUMNS = ["amount", "type", "desc", "date"]
+TXN_TYPES = pd.CategoricalDtype(["credit", "debit"])
+
+
+class LedgerRepository:
+    """
+    Parses the ledger once into a normalized, typed DataFrame and serves it
+    to every reader until the store's file mtime or version counter changes.
+    """
+
+    def __init__(self, ledger_path: str = str(LEDGER_PATH), db_path: Optional[str] = None):
+        self.ledger_path = str(ledger_path)
+        self.db_path = db_path or str(Path(ledger_path).with_suffix(".db"))
+        self._store: Optional[LedgerStore] = None
+        self._frame: Optional[pd.DataFrame] = None
+        self._token: Optional[Tuple] = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> LedgerStore:
+        if self._store is None:
+            self._store = LedgerStore(self.db_path)
+            self._store.migrate_from_json(self.ledger_path)
+        return self._store
+
+    def _mtime(self, path: str) -> float:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _current_token(self) -> Tuple:
+        # WAL-mode writes land in the -wal file first, so watch both files
+        return (
+            self._mtime(self.db_path),
+            self._mtime(self.db_path + "-wal"),
+            self.store.version,
+        )
+
+    @property
+    def version(self) -> int:
+        return self.store.version
+
+    @property
+    def frame_version(self) -> Optional[int]:
+        """Store version the cached frame was built from (None before the first build)."""
+        token = self._token
+        return token[2] if token else None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.ledger_path) or self.store.count() > 0
+
+    def frame(self, copy: bool = True) -> pd.DataFrame:
+        """
+        Ledger history as a DataFrame with float64 ``amount``, categorical
+        ``type``, string ``desc`` and datetime64 ``date``. Pass copy=False
+        only if the caller will not mutate the result.
+        """
+        with self._lock:
+            token = self._current_token()
+            if self._frame is None or token != self._token:
+                self._frame = self._build_frame()
+                self._token = token
+            frame = self._frame
+        return frame.copy() if copy else frame
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._frame = None
+            self._token = None
+
+    def _build_frame(self) -> pd.DataFrame:
+        cols = self.store.columns()
+        df = pd.DataFrame({
+            "amount": pd.Series(cols["amount"], dtype="float64"),
+            "type": pd.Series(cols["type"], dtype=TXN_TYPES),
+            "desc": pd.Series(cols["desc"], dtype="object"),
+            # The store keeps a pre-normalized ISO day, so one fixed-format parse suffices
+            "date": pd.to_datetime(pd.Series(cols["day"], dtype="object"), format="%Y-%m-%d", errors="coerce"),
+        })
+        return df
+
+    # ─── Rollups ─────────────────────────────────
+    # Served from the store's materialized tables; nothing regroups the history
+
+    def daily_cashflow(self) -> pd.DataFrame:
+        """One row per day with activity: ``date`` (datetime64) and net ``cashflow`` (credits - debits)."""
+        rows = self.store.daily_totals()
+        return pd.DataFrame({
+            "date": pd.to_datetime(pd.Series([r["day"] for r in rows], dtype="object"), format="%Y-%m-%d"),
+            "cashflow": pd.Series([r["net"] for r in rows], dtype="float64"),
+        })
+
+    def monthly_income_expense(self) -> pd.DataFrame:
+        """``month`` (YYYY-MM), ``income`` and ``expense`` per month, oldest first."""
+        rows = self.store.monthly_totals()
+        if not rows:
+            return pd.DataFrame({"month": pd.Series(dtype="object"), "income": pd.Series(dtype="float64"),
+                                 "expense": pd.Series(dtype="float64")})
+        monthly = (
+            pd.DataFrame(rows)
+            .pivot_table(index="month", columns="type", values="amount", aggfunc="sum", fill_value=0.0)
+            .reindex(columns=["credit", "debit"], fill_value=0.0)
+            .rename(columns={"credit": "income", "debit": "expense"})
+            .reset_index()
+        )
+        monthly.columns.name = None
+        return monthly
+
+    def top_counterparties(self, txn_type: str, limit: int = 3) -> List[Dict]:
+        """Largest ``[{"source", "amount"}]`` for "credit"/"income" or "debit"/"expense"."""
+        txn_type = {"income": "credit", "expense": "debit"}.get(txn_type, txn_type)
+        return [
+            {"source": r["counterparty"], "amount": r["amount"]}
+            for r in self.store.counterparty_totals(txn_type, limit)
+        ]
+
+    def income_expense_totals(self) -> Dict[str, float]:
+        totals = self.store.type_totals()
+        return {"income": totals["credit"], "expense": totals["debit"]}
+
+
+def with_income_expense_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Relabel credit/debit as income/expense, the vocabulary the dashboards use."""
+    df["type"] = df["type"].cat.rename_categories({"credit": "income", "debit": "expense"})
+    return df
+
+
+_repositories: Dict[str, LedgerRepository] = {}
+_repositories_lock = threading.Lock()
+
+
+def get_ledger_repository(ledger_path: str = str(LEDGER_PATH)) -> LedgerRepository:
+    """Get the process-wide LedgerRepository for a ledger path."""
+    key = os.path.abspath(str(ledger_path))
+    with _repositories_lock:
+        repo = _repositories.get(key)
+        if repo is None:
+            repo = LedgerRepository(str(ledger_path))
+            _repositories[key] = repo
+    return repo
@@ -0,0 +1,584 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+# Date layouts seen in ledger.json (bulk_apply_df writes %-m/%-d/%y, CSV imports keep the bank's own)
+_DAY_FORMATS = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y",
+    "%d-%b-%y", "%d-%b-%Y", "%d/%m/%Y", "%Y/%m/%d",
+]
+
+EXPORT_BATCH_ROWS = 5000
+
+# SQLite's default cap on bound parameters is 999
+_LOOKUP_BATCH = 500
+
+_DESC_NOISE = re.compile(r"[^a-z0-9]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    amount REAL NOT NULL,
+    type TEXT NOT NULL,
+    desc TEXT,
+    date TEXT,
+    day TEXT,
+    balance_after REAL NOT NULL,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions(day);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions(type, day);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT PRIMARY KEY,
+    credit_cents INTEGER NOT NULL DEFAULT 0,
+    debit_cents INTEGER NOT NULL DEFAULT 0,
+    txns INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS monthly_rollup (
+    month TEXT NOT NULL,
+    type TEXT NOT NULL,
+    cents INTEGER NOT NULL DEFAULT 0,
+    txns INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, type)
+);
+CREATE TABLE IF NOT EXISTS counterparty_rollup (
+    counterparty TEXT NOT NULL,
+    type TEXT NOT NULL,
+    cents INTEGER NOT NULL DEFAULT 0,
+    txns INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (counterparty, type)
+);
+CREATE INDEX IF NOT EXISTS idx_counterparty_rollup_rank ON counterparty_rollup(type, cents);
+"""
+
+_CENTS = "CAST(ROUND(amount * 100) AS INTEGER)"
+
+# Each rollup folds in the transactions with id > ? (0 rebuilds it from scratch).
+# Undated rows count towards counterparties but have no day or month.
+_ROLLUP_UPSERTS = [
+    f"""INSERT INTO daily_rollup (day, credit_cents, debit_cents, txns)
+        SELECT day,
+               SUM(CASE WHEN type = 'credit' THEN {_CENTS} ELSE 0 END),
+               SUM(CASE WHEN type = 'debit' THEN {_CENTS} ELSE 0 END),
+               COUNT(*)
+        FROM transactions WHERE id > ? AND day IS NOT NULL GROUP BY day
+        ON CONFLICT(day) DO UPDATE SET
+            credit_cents = credit_cents + excluded.credit_cents,
+            debit_cents = debit_cents + excluded.debit_cents,
+            txns = txns + excluded.txns""",
+    f"""INSERT INTO monthly_rollup (month, type, cents, txns)
+        SELECT substr(day, 1, 7), type, SUM({_CENTS}), COUNT(*)
+        FROM transactions WHERE id > ? AND day IS NOT NULL GROUP BY substr(day, 1, 7), type
+        ON CONFLICT(month, type) DO UPDATE SET
+            cents = cents + excluded.cents, txns = txns + excluded.txns""",
+    f"""INSERT INTO counterparty_rollup (counterparty, type, cents, txns)
+        SELECT COALESCE(desc, 'Unknown'), type, SUM({_CENTS}), COUNT(*)
+        FROM transactions WHERE id > ? GROUP BY COALESCE(desc, 'Unknown'), type
+        ON CONFLICT(counterparty, type) DO UPDATE SET
+            cents = cents + excluded.cents, txns = txns + excluded.txns""",
+]
+_ROLLUP_TABLES = ("daily_rollup", "monthly_rollup", "counterparty_rollup")
+
+
+def to_iso_day(date_value) -> Optional[str]:
+    """Normalize a ledger date string to YYYY-MM-DD for indexing (None if unparseable)."""
+    if date_value is None:
+        return None
+    text = str(date_value).strip()
+    for fmt in _DAY_FORMATS:
+        try:
+            return datetime.strptime(text[:19], fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    # Anything else ("05 Jan 2024", "25-04-2024", "2024-01-05T10:00:00"): let pandas infer it
+    return _inferred_iso_day(text)
+
+
+@lru_cache(maxsize=4096)
+def _inferred_iso_day(text: str) -> Optional[str]:
+    try:
+        parsed = pd.to_datetime(text, errors="coerce", format="mixed")
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return None if pd.isna(parsed) else parsed.strftime("%Y-%m-%d")
+
+
+def transaction_fingerprint(record: Dict) -> str:
+    """
+    Identity of a transaction for merge dedupe: its day, signed amount in
+    cents, and bank reference if it has one, else its description with case,
+    punctuation and spacing normalized away.
+    """
+    cents = round(float(record["amount"]) * 100)
+    signed = cents if record["type"] == "credit" else -cents
+    date = str(record["date"])
+    ref = str(record.get("ref") or "").strip()
+    label = f"ref:{ref.lower()}" if ref else _DESC_NOISE.sub(" ", str(record.get("desc") or "").lower()).strip()
+    return hashlib.sha1(f"{to_iso_day(date) or date.strip()}|{signed}|{label}".encode("utf-8")).hexdigest()
+
+
+def _fingerprint_all(records: Sequence[Dict], occurrences: Dict[str, int]) -> List[str]:
+    """Stored fingerprints for a batch; ``occurrences`` carries the per-transaction counts across batches."""
+    fingerprints = []
+    for rec in records:
+        base = transaction_fingerprint(rec)
+        n = occurrences.get(base, 0)
+        occurrences[base] = n + 1
+        fingerprints.append(f"{base}:{n}")
+    return fingerprints
+
+
+class LedgerStore:
+    """
+    SQLite storage for the ledger: O(1) appends, indexes on date and type,
+    and a running balance maintained alongside every insert.
+    """
+
+    def __init__(self, db_path: str = "ledger/ledger.db"):
+        self.db_path = str(db_path)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._ingest_lock = threading.Lock()  # One staged replace at a time
+        self.undated_rows = 0  # Rows written this session whose date couldn't be parsed
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_schema()
+        self._conn.commit()
+
+    def _migrate_schema(self) -> None:
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(transactions)")}
+        if "fingerprint" not in columns:
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN fingerprint TEXT")
+        # Rows from before this column are fingerprinted by the next merge (see _backfill_fingerprints)
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint ON transactions(fingerprint)"
+        )
+        if self._get_meta("rollups_built", "0") != "1":
+            # Ledgers from before the rollup tables: build them once from history
+            self._rebuild_rollups()
+            self._set_meta("rollups_built", "1")
+        if self._backfill_days():
+            self._rebuild_rollups()
+
+    def _backfill_days(self) -> int:
+        """Give a day to undated rows whose date the parser has since learned to read."""
+        undated = self._conn.execute(
+            "SELECT id, date FROM transactions WHERE day IS NULL AND date IS NOT NULL"
+        ).fetchall()
+        updates = [(day, row["id"]) for row in undated if (day := to_iso_day(row["date"]))]
+        self._conn.executemany("UPDATE transactions SET day = ? WHERE id = ?", updates)
+        if updates:
+            print(f"✅ Dated {len(updates)} ledger rows that had no day")
+        return len(updates)
+
+    # ─── Meta ────────────────────────────────────
+
+    def _get_meta(self, key: str, default: str) -> str:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def _bump_version(self) -> None:
+        self._set_meta("version", self.version + 1)
+
+    @property
+    def balance(self) -> float:
+        with self._lock:
+            return float(self._get_meta("balance", "0"))
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter incremented on every write."""
+        with self._lock:
+            return int(self._get_meta("version", "0"))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    # ─── Writes ──────────────────────────────────
+
+    def append(self, amount: float, txn_type: str, description: str, date: str) -> None:
+        self.append_many([{"amount": amount, "type": txn_type, "desc": description, "date": date}])
+
+    def _prepare_rows(self, records: Iterable[Dict], balance: float,
+                      fingerprints: Optional[Sequence[str]] = None):
+        rows = []
+        undated = 0
+        for i, rec in enumerate(records):
+            amount = float(rec["amount"])
+            txn_type = rec["type"]
+            if txn_type == "debit":
+                balance -= amount
+            elif txn_type == "credit":
+                balance += amount
+            else:
+                raise ValueError("txn_type must be 'debit' or 'credit'")
+            date = str(rec["date"])
+            fingerprint = fingerprints[i] if fingerprints is not None else None
+            day = to_iso_day(date)
+            if day is None:
+                undated += 1
+            rows.append((amount, txn_type, rec.get("desc"), date, day, balance, fingerprint))
+        if undated:
+            # Still stored, but left out of date ranges and the daily/monthly rollups
+            self.undated_rows += undated
+            print(f"⚠️ {undated} ledger rows have an unreadable date and were stored without a day")
+        return rows, balance
+
+    def _insert_rows(self, rows: List[tuple]) -> None:
+        last_id = self._last_id()
+        self._conn.executemany(
+            "INSERT INTO transactions (amount, type, desc, date, day, balance_after, fingerprint) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self._apply_rollups(last_id)
+
+    def _clear_transactions(self) -> None:
+        self._conn.execute("DELETE FROM transactions")
+        for table in _ROLLUP_TABLES:
+            self._conn.execute(f"DELETE FROM {table}")
+
+    def append_many(self, records: Iterable[Dict]) -> int:
+        """Append transactions in one SQLite transaction; returns how many were written."""
+        with self._lock:
+            rows, balance = self._prepare_rows(records, self.balance)
+            if not rows:
+                return 0
+            with self._conn:
+                self._insert_rows(rows)
+                self._set_meta("balance", balance)
+                self._bump_version()
+            return len(rows)
+
+    def replace_all(self, records: Iterable[Dict], balance: Optional[float] = None) -> int:
+        """Atomically swap the whole ledger for ``records``."""
+        records = list(records)
+        with self._lock:
+            rows, computed = self._prepare_rows(records, 0.0, _fingerprint_all(records, {}))
+            with self._conn:
+                self._clear_transactions()
+                self._insert_rows(rows)
+                self._set_meta("balance", computed if balance is None else balance)
+                self._bump_version()
+            return len(rows)
+
+    def replace_all_chunked(self, chunks: Iterable[Iterable[Dict]]) -> int:
+        """
+        Swap the whole ledger for a stream of record batches. Batches are
+        staged in a temp table as they arrive, so the live ledger stays
+        readable while a large file is parsed, then swapped in with one short
+        transaction. Nothing changes if the stream raises or yields no records.
+        """
+        with self._ingest_lock:
+            with self._lock:
+                self._conn.execute("DROP TABLE IF EXISTS temp.staged_transactions")
+                self._conn.execute(
+                    "CREATE TEMP TABLE staged_transactions AS "
+                    "SELECT amount, type, desc, date, day, balance_after, fingerprint FROM transactions WHERE 0"
+                )
+            try:
+                balance, staged = 0.0, 0
+                occurrences: Dict[str, int] = {}
+                for records in chunks:
+                    records = list(records)
+                    rows, balance = self._prepare_rows(records, balance, _fingerprint_all(records, occurrences))
+                    if not rows:
+                        continue
+                    with self._lock, self._conn:
+                        self._conn.executemany(
+                            "INSERT INTO staged_transactions VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                        )
+                    staged += len(rows)
+
+                if staged:
+                    with self._lock, self._conn:
+                        self._clear_transactions()
+                        self._conn.execute(
+                            "INSERT INTO transactions (amount, type, desc, date, day, balance_after, fingerprint) "
+                            "SELECT amount, type, desc, date, day, balance_after, fingerprint "
+                            "FROM staged_transactions ORDER BY rowid"
+                        )
+                        self._apply_rollups(0)
+                        self._set_meta("balance", balance)
+                        self._bump_version()
+                return staged
+            finally:
+                with self._lock:
+                    self._conn.execute("DROP TABLE IF EXISTS temp.staged_transactions")
+
+    # ─── Merge ───────────────────────────────────
+    #
+    # A stored fingerprint is "<transaction_fingerprint>:<n>", n counting
+    # identical transactions (two same-day coffees) in ledger order, so
+    # uploads of overlapping statements line up row for row. Bulk writes
+    # fingerprint as they insert; single appends are left NULL and
+    # fingerprinted by the next merge.
+
+    def _occurrences(self, base: str) -> int:
+        """How many ledger rows already carry ``base`` (their n runs 0..count-1)."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM transactions WHERE fingerprint >= ? AND fingerprint < ?",
+            (base + ":", base + ";")
+        ).fetchone()[0]
+
+    def _backfill_fingerprints(self) -> int:
+        """Fingerprint rows written by append/replace since the last merge."""
+        pending = self._conn.execute(
+            "SELECT id, amount, type, desc, date FROM transactions WHERE fingerprint IS NULL ORDER BY id"
+        ).fetchall()
+        next_n: Dict[str, int] = {}
+        updates = []
+        for row in pending:
+            base = transaction_fingerprint(self._to_record(row))
+            n = next_n[base] if base in next_n else self._occurrences(base)
+            next_n[base] = n + 1
+            updates.append((f"{base}:{n}", row["id"]))
+        self._conn.executemany("UPDATE transactions SET fingerprint = ? WHERE id = ?", updates)
+        return len(updates)
+
+    def _existing_fingerprints(self, fingerprints: Sequence[str]) -> set:
+        found = set()
+        for i in range(0, len(fingerprints), _LOOKUP_BATCH):
+            batch = fingerprints[i:i + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(r[0] for r in self._conn.execute(
+                f"SELECT fingerprint FROM transactions WHERE fingerprint IN ({placeholders})", batch
+            ))
+        return found
+
+    def merge_many(self, records: Iterable[Dict], occurrences: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Append only the records not already in the ledger, matched by
+        fingerprint through the unique index. Returns {"inserted", "skipped"}.
+        Pass the same ``occurrences`` dict for every chunk of one upload so
+        repeated transactions are counted across chunk boundaries.
+        """
+        records = list(records)
+        fingerprints = _fingerprint_all(records, {} if occurrences is None else occurrences)
+
+        with self._lock:
+            with self._conn:
+                self._backfill_fingerprints()
+                existing = self._existing_fingerprints(fingerprints)
+                fresh = [i for i, fp in enumerate(fingerprints) if fp not in existing]
+                rows, balance = self._prepare_rows([records[i] for i in fresh], self.balance,
+                                                   [fingerprints[i] for i in fresh])
+                if rows:
+                    self._insert_rows(rows)
+                    self._set_meta("balance", balance)
+                    self._bump_version()
+        return {"inserted": len(rows), "skipped": len(records) - len(rows)}
+
+    def reset(self) -> None:
+        with self._lock:
+            with self._conn:
+                self._clear_transactions()
+                self._set_meta("balance", 0.0)
+                self._bump_version()
+
+    # ─── Rollups ─────────────────────────────────
+    #
+    # Daily net cashflow, monthly totals by type and per-counterparty totals,
+    # kept in integer cents and updated in the same SQLite transaction as
+    # every write, so readers never regroup the raw history.
+
+    def _last_id(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+
+    def _apply_rollups(self, after_id: int) -> None:
+        for upsert in _ROLLUP_UPSERTS:
+            self._conn.execute(upsert, (after_id,))
+
+    def _rebuild_rollups(self) -> None:
+        for table in _ROLLUP_TABLES:
+            self._conn.execute(f"DELETE FROM {table}")
+        self._apply_rollups(0)
+
+    def rebuild_rollups(self) -> None:
+        """Recompute every rollup from the transactions table."""
+        with self._lock, self._conn:
+            self._rebuild_rollups()
+
+    def daily_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+        """Per-day credit, debit, net and transaction count, oldest first (days with activity only)."""
+        clauses, params = [], []
+        if start_date:
+            clauses.append("day >= ?")
+            params.append(to_iso_day(start_date) or start_date)
+        if end_date:
+            clauses.append("day <= ?")
+            params.append(to_iso_day(end_date) or end_date)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT day, credit_cents, debit_cents, txns FROM daily_rollup {where} ORDER BY day", params
+            ).fetchall()
+        return [
+            {
+                "day": r["day"],
+                "credit": r["credit_cents"] / 100,
+                "debit": r["debit_cents"] / 100,
+                "net": (r["credit_cents"] - r["debit_cents"]) / 100,
+                "txns": r["txns"],
+            }
+            for r in rows
+        ]
+
+    def monthly_totals(self) -> List[Dict]:
+        """Per-month (YYYY-MM) totals by type, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT month, type, cents, txns FROM monthly_rollup ORDER BY month, type"
+            ).fetchall()
+        return [{"month": r["month"], "type": r["type"], "amount": r["cents"] / 100, "txns": r["txns"]} for r in rows]
+
+    def counterparty_totals(self, txn_type: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Totals per description (None counts as "Unknown"), largest first, optionally for one type."""
+        where = "WHERE type = ?" if txn_type else ""
+        params: list = [txn_type] if txn_type else []
+        if limit is not None:
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT counterparty, type, cents, txns FROM counterparty_rollup {where} "
+                f"ORDER BY cents DESC, counterparty{' LIMIT ?' if limit is not None else ''}",
+                params
+            ).fetchall()
+        return [
+            {"counterparty": r["counterparty"], "type": r["type"], "amount": r["cents"] / 100, "txns": r["txns"]}
+            for r in rows
+        ]
+
+    def type_totals(self) -> Dict[str, float]:
+        """All-time {"credit": total, "debit": total}, undated transactions included."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, SUM(cents) AS cents FROM counterparty_rollup GROUP BY type"
+            ).fetchall()
+        totals = {"credit": 0.0, "debit": 0.0}
+        totals.update({r["type"]: r["cents"] / 100 for r in rows})
+        return totals
+
+    # ─── Reads ───────────────────────────────────
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict:
+        return {"amount": row["amount"], "type": row["type"], "desc": row["desc"], "date": row["date"]}
+
+    def history(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT amount, type, desc, date FROM transactions ORDER BY id"
+            ).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def columns(self) -> Dict[str, list]:
+        """Column-oriented dump (amount, type, desc, date, day) for building DataFrames."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT amount, type, desc, date, day FROM transactions ORDER BY id"
+            ).fetchall()
+        names = ("amount", "type", "desc", "date", "day")
+        return {name: [r[i] for r in rows] for i, name in enumerate(names)}
+
+    def query_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    txn_type: Optional[str] = None) -> List[Dict]:
+        """
+        Transactions whose date falls in [start_date, end_date] (YYYY-MM-DD,
+        either bound optional), optionally filtered by type. Each record also
+        carries the running balance after it was applied.
+        """
+        clauses, params = [], []
+        if start_date:
+            clauses.append("day >= ?")
+            params.append(to_iso_day(start_date) or start_date)
+        if end_date:
+            clauses.append("day <= ?")
+            params.append(to_iso_day(end_date) or end_date)
+        if txn_type:
+            clauses.append("type = ?")
+            params.append(txn_type)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT amount, type, desc, date, balance_after FROM transactions {where} ORDER BY day, id",
+                params
+            ).fetchall()
+        return [{**self._to_record(r), "balance_after": r["balance_after"]} for r in rows]
+
+    # ─── JSON interop ────────────────────────────
+
+    def to_json_dict(self) -> Dict:
+        return {"balance": self.balance, "history": self.history()}
+
+    def export_json(self, json_path: str) -> None:
+        """Write a compacted snapshot in the legacy ledger.json shape."""
+        json_path = Path(json_path)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = json_path.with_suffix(json_path.suffix + ".tmp")
+        # Same output as json.dump(self.to_json_dict(), f, indent=2), streamed
+        # row by row so the snapshot never holds the whole ledger in memory
+        with self._lock, open(tmp_path, "w") as f:
+            f.write('{\n  "balance": %s,\n  "history": [' % json.dumps(self.balance))
+            cursor = self._conn.execute("SELECT amount, type, desc, date FROM transactions ORDER BY id")
+            separator = "\n"
+            wrote_any = False
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                for row in rows:
+                    record = json.dumps(self._to_record(row), indent=2).replace("\n", "\n    ")
+                    f.write(separator + "    " + record)
+                    separator = ",\n"
+                wrote_any = True
+            f.write("\n  ]\n}" if wrote_any else "]\n}")
+        os.replace(tmp_path, json_path)
+
+    def import_json(self, json_path: str) -> int:
+        """Load a legacy ledger.json into an empty store (one-time migration)."""
+        with open(json_path, "r") as f:
+            raw = json.load(f)
+        # Keep the stored balance authoritative even if history was hand-edited
+        balance = raw.get("balance")
+        return self.replace_all(raw.get("history", []), None if balance is None else float(balance))
+
+    def migrate_from_json(self, json_path: str) -> None:
+        with self._lock:
+            if self._get_meta("json_migrated", "0") == "1":
+                return
+            if self.count() == 0 and os.path.exists(json_path):
+                written = self.import_json(json_path)
+                print(f"✅ Migrated {written} transactions from {json_path} into {self.db_path}")
+            with self._conn:
+                self._set_meta("json_migrated", "1")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
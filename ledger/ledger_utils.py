@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
-import json
 from pathlib import Path
+from typing import Optional
+from pandas.api.types import is_datetime64_any_dtype
+from ledger.ledger_repository import get_ledger_repository
 
 LEDGER_PATH = Path("ledger/ledger.json")
 
@@ -8,15 +11,9 @@ def load_ledger_summary():
     if not LEDGER_PATH.exists():
         return {"gross_income": 0.0, "total_expenses": 0.0, "net_profit": 0.0}
 
-    with open(LEDGER_PATH, "r") as f:
-        data = json.load(f)
-
-    if not isinstance(data, list):
-        return {"gross_income": 0.0, "total_expenses": 0.0, "net_profit": 0.0}
-
-    df = pd.DataFrame(data)
-    gross_income = df[df["type"] == "income"]["amount"].sum()
-    total_expenses = df[df["type"] == "expense"]["amount"].sum()
+    totals = get_ledger_repository(LEDGER_PATH).income_expense_totals()
+    gross_income = totals["income"]
+    total_expenses = totals["expense"]
     net_profit = gross_income - total_expenses
 
     return {
@@ -24,3 +21,34 @@ def load_ledger_summary():
         "total_expenses": round(total_expenses, 2),
         "net_profit": round(net_profit, 2)
     }
+
+
+def normalize_transactions(df: pd.DataFrame, date_format: Optional[str] = None,
+                           min_amount: float = 0.01) -> pd.DataFrame:
+    """
+    Vectorized ledger normalization: adds Date, Credit, Debit, signed Amount
+    (debits negative) and Description to a frame with amount/type/desc/date
+    columns, dropping rows whose |Amount| is not above ``min_amount``.
+
+    ``date`` is parsed with a single to_datetime call (explicit ``date_format``
+    or pandas' inferred one) unless it is already datetime64.
+    """
+    out = df.copy()
+
+    dates = out["date"]
+    if not is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=date_format, errors="coerce")
+    out["Date"] = dates
+
+    amount = pd.to_numeric(out["amount"], errors="coerce").to_numpy(dtype="float64")
+    # .str on a categorical lowercases the categories, not every row
+    txn_type = out["type"].str.lower()
+    is_credit = (txn_type == "credit").to_numpy(dtype=bool)
+    is_debit = (txn_type == "debit").to_numpy(dtype=bool)
+
+    out["Credit"] = np.where(is_credit, amount, 0.0)
+    out["Debit"] = np.where(is_debit, amount, 0.0)
+    out["Amount"] = np.where(is_debit, -amount, amount)
+    out["Description"] = out["desc"].astype(str).str.strip()
+
+    return out[np.abs(out["Amount"].to_numpy()) > min_amount].copy()
@@ -1,26 +1,25 @@
 import os
+import queue
 import time
-import torch
-import torchaudio
 import requests
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
-from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
-from transformers import pipeline
-import librosa
-import numpy as np
 
 from router_factory import get_intent_router
 from utils.business_profile import load_profile, save_profile, needs_profile_info, get_next_missing_field, set_profile_field
-from flask import Flask, request
+from flask import Flask, jsonify, request
 from financial_bot import FinancialBot
 from invoice_reminder.handler import invoice_routes
-from invoice_reminder.whatsapp import send_whatsapp_prompt
+from invoice_reminder.whatsapp import TWILIO_WHATSAPP_FROM, send_whatsapp_prompt
 from utils.file_manager import get_file_manager
-from utils.csv_validator import validate_csv
-from utils.column_mapper import map_columns
+from utils.job_queue import get_webhook_queue
+from utils.media_fetcher import AUDIO_KINDS, get_media_fetcher
+from utils.warmup import WARMUP_COMPONENTS, get_warmup_manager
+from utils.asr_engine import get_asr_engine, FAILED_PREFIXES
+from utils.csv_ingest import ingest_csv
 from ledger.ledger_manager import LedgerManager
+from ledger.ledger_repository import get_ledger_repository
 from config.settings import (
     TWILIO_ACCOUNT_SID, 
     TWILIO_AUTH_TOKEN,
@@ -28,15 +27,22 @@ from config.settings import (
     GRANITE_ENDPOINT
 )
 from twilio.twiml.messaging_response import MessagingResponse
-from message_router import route_user_message
 
 app = Flask(__name__)
 bot = FinancialBot()
 file_manager = get_file_manager()
 intent_router = get_intent_router(bot, use_llm=True)
-file_manager = get_file_manager()
+asr_engine = get_asr_engine()
+webhook_queue = get_webhook_queue()
 LEDGER_PATH = Path("ledger/ledger.json")
 
+# Async replies go out through send_whatsapp_prompt, which needs TWILIO_WHATSAPP_FROM; without it
+# the webhook answers inside the request. FINNY_WEBHOOK_ASYNC=0/1 overrides the default.
+_webhook_async_env = os.getenv("FINNY_WEBHOOK_ASYNC")
+WEBHOOK_ASYNC = bool(TWILIO_WHATSAPP_FROM) if _webhook_async_env is None else _webhook_async_env != "0"
+if WEBHOOK_ASYNC and not TWILIO_WHATSAPP_FROM:
+    raise RuntimeError("FINNY_WEBHOOK_ASYNC=1 needs TWILIO_WHATSAPP_FROM (e.g. whatsapp:+14155238886) to send replies")
+
 # Create temp directory for voice files
 TEMP_VOICE_DIR = Path("temp_voice")
 TEMP_VOICE_DIR.mkdir(exist_ok=True)
@@ -60,14 +66,13 @@ def download_voice_file(media_url: str, user_id: str, auth_tuple: tuple) -> Path
         
         print(f"Downloading voice file to: {filename}")
         
-        # Download file with authentication
-        response = requests.get(media_url, auth=auth_tuple, timeout=30, allow_redirects=True)
-        response.raise_for_status()  # Raise exception for bad status codes
-        
-        # Save the downloaded content
-        filename.write_bytes(response.content)
+        # Stream to disk with authentication (pooled session, size limit, retries)
+        media = get_media_fetcher().fetch_to_file(media_url, filename, auth=auth_tuple)
+        if media["kind"] in AUDIO_KINDS and filename.suffix != f".{media['kind']}":
+            # Twilio media URLs carry no extension; name the file after what was actually sent
+            filename = filename.rename(filename.with_suffix(f".{media['kind']}"))
         
-        print(f"Voice file downloaded successfully: {filename.stat().st_size} bytes")
+        print(f"Voice file downloaded successfully: {media['size']} bytes")
         return filename
         
     except requests.exceptions.RequestException as e:
@@ -77,94 +82,9 @@ def download_voice_file(media_url: str, user_id: str, auth_tuple: tuple) -> Path
         print(f"Voice file download error: {e}")
         return None
 
-def load_and_preprocess_audio(file_path):
-    """
-    Load and preprocess audio file using librosa (handles OGG and most formats)
-    
-    Args:
-        file_path (str or Path): Path to audio file
-    
-    Returns:
-        numpy array: Preprocessed audio array at 16kHz, mono
-    """
-    try:
-        file_path = Path(file_path)
-        print(f"Loading audio file: {file_path}")
-        
-        # Check if file exists and has content
-        if not file_path.exists():
-            print(f"Audio file does not exist: {file_path}")
-            return None
-            
-        file_size = file_path.stat().st_size
-        if file_size == 0:
-            print(f"Audio file is empty: {file_path}")
-            return None
-            
-        print(f"File size: {file_size} bytes")
-        
-        # Method 1: Try librosa (handles OGG, MP3, WAV, etc.)
-        try:
-            print("Attempting to load with librosa...")
-            waveform, sample_rate = librosa.load(
-                str(file_path), 
-                sr=16000,  # Resample to 16kHz
-                mono=True,  # Convert to mono
-                dtype=np.float32
-            )
-            
-            print(f"Librosa successful: shape={waveform.shape}, sr={sample_rate}")
-            
-            # Validate audio data
-            if len(waveform) == 0:
-                print("Loaded audio is empty")
-                return None
-                
-            # Check for very short audio (less than 0.1 seconds)
-            if len(waveform) < 0.1 * 16000:
-                print(f"Audio too short: {len(waveform)/16000:.2f} seconds")
-                return None
-                
-            return waveform
-            
-        except Exception as librosa_error:
-            print(f"Librosa loading failed: {librosa_error}")
-            
-            # Method 2: Fallback to torchaudio (for WAV files mainly)
-            try:
-                print("Falling back to torchaudio...")
-                waveform, original_sample_rate = torchaudio.load(str(file_path))
-                
-                # Convert to mono if stereo
-                if waveform.shape[0] > 1:
-                    waveform = torch.mean(waveform, dim=0, keepdim=True)
-                
-                # Resample to 16kHz if needed
-                if original_sample_rate != 16000:
-                    print(f"Resampling from {original_sample_rate} to 16000 Hz")
-                    resampler = torchaudio.transforms.Resample(
-                        orig_freq=original_sample_rate, 
-                        new_freq=16000
-                    )
-                    waveform = resampler(waveform)
-                
-                audio_array = waveform.squeeze().numpy()
-                print(f"Torchaudio successful: shape={audio_array.shape}")
-                return audio_array
-                
-            except Exception as torchaudio_error:
-                print(f"Torchaudio fallback failed: {torchaudio_error}")
-                return None
-    
-    except Exception as e:
-        print(f"Audio loading error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
 def transcribe_audio_medium(file_path):
     """
-    Transcribe audio using Whisper small model
+    Transcribe audio using the resident Granite speech model (Whisper tiny fallback)
     
     Args:
         file_path (str): Path to audio file
@@ -172,68 +92,11 @@ def transcribe_audio_medium(file_path):
     Returns:
         str: Transcribed text
     """
-    try:
-        print(f"Starting transcription for: {file_path}")
-        
-        # Load and preprocess audio
-        audio = load_and_preprocess_audio(file_path)
-        if audio is None:
-            return "Failed to load audio"
-        
-        print(f"Audio loaded for transcription: {len(audio)} samples, {len(audio)/16000:.2f} seconds")
-        
-        # Check for very short audio
-        if len(audio) < 0.3 * 16000:  # Less than 0.3 seconds
-            return "Audio too short for transcription"
-        
-        # Determine device
-        device = 0 if torch.cuda.is_available() else -1
-        torch_dtype = torch.float16 if device >= 0 else torch.float32
-        print(f"Using device: {'GPU' if device >= 0 else 'CPU'} with dtype: {torch_dtype}")
-        
-        # Initialize Whisper pipeline
-        try:
-            pipe = pipeline(
-                "automatic-speech-recognition",
-                model="ibm-granite/granite-speech-3.3-8b",
-                device=device,
-                torch_dtype=torch_dtype,
-                return_timestamps=False  # Don't need timestamps for this use case
-            )
-            
-            # Prepare input for the pipeline
-            inputs = {
-                "array": audio, 
-                "sampling_rate": 16000
-            }
-            
-            print("Running transcription...")
-            result = pipe(inputs)
-            
-            # Extract transcription text
-            transcription = result.get('text', '').strip()
-            print(f"Transcription result: '{transcription}'")
-            
-            # Return meaningful response
-            if not transcription:
-                return "No speech detected in audio"
-            
-            return transcription
-            
-        except Exception as pipeline_error:
-            print(f"Pipeline error: {pipeline_error}")
-            # Try with smaller model as fallback
-            return transcribe_audio_light(file_path)
-    
-    except Exception as e:
-        print(f"Transcription error: {e}")
-        import traceback
-        traceback.print_exc()
-        return "Transcription failed"
+    return asr_engine.transcribe(file_path)
 
 def transcribe_audio_light(file_path):
     """
-    Faster transcription using Whisper tiny model (fallback)
+    Faster transcription using the resident Whisper tiny model (fallback)
     
     Args:
         file_path (str): Path to audio file
@@ -241,38 +104,7 @@ def transcribe_audio_light(file_path):
     Returns:
         str: Transcribed text
     """
-    try:
-        print("Using light transcription (Whisper tiny)...")
-        
-        audio = load_and_preprocess_audio(file_path)
-        if audio is None:
-            return "Failed to load audio"
-        
-        if len(audio) < 0.3 * 16000:
-            return "Audio too short for transcription"
-        
-        device = 0 if torch.cuda.is_available() else -1
-        torch_dtype = torch.float16 if device >= 0 else torch.float32
-        
-        pipe = pipeline(
-            "automatic-speech-recognition",
-            model="openai/whisper-tiny",  # Much smaller and faster
-            device=device,
-            torch_dtype=torch_dtype,
-            return_timestamps=False
-        )
-        
-        inputs = {"array": audio, "sampling_rate": 16000}
-        result = pipe(inputs)
-        
-        transcription = result.get('text', '').strip()
-        print(f"Light transcription result: '{transcription}'")
-        
-        return transcription if transcription else "No speech detected"
-    
-    except Exception as e:
-        print(f"Light transcription error: {e}")
-        return "Transcription failed"
+    return asr_engine.transcribe(file_path, light=True)
 
 def cleanup_temp_file(file_path: Path):
     """
@@ -286,21 +118,20 @@ def cleanup_temp_file(file_path: Path):
         print(f"Failed to cleanup temp file {file_path}: {e}")
 
 def is_ledger_uploaded() -> bool:
-    return LEDGER_PATH.exists() and LEDGER_PATH.stat().st_size > 0
+    # Chat-added transactions reach SQLite before the ledger.json snapshot catches up
+    return get_ledger_repository(str(LEDGER_PATH)).exists()
 
 app.register_blueprint(invoice_routes, url_prefix="/invoice")
 
-@app.route("/twilio", methods=["POST"])
-def whatsapp_handler():
+def process_message(user_input: str, user_id: str, media_url: str = None, media_type: str = None) -> str:
+    """
+    Run one inbound WhatsApp message (text, voice note or upload) end to end
+    and return the reply text.
+    """
     temp_files_to_cleanup = []
     
     try:
-        user_input = request.form.get("Body", "").strip()
-        user_id = request.form.get("From")
-        media_url = request.form.get("MediaUrl0")
-        media_type = request.form.get("MediaContentType0")
-        
-        print(f"Received message from {user_id}")
+        print(f"Processing message from {user_id}")
         print(f"Media URL: {media_url}")
         print(f"Media Type: {media_type}")
         print(f"Text input: '{user_input}'")
@@ -321,7 +152,7 @@ def whatsapp_handler():
                     print(f"Transcription complete: '{transcription}'")
                     
                     # Check if transcription was successful
-                    if transcription and not transcription.startswith(("Transcription failed", "Failed to load", "Audio too short")):
+                    if transcription and not transcription.startswith(FAILED_PREFIXES):
                         # Use transcription as user input
                         user_input = transcription
                         print(f"Using transcription as input: '{user_input}'")
@@ -329,45 +160,33 @@ def whatsapp_handler():
                         # Handle transcription failure
                         error_msg = transcription if transcription else "Could not process voice message"
                         response = f"🎙 Sorry, I couldn't understand the voice message: {error_msg}\n\nPlease try again or send a text message."
-                        twiml = MessagingResponse()
-                        twiml.message(response)
-                        return str(twiml)
+                        return response
                         
                 else:
                     response = "🎙 Sorry, I couldn't download the voice message. Please try again or send text."
-                    twiml = MessagingResponse()
-                    twiml.message(response)
-                    return str(twiml)
+                    return response
 
             except Exception as voice_error:
                 print(f"Voice processing failed: {voice_error}")
                 import traceback
                 traceback.print_exc()
                 response = "🎙 Sorry, there was an error processing your voice message. Please try sending text instead."
-                twiml = MessagingResponse()
-                twiml.message(response)
-                return str(twiml)
+                return response
         if media_url:
             # 1. Handle CSV Upload (Ledger)
             if media_type == "text/csv":
                 response = handle_csv_upload(media_url, user_id)
-                twiml = MessagingResponse()
-                twiml.message(response)
-                return str(twiml)
+                return response
 
             # 2. Handle Invoice Image Upload
             if "image" in media_type or media_type == "application/pdf":
                 from invoice_reminder.handler import upload_invoice_from_url
                 response = upload_invoice_from_url(media_url, user_id)
-                twiml = MessagingResponse()
-                twiml.message(response)
-                return str(twiml)
+                return response
         # Check if ledger is uploaded
         if not is_ledger_uploaded():
             response = "📊 You haven't uploaded any transactions yet. Please upload your last 1 year bank transactions as a CSV file."
-            twiml = MessagingResponse()
-            twiml.message(response)
-            return str(twiml)
+            return response
 
         # Load business profile
         business_profile = load_profile()
@@ -375,9 +194,7 @@ def whatsapp_handler():
         # Check if we need to collect profile information
         if needs_profile_info(business_profile):
             response = handle_profile_collection(user_input, user_id, business_profile)
-            twiml = MessagingResponse()
-            twiml.message(response)
-            return str(twiml)
+            return response
 
         # Load transactions
         bot.load_ledger_json("ledger/ledger.json")
@@ -388,17 +205,13 @@ def whatsapp_handler():
             # 1. Handle CSV Upload (Ledger)
             if media_type == "text/csv":
                 response = handle_csv_upload(media_url, user_id)
-                twiml = MessagingResponse()
-                twiml.message(response)
-                return str(twiml)
+                return response
 
             # 2. Handle Invoice Image Upload
             if "image" in media_type or media_type == "application/pdf":
                 from invoice_reminder.handler import upload_invoice_from_url
                 response = upload_invoice_from_url(media_url, user_id)
-                twiml = MessagingResponse()
-                twiml.message(response)
-                return str(twiml)
+                return response
         '''
 
         # 3. Handle Text/Voice Commands
@@ -420,9 +233,7 @@ def whatsapp_handler():
         else:
             response = "Please send a message, voice note, or upload a file."
     
-        twiml = MessagingResponse()
-        twiml.message(response)
-        return str(twiml)
+        return response
         
     except Exception as e:
         print(f"Handler error: {e}")
@@ -430,15 +241,41 @@ def whatsapp_handler():
         traceback.print_exc()
         
         # Return a safe error response
-        twiml = MessagingResponse()
-        twiml.message("Sorry, there was an error processing your request. Please try again.")
-        return str(twiml)
+        return "Sorry, there was an error processing your request. Please try again."
         
     finally:
         # Clean up temporary files
         for temp_file in temp_files_to_cleanup:
             cleanup_temp_file(temp_file)
 
+def process_and_reply(user_input: str, user_id: str, media_url: str = None, media_type: str = None) -> None:
+    """Background job: process the message and deliver the reply over the Twilio REST API."""
+    response = process_message(user_input, user_id, media_url, media_type)
+    send_whatsapp_prompt(user_id, response)
+
+@app.route("/twilio", methods=["POST"])
+def whatsapp_handler():
+    user_input = request.form.get("Body", "").strip()
+    user_id = request.form.get("From")
+    media_url = request.form.get("MediaUrl0")
+    media_type = request.form.get("MediaContentType0")
+
+    print(f"Received message from {user_id}")
+
+    twiml = MessagingResponse()
+    if not WEBHOOK_ASYNC:
+        twiml.message(process_message(user_input, user_id, media_url, media_type))
+        return str(twiml)
+
+    try:
+        # Acknowledge right away; the reply is sent once a worker has run the message.
+        # Jobs are keyed on the sender so each user's messages run in order.
+        webhook_queue.submit(user_id, process_and_reply, user_input, user_id, media_url, media_type)
+    except queue.Full:
+        twiml.message("⏳ I'm handling a lot of messages right now. Please try again in a minute.")
+    return str(twiml)
+
+
 def handle_profile_collection(user_input: str, user_id: str, business_profile: dict) -> str:
     """
     Handle the business profile collection process via WhatsApp.
@@ -491,16 +328,23 @@ def handle_csv_upload(media_url: str, user_id: str = "default") -> str:
             return f"❌ File download failed: {result['error']}"
 
         file_path = result["file_path"]
-        validated_df = validate_csv(file_path)
-        normalized_df = normalize_messy_csv(validated_df)
-        standardized_df = map_columns(normalized_df)
 
+        # Streamed in chunks: validate → normalize → map → ledger, never the whole file in memory
         with LedgerManager() as ledger:
-            ledger.bulk_apply_df(standardized_df)
-            ledger._save_ledger()
+            stats = ingest_csv(file_path, ledger)
+        print(f"📊 CSV ingested: {stats['rows_out']} rows in {stats['chunks']} chunk(s), "
+              f"{stats['encoding']}/{stats['separator']!r}, {stats['elapsed_s']}s")
+
+        if stats["mode"] == "merge":
+            summary = f"📥 {stats['inserted']} new transaction(s) added"
+            if stats["skipped"]:
+                summary += f", {stats['skipped']} already in your ledger"
+        else:
+            summary = f"📥 Ledger replaced with {stats['inserted']} transaction(s)"
 
         return (
             "✅ CSV uploaded and processed successfully!\n"
+            f"{summary}\n"
             "Try:\n"
             "• 'forecast'\n"
             "• 'score'\n"
@@ -511,15 +355,48 @@ def handle_csv_upload(media_url: str, user_id: str = "default") -> str:
     except Exception as e:
         return f"❌ Error processing CSV: {str(e)}"
 
-def normalize_messy_csv(df: pd.DataFrame) -> pd.DataFrame:
-    if 'Date' in df.columns:
-        df['Date'] = df['Date'].ffill()
-    df.dropna(how='all', inplace=True)
-    df = df[df.notna().sum(axis=1) > 2]
-    for col in ['Debit', 'Credit']:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True).replace('', None).astype(float)
-    return df
+def _register_warmup_components():
+    """Heavy components FINNY_WARMUP can preload (e.g. FINNY_WARMUP=asr,forecaster or all)."""
+    from utils.granite import get_token_manager
+
+    def load_smb_rag():
+        from dash_modules.analytics.smb_rag import get_smb_benchmark_rag
+        return get_smb_benchmark_rag()
+
+    def load_docling():
+        from invoice_reminder.parser import get_document_converter
+        return get_document_converter()
+
+    manager = get_warmup_manager()
+    manager.register("asr", asr_engine.warm_up, probe=asr_engine.is_loaded)
+    manager.register("forecaster", lambda: bot.cash_flow_forecaster,
+                     probe=lambda: bot.is_initialized("cash_flow_forecaster"))
+    manager.register("loan_rag", lambda: bot.loan_advisor,
+                     probe=lambda: bot.is_initialized("loan_advisor"))
+    manager.register("tax_rag", lambda: bot.tax_estimator,
+                     probe=lambda: bot.is_initialized("tax_estimator"))
+    manager.register("smb_rag", load_smb_rag)
+    manager.register("docling", load_docling)
+    manager.register("granite_token", lambda: get_token_manager().get_token())
+    return manager
+
+warmup_manager = _register_warmup_components()
+_warmup_spec = WARMUP_COMPONENTS
+if os.getenv("FINNY_ASR_PRELOAD") == "1" and _warmup_spec.strip().lower() != "all":
+    # Older switch for loading the speech models at startup
+    _warmup_spec = ",".join(filter(None, [_warmup_spec, "asr"]))
+warmup_manager.start(warmup_manager.resolve(_warmup_spec))
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok", "uptime_seconds": round(time.time() - warmup_manager.started_at, 1)})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once every component selected by FINNY_WARMUP is warm, 503 until then."""
+    status = warmup_manager.status()
+    return jsonify(status), (200 if status["ready"] else 503)
 
 if __name__ == "__main__":
     bot.load_ledger_json("ledger/ledger.json")
@@ -5,17 +5,31 @@ from invoice_reminder.db import (update_due_date, mark_as_done, update_due_date_
                                set_invoice_type, update_due_date_and_notify)
 from invoice_reminder.analytics import get_monthly_summary
 from invoice_reminder.whatsapp import send_whatsapp_prompt
-from langchain_ibm import WatsonxLLM
 from config.settings import GRANITE_ENDPOINT, GRANITE_API_KEY, GRANITE_PROJECT_ID
 from cashflow_forecasting.granite_scenario_interpreter import granite_scenario_from_text
+from utils.llm_cache import get_llm_cache
 
-# LLM setup
-llm = WatsonxLLM(
-    model_id="ibm/granite-3-3-8b-instruct",
-    url=GRANITE_ENDPOINT,
-    apikey=GRANITE_API_KEY,
-    project_id=GRANITE_PROJECT_ID
-)
+# LLM setup (client built on first use)
+LLM_MODEL_ID = "ibm/granite-3-3-8b-instruct"
+_llm = None
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        from langchain_ibm import WatsonxLLM
+        _llm = WatsonxLLM(
+            model_id=LLM_MODEL_ID,
+            url=GRANITE_ENDPOINT,
+            apikey=GRANITE_API_KEY,
+            project_id=GRANITE_PROJECT_ID
+        )
+    return _llm
+
+def invoke_llm(prompt: str) -> str:
+    """llm.invoke behind the shared response cache (default params decode greedily)."""
+    llm = get_llm()
+    params = llm.params or {}
+    return get_llm_cache().get_or_generate(LLM_MODEL_ID, prompt, params, lambda: llm.invoke(prompt))
 
 def route_user_message(user_input: str, user_id: str, bot) -> str:
     msg = user_input.lower().strip()
@@ -36,7 +50,7 @@ def route_user_message(user_input: str, user_id: str, bot) -> str:
     # 3. Mark invoice as done
     if msg.startswith("done "):
         inv_number = msg.split(" ", 1)[-1].strip()
-        success, status = mark_as_done(inv_number)
+        success, status = mark_as_done(inv_number, user_id)
         if success:
             action = "paid" if status == "paid" else "collected"
             return f"✅ Invoice {inv_number} marked as {action}!"
@@ -48,7 +62,7 @@ def route_user_message(user_input: str, user_id: str, bot) -> str:
         if len(parts) >= 3:
             inv_id = parts[1]
             new_date = parts[2]
-            if update_due_date_by_id(inv_id, new_date):
+            if update_due_date_by_id(inv_id, new_date, user_id):
                 return f"📆 Invoice {inv_id} rescheduled to {new_date}."
             return f"❌ Could not reschedule invoice {inv_id}"
         return "⚠️ Usage: reschedule <invoice_id> <new_due_date>"
@@ -136,4 +150,4 @@ def route_user_message(user_input: str, user_id: str, bot) -> str:
 
     # 12. Fallback to LLM financial advice
     prompt = f"You are a smart financial assistant. The user says: '{user_input}'. Respond clearly and practically."
-    return llm.invoke(prompt)
\ No newline at end of file
+    return invoke_llm(prompt)
\ No newline at end of file
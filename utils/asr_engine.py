@@ -0,0 +1,299 @@
+# utils/asr_engine.py — Resident speech-recognition pool for WhatsApp voice notes
+
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+# torch, torchaudio, librosa and transformers are imported where they are
+# first needed so that importing this module (and main.py) stays cheap
+
+PRIMARY_ASR_MODEL = "ibm-granite/granite-speech-3.3-8b"
+FALLBACK_ASR_MODEL = "openai/whisper-tiny"
+SAMPLE_RATE = 16000
+
+ASR_WORKERS = int(os.getenv("FINNY_ASR_WORKERS", "2"))
+ASR_QUEUE_SIZE = int(os.getenv("FINNY_ASR_QUEUE_SIZE", "32"))
+
+# Transcription outcomes the webhook treats as failures
+FAILED_PREFIXES = ("Transcription failed", "Failed to load", "Audio too short")
+
+
+def load_and_preprocess_audio(file_path):
+    """
+    Load and preprocess audio file using librosa (handles OGG and most formats)
+
+    Args:
+        file_path (str or Path): Path to audio file
+
+    Returns:
+        numpy array: Preprocessed audio array at 16kHz, mono
+    """
+    try:
+        file_path = Path(file_path)
+        print(f"Loading audio file: {file_path}")
+
+        # Check if file exists and has content
+        if not file_path.exists():
+            print(f"Audio file does not exist: {file_path}")
+            return None
+
+        file_size = file_path.stat().st_size
+        if file_size == 0:
+            print(f"Audio file is empty: {file_path}")
+            return None
+
+        print(f"File size: {file_size} bytes")
+
+        # Method 1: Try librosa (handles OGG, MP3, WAV, etc.)
+        try:
+            print("Attempting to load with librosa...")
+            import librosa
+            waveform, sample_rate = librosa.load(
+                str(file_path),
+                sr=SAMPLE_RATE,  # Resample to 16kHz
+                mono=True,  # Convert to mono
+                dtype=np.float32
+            )
+
+            print(f"Librosa successful: shape={waveform.shape}, sr={sample_rate}")
+
+            # Validate audio data
+            if len(waveform) == 0:
+                print("Loaded audio is empty")
+                return None
+
+            # Check for very short audio (less than 0.1 seconds)
+            if len(waveform) < 0.1 * SAMPLE_RATE:
+                print(f"Audio too short: {len(waveform)/SAMPLE_RATE:.2f} seconds")
+                return None
+
+            return waveform
+
+        except Exception as librosa_error:
+            print(f"Librosa loading failed: {librosa_error}")
+
+            # Method 2: Fallback to torchaudio (for WAV files mainly)
+            try:
+                print("Falling back to torchaudio...")
+                import torch
+                import torchaudio
+                waveform, original_sample_rate = torchaudio.load(str(file_path))
+
+                # Convert to mono if stereo
+                if waveform.shape[0] > 1:
+                    waveform = torch.mean(waveform, dim=0, keepdim=True)
+
+                # Resample to 16kHz if needed
+                if original_sample_rate != SAMPLE_RATE:
+                    print(f"Resampling from {original_sample_rate} to {SAMPLE_RATE} Hz")
+                    resampler = torchaudio.transforms.Resample(
+                        orig_freq=original_sample_rate,
+                        new_freq=SAMPLE_RATE
+                    )
+                    waveform = resampler(waveform)
+
+                audio_array = waveform.squeeze().numpy()
+                print(f"Torchaudio successful: shape={audio_array.shape}")
+                return audio_array
+
+            except Exception as torchaudio_error:
+                print(f"Torchaudio fallback failed: {torchaudio_error}")
+                return None
+
+    except Exception as e:
+        print(f"Audio loading error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+class ASREngine:
+    """
+    Keeps the primary and fallback ASR pipelines resident and serves
+    transcriptions from a bounded pool of worker threads fed by a queue.
+    """
+
+    def __init__(self, primary_model: str = PRIMARY_ASR_MODEL,
+                 fallback_model: str = FALLBACK_ASR_MODEL,
+                 num_workers: int = ASR_WORKERS,
+                 max_queue_size: int = ASR_QUEUE_SIZE):
+        self.primary_model = primary_model
+        self.fallback_model = fallback_model
+        self.num_workers = max(1, num_workers)
+
+        # Resolved on first model load (needs torch)
+        self.device: Optional[int] = None
+        self.torch_dtype = None
+
+        # model name -> loaded pipeline; each pipeline gets its own inference lock
+        self._pipelines: Dict[str, object] = {}
+        self._inference_locks: Dict[str, threading.Lock] = {}
+        self._load_lock = threading.Lock()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._workers = []
+        self._start_lock = threading.Lock()
+        self._stopped = False
+
+    # ─── Model residency ─────────────────────────
+
+    def _get_pipeline(self, model_name: str):
+        pipe = self._pipelines.get(model_name)
+        if pipe is not None:
+            return pipe
+
+        with self._load_lock:
+            pipe = self._pipelines.get(model_name)
+            if pipe is None:
+                import torch
+                from transformers import pipeline
+
+                if self.device is None:
+                    self.device = 0 if torch.cuda.is_available() else -1
+                    self.torch_dtype = torch.float16 if self.device >= 0 else torch.float32
+                print(f"Loading ASR model {model_name} on {'GPU' if self.device >= 0 else 'CPU'} ({self.torch_dtype})")
+                pipe = pipeline(
+                    "automatic-speech-recognition",
+                    model=model_name,
+                    device=self.device,
+                    torch_dtype=self.torch_dtype,
+                    return_timestamps=False  # Don't need timestamps for this use case
+                )
+                self._inference_locks[model_name] = threading.Lock()
+                self._pipelines[model_name] = pipe
+                print(f"✅ ASR model {model_name} loaded")
+        return pipe
+
+    def warm_up(self, include_fallback: bool = True) -> None:
+        """Load the models now instead of on the first voice note."""
+        self._get_pipeline(self.primary_model)
+        if include_fallback:
+            self._get_pipeline(self.fallback_model)
+
+    def is_loaded(self, model_name: Optional[str] = None) -> bool:
+        return (model_name or self.primary_model) in self._pipelines
+
+    # ─── Worker pool ─────────────────────────────
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._workers:
+                return
+            self._stopped = False
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"asr-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._start_lock:
+            self._stopped = True
+            for _ in self._workers:
+                self._queue.put(None)
+            if wait:
+                for worker in self._workers:
+                    worker.join()
+            self._workers = []
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                future, file_path, light = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._transcribe(file_path, light))
+                except Exception as e:
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, file_path, light: bool = False, timeout: Optional[float] = 5.0) -> Future:
+        """
+        Queue a transcription job. Raises queue.Full if the pool is saturated
+        for longer than ``timeout`` seconds.
+        """
+        if self._stopped:
+            raise RuntimeError("ASR engine has been shut down")
+        self.start()
+        future: Future = Future()
+        self._queue.put((future, str(file_path), light), timeout=timeout)
+        return future
+
+    def transcribe(self, file_path, light: bool = False, timeout: Optional[float] = None) -> str:
+        """Submit a job and block until its transcription is ready."""
+        try:
+            return self.submit(file_path, light=light).result(timeout=timeout)
+        except queue.Full:
+            print("ASR queue is full, rejecting voice note")
+            return "Transcription failed: server busy"
+        except Exception as e:
+            print(f"Transcription error: {e}")
+            return "Transcription failed"
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ─── Transcription ───────────────────────────
+
+    def _run_pipeline(self, model_name: str, audio) -> str:
+        pipe = self._get_pipeline(model_name)
+        with self._inference_locks[model_name]:
+            result = pipe({"array": audio, "sampling_rate": SAMPLE_RATE})
+        return result.get('text', '').strip()
+
+    def _transcribe(self, file_path: str, light: bool = False) -> str:
+        print(f"Starting transcription for: {file_path}")
+
+        # Audio decoding happens outside the inference locks so workers overlap it
+        audio = load_and_preprocess_audio(file_path)
+        if audio is None:
+            return "Failed to load audio"
+
+        print(f"Audio loaded for transcription: {len(audio)} samples, {len(audio)/SAMPLE_RATE:.2f} seconds")
+
+        # Check for very short audio
+        if len(audio) < 0.3 * SAMPLE_RATE:  # Less than 0.3 seconds
+            return "Audio too short for transcription"
+
+        if not light:
+            try:
+                print("Running transcription...")
+                transcription = self._run_pipeline(self.primary_model, audio)
+                print(f"Transcription result: '{transcription}'")
+                return transcription if transcription else "No speech detected in audio"
+            except Exception as pipeline_error:
+                print(f"Pipeline error: {pipeline_error}")
+                # Try with smaller model as fallback
+
+        try:
+            print(f"Using light transcription ({self.fallback_model})...")
+            transcription = self._run_pipeline(self.fallback_model, audio)
+            print(f"Light transcription result: '{transcription}'")
+            return transcription if transcription else "No speech detected"
+        except Exception as e:
+            print(f"Light transcription error: {e}")
+            return "Transcription failed"
+
+
+_engine: Optional[ASREngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_asr_engine() -> ASREngine:
+    """Get the process-wide ASREngine instance."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ASREngine()
+    return _engine
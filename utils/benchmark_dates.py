@@ -0,0 +1,78 @@
+# utils/benchmark_dates.py — row-wise vs column-wise date parsing for CSV uploads
+#
+#   python -m utils.benchmark_dates [rows ...]
+
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.column_mapper import ColumnMapper
+from utils.date_parser import DATE_FORMATS
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+# (label, strftime format) for a few typical bank exports
+EXPORTS = [
+    ("ISO", "%Y-%m-%d"),
+    ("US month-first", "%m/%d/%Y"),
+    ("day-first", "%d/%m/%Y"),
+    ("DD-Mon-YY", "%d-%b-%y"),
+]
+
+
+def legacy_standardize_dates(date_series: pd.Series) -> pd.Series:
+    """The per-row loop ColumnMapper._standardize_dates used before."""
+    standardized_dates = pd.Series(index=date_series.index, dtype='datetime64[ns]')
+    for idx, date_value in date_series.items():
+        if pd.isna(date_value):
+            continue
+        date_str = str(date_value)
+        parsed_date = None
+        for fmt in DATE_FORMATS:
+            try:
+                parsed_date = datetime.strptime(date_str[:19], fmt)
+                break
+            except ValueError:
+                continue
+        if parsed_date is None:
+            parsed_date = pd.to_datetime(date_str, errors='coerce')
+        standardized_dates.loc[idx] = parsed_date
+    return standardized_dates
+
+
+def make_dates(rows: int, fmt: str, seed: int = 42) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D")
+    return pd.Series(days.strftime(fmt))
+
+
+def _time(fn, series: pd.Series):
+    start = time.perf_counter()
+    out = fn(series)
+    return out, time.perf_counter() - start
+
+
+def run(sizes=DEFAULT_SIZES) -> None:
+    mapper = ColumnMapper()
+    print(f"{'export':>15} {'rows':>9} {'legacy (s)':>11} {'vectorized (s)':>15} {'speedup':>8} {'legacy misreads':>16}")
+    for label, fmt in EXPORTS:
+        for rows in sizes:
+            series = make_dates(rows, fmt)
+            truth = pd.to_datetime(series, format=fmt)
+
+            legacy, t_legacy = _time(legacy_standardize_dates, series)
+            vectorized, t_vector = _time(mapper._standardize_dates, series)
+
+            assert (vectorized == truth).all(), f"{label}: vectorized parse disagrees with the source dates"
+            # Day-first exports: the old loop read 03/04 as March 4
+            misreads = int((legacy != truth).sum())
+            print(f"{label:>15} {rows:>9,} {t_legacy:>11.3f} {t_vector:>15.3f} "
+                  f"{t_legacy / t_vector:>7.1f}x {misreads:>16,}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    run(sizes)
@@ -0,0 +1,80 @@
+# utils/benchmark_ingest.py — whole-file vs streamed CSV upload into a scratch ledger
+#
+#   python -m utils.benchmark_ingest [rows ...]
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ledger.ledger_manager import LedgerManager
+from utils.column_mapper import map_columns
+from utils.csv_ingest import CSVIngestPipeline, normalize_messy_csv
+from utils.csv_validator import validate_csv
+
+DEFAULT_SIZES = [50_000, 200_000]
+CHUNK_ROWS = 20_000
+
+
+def legacy_ingest(file_path: str, ledger: LedgerManager) -> None:
+    """The path handle_csv_upload took before: whole file through every stage."""
+    validated_df = validate_csv(file_path)
+    normalized_df = normalize_messy_csv(validated_df)
+    standardized_df = map_columns(normalized_df)
+    ledger.bulk_apply_df(standardized_df)
+
+
+def make_csv(path: str, rows: int, seed: int = 42) -> None:
+    """A semicolon-separated, BOM-prefixed day-first export: the kind the old loader tried 16 ways."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D")
+    df = pd.DataFrame({
+        "Date": days.strftime("%d/%m/%Y"),
+        "Description": rng.choice(["Card payment AMAZON MKTPLACE", "Transfer from ACME LTD",
+                                   "Direct debit UTILITY CO", "Cash withdrawal ATM"], rows),
+        "Amount": np.round(rng.normal(0, 250, rows), 2),
+        "Balance": np.round(rng.normal(5000, 1000, rows), 2),
+    })
+    df.to_csv(path, sep=";", index=False, encoding="utf-8-sig")
+
+
+def _measure(fn):
+    """(seconds, peak MB): timed on its own, then re-run under tracemalloc, which slows it down."""
+    with contextlib.redirect_stdout(io.StringIO()):  # The validator prints whole frames
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def run(sizes=DEFAULT_SIZES) -> None:
+    print(f"{'rows':>9} {'legacy (s)':>11} {'legacy peak MB':>15} {'streamed (s)':>13} {'streamed peak MB':>17} {'same ledger':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            csv_path = os.path.join(tmp, f"upload_{rows}.csv")
+            make_csv(csv_path, rows)
+
+            legacy = LedgerManager(os.path.join(tmp, f"legacy_{rows}.json"))
+            streamed = LedgerManager(os.path.join(tmp, f"streamed_{rows}.json"))
+            pipeline = CSVIngestPipeline(chunk_rows=CHUNK_ROWS)
+
+            t_legacy, m_legacy = _measure(lambda: legacy_ingest(csv_path, legacy))
+            t_stream, m_stream = _measure(lambda: pipeline.ingest(csv_path, streamed, mode="replace"))
+
+            same = legacy.get_history() == streamed.get_history() and legacy.get_balance() == streamed.get_balance()
+            print(f"{rows:>9,} {t_legacy:>11.2f} {m_legacy:>15.1f} {t_stream:>13.2f} {m_stream:>17.1f} {str(same):>12}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    run(sizes)
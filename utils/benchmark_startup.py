@@ -0,0 +1,96 @@
+# utils/benchmark_startup.py — cold-start import cost and time-to-first-response for main.py
+#
+#   python -m utils.benchmark_startup [--message "help"] [--top 15]
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Runs in a fresh interpreter so every measurement is a true cold start
+_FIRST_RESPONSE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = main.app.test_client()
+resp = client.post("/twilio", data={"Body": sys.argv[1], "From": "whatsapp:+10000000000"})
+answered = time.perf_counter()
+print(json.dumps({
+    "import_s": round(imported - start, 3),
+    "first_response_s": round(answered - start, 3),
+    "status": resp.status_code,
+}))
+"""
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    # Answer inside the request so the measured response includes the real work
+    env["FINNY_WEBHOOK_ASYNC"] = "0"
+    return env
+
+
+def import_profile(module: str = "main", top: int = 15):
+    """Top-level imports of ``module`` ranked by cumulative import time (python -X importtime)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_child_env()
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            depth = (len(m.group(3)) - 1) // 2
+            rows.append((depth, int(m.group(2)), m.group(4)))
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.splitlines()[-5:])
+        print(f"⚠️ import {module} failed:\n{tail}")
+    end = next((i for i, r in enumerate(rows) if r[0] == 0 and r[2] == module), None)
+    if end is None:
+        return [], 0
+    # importtime lists children before their parent: the target's subtree is
+    # everything between the previous top-level row and the target's own row
+    start = end
+    while start > 0 and rows[start - 1][0] > 0:
+        start -= 1
+    direct = sorted((r for r in rows[start:end] if r[0] == 1), key=lambda r: r[1], reverse=True)
+    return direct[:top], rows[end][1]
+
+
+def first_response(message: str = "help") -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _FIRST_RESPONSE_SCRIPT, message],
+        capture_output=True, text=True, env=_child_env()
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    tail = "\n".join(proc.stderr.splitlines()[-5:])
+    return {"error": tail or "no output"}
+
+
+def run(message: str = "help", top: int = 15) -> None:
+    modules, total_us = import_profile("main", top)
+    print(f"📦 import main: {total_us / 1e6:.2f}s cumulative")
+    for depth, cumulative_us, name in modules:
+        print(f"  {cumulative_us / 1e6:>8.3f}s  {'  ' * depth}{name}")
+
+    result = first_response(message)
+    if "error" in result:
+        print(f"❌ First-response run failed:\n{result['error']}")
+        return
+    print(f"\n⏱ import: {result['import_s']}s, first response to {message!r}: "
+          f"{result['first_response_s']}s (HTTP {result['status']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure main.py cold start")
+    parser.add_argument("--message", default="help", help="WhatsApp text to send as the first request")
+    parser.add_argument("--top", type=int, default=15, help="How many imports to list")
+    args = parser.parse_args()
+    run(args.message, args.top)
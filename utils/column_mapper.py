@@ -4,6 +4,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import re
 
+from utils.date_parser import date_like_ratio, detect_date_formats, parse_dates
+
 
 class ColumnMapper:
     """Automatically detects and maps CSV columns to standardized format for financial analysis."""
@@ -38,6 +40,13 @@ class ColumnMapper:
             ]
         }
         
+        # Bank reference columns: kept alongside the description to fingerprint
+        # transactions when a statement is merged into the ledger
+        self.reference_patterns = [
+            'bank ref', 'ref no', 'ref.', 'reference no', 'reference number', 'transaction id',
+            'txn id', 'utr', 'cheque no', 'chq no', 'vch no'
+        ]
+
         # Date formats to try when parsing dates
         self.date_formats = [
             '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%m-%d-%Y', '%d-%m-%Y',
@@ -78,7 +87,8 @@ class ColumnMapper:
             
             # Step 4: Generate suggestions and warnings
             result['suggestions'] = self._generate_mapping_suggestions(mappings, result['confidence_scores'])
-            result['warnings'] = self._generate_mapping_warnings(df, mappings)
+            parsed_dates = standardized_df['date'] if standardized_df is not None else None
+            result['warnings'] = self._generate_mapping_warnings(df, mappings, parsed_dates)
             
             return result
             
@@ -156,14 +166,7 @@ class ColumnMapper:
     
     def _is_date_column(self, sample: pd.Series) -> bool:
         """Check if sample values look like dates."""
-        date_count = 0
-        total_count = len(sample)
-        
-        for value in sample:
-            if self._looks_like_date(str(value)):
-                date_count += 1
-        
-        return (date_count / total_count) > 0.7
+        return date_like_ratio(sample, self.date_formats) > 0.7
     
     def _is_numeric_column(self, sample: pd.Series) -> bool:
         """Check if sample values are numeric."""
@@ -289,14 +292,7 @@ class ColumnMapper:
     
     def _score_date_column(self, series: pd.Series) -> float:
         """Score a date column based on parseability."""
-        sample = series.dropna().head(10)
-        parseable_count = 0
-        
-        for value in sample:
-            if self._looks_like_date(str(value)):
-                parseable_count += 1
-        
-        return (parseable_count / len(sample)) * 5 if len(sample) > 0 else 0
+        return date_like_ratio(series.dropna().head(10), self.date_formats) * 5
     
     def _score_numeric_column(self, series: pd.Series) -> float:
         """Score a numeric column based on validity."""
@@ -373,8 +369,12 @@ class ColumnMapper:
         
         return confidence_scores
     
-    def _create_standardized_dataframe(self, df: pd.DataFrame, mappings: Dict) -> Optional[pd.DataFrame]:
-        """Create a standardized DataFrame with mapped columns."""
+    def _create_standardized_dataframe(self, df: pd.DataFrame, mappings: Dict,
+                                       date_formats: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Create a standardized DataFrame with mapped columns. ``date_formats``
+        pins the date formats (e.g. detected on the first chunk of a file).
+        """
         if not mappings.get('date') or not mappings.get('description'):
             return None  # Need at least date and description
         
@@ -383,7 +383,7 @@ class ColumnMapper:
             
             # Map date column
             date_col = mappings['date']
-            standardized_df['date'] = self._standardize_dates(df[date_col])
+            standardized_df['date'] = self._standardize_dates(df[date_col], date_formats)
             
             # Map description column
             desc_col = mappings['description']
@@ -410,6 +410,10 @@ class ColumnMapper:
             # Add balance if available
             if mappings.get('balance'):
                 standardized_df['balance'] = self._standardize_amounts(df[mappings['balance']])
+
+            ref_col = self._find_reference_column(df, mappings)
+            if ref_col:
+                standardized_df['reference'] = df[ref_col]
             
             # Add original columns for reference
             for col_type, col_name in mappings.items():
@@ -422,35 +426,24 @@ class ColumnMapper:
             print(f"Error creating standardized DataFrame: {e}")
             return None
     
-    def _standardize_dates(self, date_series: pd.Series) -> pd.Series:
+    def _find_reference_column(self, df: pd.DataFrame, mappings: Dict) -> Optional[str]:
+        """A bank reference column not already used for another mapping, if the CSV has one."""
+        used = set(mappings.values())
+        for col in df.columns:
+            col_name_lower = str(col).lower().strip()
+            if col not in used and any(pattern in col_name_lower for pattern in self.reference_patterns):
+                return col
+        return None
+
+    def _standardize_dates(self, date_series: pd.Series, formats: Optional[List[str]] = None) -> pd.Series:
         """Standardize date column to datetime format."""
-        standardized_dates = pd.Series(index=date_series.index, dtype='datetime64[ns]')
-        
-        for idx, date_value in date_series.items():
-            if pd.isna(date_value):
-                continue
-            
-            date_str = str(date_value)
-            parsed_date = None
-            
-            # Try each date format
-            for fmt in self.date_formats:
-                try:
-                    parsed_date = datetime.strptime(date_str[:19], fmt)
-                    break
-                except ValueError:
-                    continue
-            
-            # If still not parsed, try pandas
-            if parsed_date is None:
-                try:
-                    parsed_date = pd.to_datetime(date_str, errors='coerce')
-                except:
-                    pass
-            
-            standardized_dates.loc[idx] = parsed_date
-        
-        return standardized_dates
+        # Formats (and day-first vs month-first) are detected from the column
+        # once, then each format parses all its rows in one vectorized call
+        return parse_dates(date_series, formats, candidate_formats=self.date_formats)
+
+    def detect_date_formats(self, date_series: pd.Series) -> List[str]:
+        """The date formats a column uses, for reuse across chunks of the same file."""
+        return detect_date_formats(date_series, self.date_formats)
     
     def _standardize_amounts(self, amount_series: pd.Series) -> pd.Series:
         """Standardize amount column to numeric format."""
@@ -487,7 +480,8 @@ class ColumnMapper:
         
         return suggestions
     
-    def _generate_mapping_warnings(self, df: pd.DataFrame, mappings: Dict) -> List[str]:
+    def _generate_mapping_warnings(self, df: pd.DataFrame, mappings: Dict,
+                                   parsed_dates: Optional[pd.Series] = None) -> List[str]:
         """Generate warnings about potential data issues."""
         warnings = []
         
@@ -501,7 +495,7 @@ class ColumnMapper:
         # Check date range
         if mappings.get('date'):
             try:
-                dates = self._standardize_dates(df[mappings['date']])
+                dates = parsed_dates if parsed_dates is not None else self._standardize_dates(df[mappings['date']])
                 date_range = dates.max() - dates.min()
                 if date_range.days > 365 * 2:
                     warnings.append("⚠️ Date range spans more than 2 years. Large datasets may take longer to process.")
@@ -0,0 +1,136 @@
+# utils/csv_ingest.py — Streaming CSV upload pipeline: validate → normalize → map → ledger, one chunk at a time
+
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+
+from utils.column_mapper import ColumnMapper
+from utils.csv_sniffer import sniff_csv_format
+from utils.csv_validator import CSVValidator
+
+CSV_CHUNK_ROWS = int(os.getenv("FINNY_CSV_CHUNK_ROWS", "50000"))
+# "merge" adds only transactions the ledger doesn't have yet; "replace" swaps the ledger for the file
+CSV_IMPORT_MODE = os.getenv("FINNY_CSV_IMPORT_MODE", "merge").strip().lower()
+IMPORT_MODES = ("merge", "replace")
+
+
+def normalize_messy_csv(df: pd.DataFrame) -> pd.DataFrame:
+    if 'Date' in df.columns:
+        df['Date'] = df['Date'].ffill()
+    df.dropna(how='all', inplace=True)
+    df = df[df.notna().sum(axis=1) > 2]
+    for col in ['Debit', 'Credit']:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True).replace('', None).astype(float)
+    return df
+
+
+class CSVIngestPipeline:
+    """
+    Streams an uploaded bank CSV in fixed-size chunks instead of loading it
+    whole. The encoding and delimiter are sniffed once from the first few KB;
+    the first chunk is validated and decides the column mapping and date
+    formats, which every later chunk reuses. Peak memory is about one chunk
+    whatever the file size.
+    """
+
+    def __init__(self, chunk_rows: int = CSV_CHUNK_ROWS, validator: Optional[CSVValidator] = None,
+                 mapper: Optional[ColumnMapper] = None):
+        self.chunk_rows = max(1, chunk_rows)
+        self.validator = validator or CSVValidator()
+        self.mapper = mapper or ColumnMapper()
+        self.last_stats: Dict = {}
+
+    def iter_standardized(self, file_path: str) -> Iterator[pd.DataFrame]:
+        """
+        Yield standardized (date, description, amount, ...) frames chunk by
+        chunk. Raises ValueError, as validate_csv and map_columns do, when the
+        file fails validation or its columns can't be mapped.
+        """
+        basics = self.validator._validate_file_basics(file_path)
+        if not basics['success']:
+            raise ValueError("CSV validation failed:\\n" + "\\n".join(basics['errors']))
+
+        start = time.perf_counter()
+        sniffed = sniff_csv_format(file_path)
+        stats = self.last_stats = {
+            "encoding": sniffed['encoding'],
+            "separator": sniffed['separator'],
+            "chunks": 0,
+            "rows_read": 0,
+            "rows_out": 0,
+            "warnings": [],
+        }
+
+        mappings, date_formats, carry_date = None, None, None
+        reader = pd.read_csv(file_path, encoding=sniffed['encoding'], sep=sniffed['separator'],
+                             chunksize=self.chunk_rows, skipinitialspace=True, encoding_errors='replace')
+        with reader:
+            for chunk in reader:
+                stats["chunks"] += 1
+                stats["rows_read"] += len(chunk)
+
+                if mappings is None:
+                    validation = self.validator.validate_dataframe(chunk)
+                    if not validation['success']:
+                        error_list = validation['errors'] + validation.get('suggestions', [])
+                        raise ValueError("CSV validation failed:\\n" + "\\n".join(error_list))
+                    stats["warnings"].extend(validation['warnings'])
+
+                # Rows with a blank Date continue the previous chunk's last date
+                if 'Date' in chunk.columns:
+                    if carry_date is not None and pd.isna(chunk['Date'].iloc[0]):
+                        chunk.loc[chunk.index[0], 'Date'] = carry_date
+                    last_date = chunk['Date'].ffill().iloc[-1]
+                    carry_date = last_date if pd.notna(last_date) else carry_date
+                chunk = normalize_messy_csv(chunk)
+                if chunk.empty:
+                    continue
+
+                if mappings is None:
+                    result = self.mapper.auto_map_columns(chunk)
+                    if not result['success']:
+                        raise ValueError("Column mapping failed:\\n" + "\\n".join(result.get("suggestions", [])))
+                    mappings = result['mappings']
+                    date_formats = self.mapper.detect_date_formats(chunk[mappings['date']])
+                    stats["mappings"] = mappings
+                    stats["date_formats"] = date_formats
+                    stats["warnings"].extend(result['warnings'])
+                    standardized = result['standardized_df']
+                else:
+                    standardized = self.mapper._create_standardized_dataframe(chunk, mappings, date_formats)
+                    if standardized is None:
+                        raise ValueError(f"Column mapping failed on rows near {stats['rows_read']}")
+
+                stats["rows_out"] += len(standardized)
+                stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+                yield standardized
+
+        if mappings is None:
+            raise ValueError("CSV validation failed:\\nCSV file is empty")
+
+    def ingest(self, file_path: str, ledger, mode: str = CSV_IMPORT_MODE) -> Dict:
+        """
+        Stream the file into ``ledger`` (a LedgerManager), merging it into or
+        replacing the existing transactions. Returns last_stats, with the
+        "inserted" and "skipped" transaction counts.
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f"Unknown import mode {mode!r}, expected one of {IMPORT_MODES}")
+
+        start = time.perf_counter()
+        if mode == "merge":
+            counts = ledger.merge_chunks(self.iter_standardized(file_path))
+        else:
+            counts = {"inserted": ledger.bulk_apply_chunks(self.iter_standardized(file_path)), "skipped": 0}
+        self.last_stats.update(counts)
+        self.last_stats["mode"] = mode
+        self.last_stats["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return self.last_stats
+
+
+def ingest_csv(file_path: str, ledger, chunk_rows: int = CSV_CHUNK_ROWS, mode: str = CSV_IMPORT_MODE) -> Dict:
+    """Shortcut: stream ``file_path`` into ``ledger`` (a LedgerManager) and return the run's stats."""
+    return CSVIngestPipeline(chunk_rows).ingest(file_path, ledger, mode)
@@ -0,0 +1,76 @@
+# utils/csv_sniffer.py — Detect a CSV's encoding and delimiter from its first few KB
+
+import codecs
+import csv
+from typing import Dict, List, Tuple
+
+SNIFF_BYTES = 64 * 1024
+SNIFF_LINES = 50
+DELIMITERS = [',', ';', '\t', '|']
+
+# Checked in order: the UTF-32 LE mark starts with the UTF-16 LE one
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def _decode_sample(head: bytes) -> Tuple[str, str]:
+    """(encoding, text) for a BOM-less sample: UTF-8 if it decodes, else cp1252, else latin-1."""
+    try:
+        return 'utf-8', head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8
+        if e.start >= len(head) - 3:
+            return 'utf-8', head[:e.start].decode('utf-8')
+    try:
+        return 'cp1252', head.decode('cp1252')
+    except UnicodeDecodeError:
+        return 'latin-1', head.decode('latin-1')
+
+
+def _count_delimiter(lines: List[str]) -> str:
+    """Fallback when csv.Sniffer gives up: the delimiter with the steadiest non-zero count per line."""
+    best, best_score = ',', 0
+    for delimiter in DELIMITERS:
+        counts = [line.count(delimiter) for line in lines[:20]]
+        if not counts:
+            continue
+        score = counts[0] if len(set(counts)) == 1 else min(counts)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def sniff_csv_format(file_path: str, sample_bytes: int = SNIFF_BYTES) -> Dict[str, str]:
+    """
+    Read the first ``sample_bytes`` of a CSV once and return {"encoding",
+    "separator"}: the encoding from its byte-order mark or from which codec
+    decodes the sample, the delimiter from csv.Sniffer (falling back to
+    per-line counts of , ; tab and |).
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(sample_bytes)
+
+    encoding = next((name for bom, name in _BOMS if head.startswith(bom)), None)
+    if encoding:
+        text = head.decode(encoding, errors='ignore')
+    else:
+        encoding, text = _decode_sample(head)
+
+    lines = [line for line in text.lstrip('\ufeff').splitlines() if line.strip()]
+    if len(head) == sample_bytes and len(lines) > 1:
+        lines = lines[:-1]  # Probably cut off mid-row
+    lines = lines[:SNIFF_LINES]
+
+    try:
+        separator = csv.Sniffer().sniff('\n'.join(lines), delimiters=''.join(DELIMITERS)).delimiter
+        if lines and separator not in lines[0]:
+            separator = _count_delimiter(lines)
+    except csv.Error:
+        separator = _count_delimiter(lines)
+
+    return {'encoding': encoding, 'separator': separator}
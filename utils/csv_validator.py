@@ -4,6 +4,9 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import re
 
+from utils.csv_sniffer import sniff_csv_format
+from utils.date_parser import date_like_ratio
+
 
 class CSVValidator:
     """Validates CSV structure and data quality for financial transaction processing."""
@@ -50,30 +53,7 @@ class CSVValidator:
                     return result
                 
                 df = df_result['dataframe']
-                print("Df",df)
-                result['metadata']['row_count'] = len(df)
-                result['metadata']['column_count'] = len(df.columns)
-                result['metadata']['columns'] = list(df.columns)
-                
-                # Step 3: Structure validation
-                structure_validation = self._validate_structure(df)
-                print(" structure_validation", structure_validation)
-                result['errors'].extend(structure_validation['errors'])
-                result['warnings'].extend(structure_validation['warnings'])
-                result['metadata'].update(structure_validation['metadata'])
-                
-                # Step 4: Data quality validation
-                quality_validation = self._validate_data_quality(df)
-                print("quality_validation",quality_validation)
-                result['errors'].extend(quality_validation['errors'])
-                result['warnings'].extend(quality_validation['warnings'])
-                result['metadata'].update(quality_validation['metadata'])
-                
-                # Step 5: Generate suggestions
-                result['suggestions'] = self._generate_suggestions(result)
-                print("result:",result)
-                # Overall success determination
-                result['success'] = len(result['errors']) == 0
+                result = self.validate_dataframe(df, result)
 
                 result['dataframe']=df_result['dataframe']
                 print("1234 RESULTS:",result)
@@ -84,6 +64,41 @@ class CSVValidator:
                 result['errors'].append(f"Unexpected error during validation: {str(e)}")
                 return result
     
+    def validate_dataframe(self, df: pd.DataFrame, result: Optional[Dict] = None) -> Dict:
+        """
+        Structure and data-quality checks on an already loaded frame (the
+        whole file, or the first chunk of a streamed one).
+        """
+        if result is None:
+            result = {'success': False, 'errors': [], 'warnings': [], 'metadata': {}, 'suggestions': []}
+
+        print("Df",df)
+        result['metadata']['row_count'] = len(df)
+        result['metadata']['column_count'] = len(df.columns)
+        result['metadata']['columns'] = list(df.columns)
+        
+        # Step 3: Structure validation
+        structure_validation = self._validate_structure(df)
+        print(" structure_validation", structure_validation)
+        result['errors'].extend(structure_validation['errors'])
+        result['warnings'].extend(structure_validation['warnings'])
+        result['metadata'].update(structure_validation['metadata'])
+        
+        # Step 4: Data quality validation
+        quality_validation = self._validate_data_quality(df)
+        print("quality_validation",quality_validation)
+        result['errors'].extend(quality_validation['errors'])
+        result['warnings'].extend(quality_validation['warnings'])
+        result['metadata'].update(quality_validation['metadata'])
+        
+        # Step 5: Generate suggestions
+        result['suggestions'] = self._generate_suggestions(result)
+        print("result:",result)
+        # Overall success determination
+        result['success'] = len(result['errors']) == 0
+
+        return result
+
     def _validate_file_basics(self, file_path: str) -> Dict:
         """Basic file size and accessibility checks."""
         import os
@@ -105,7 +120,21 @@ class CSVValidator:
             return {'success': False, 'errors': [f'Error accessing file: {str(e)}']}
     
     def _load_csv_safely(self, file_path: str) -> Dict:
-        """Attempt to load CSV with different encodings and separators."""
+        """Load the CSV with its sniffed encoding and separator, else try the common ones."""
+        try:
+            sniffed = sniff_csv_format(file_path)
+            df = pd.read_csv(file_path, encoding=sniffed['encoding'], sep=sniffed['separator'],
+                           low_memory=False, skipinitialspace=True)
+            if len(df.columns) >= 2 and len(df) >= 1:
+                return {
+                    'success': True,
+                    'dataframe': df,
+                    'encoding': sniffed['encoding'],
+                    'separator': sniffed['separator']
+                }
+        except Exception:
+            pass
+
         encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
         separators = [',', ';', '\t', '|']
         
@@ -226,13 +255,8 @@ class CSVValidator:
             if len(sample_values) == 0:
                 continue
             
-            date_like_count = 0
-            for value in sample_values:
-                if self._looks_like_date(str(value)):
-                    date_like_count += 1
-            
             # If more than 70% of sample values look like dates
-            if date_like_count / len(sample_values) > 0.7:
+            if date_like_ratio(sample_values, self.date_formats) > 0.7:
                 date_columns.append(col)
         
         return date_columns
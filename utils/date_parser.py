@@ -0,0 +1,139 @@
+# utils/date_parser.py — Column-at-a-time date parsing for CSV ingestion
+
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Priority order matters: for a value several formats accept, the earlier
+# one wins unless the column's own data says otherwise (see detect_date_formats)
+DATE_FORMATS = [
+    '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%m-%d-%Y', '%d-%m-%Y',
+    '%Y/%m/%d', '%d-%b-%y', '%d-%b-%Y', '%b-%d-%Y', '%Y-%m-%d %H:%M:%S',
+    '%m/%d/%y', '%d/%m/%y', '%y-%m-%d'
+]
+
+# Month-first / day-first twins: which one a column uses is decided from its values
+_TWINS = {
+    '%m/%d/%Y': '%d/%m/%Y', '%d/%m/%Y': '%m/%d/%Y',
+    '%m-%d-%Y': '%d-%m-%Y', '%d-%m-%Y': '%m-%d-%Y',
+    '%m/%d/%y': '%d/%m/%y', '%d/%m/%y': '%m/%d/%y',
+}
+
+_DATE_LIKE_RE = re.compile(
+    r'\d{4}-\d{1,2}-\d{1,2}'     # YYYY-MM-DD
+    r'|\d{1,2}/\d{1,2}/\d{4}'    # MM/DD/YYYY or DD/MM/YYYY
+    r'|\d{1,2}-\d{1,2}-\d{4}'    # MM-DD-YYYY or DD-MM-YYYY
+    r'|\d{1,2}-\w{3}-\d{2,4}'    # DD-MMM-YY or DD-MMM-YYYY
+)
+
+SAMPLE_SIZE = 500
+
+
+def _as_strings(values: pd.Series) -> pd.Series:
+    # Same 19-character cut the row-wise parsers applied before strptime
+    return values.astype(str).str.slice(0, 19)
+
+
+def _parses(strings: pd.Series, fmt: str) -> pd.Series:
+    return pd.to_datetime(strings, format=fmt, errors='coerce')
+
+
+def date_like_mask(values: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> np.ndarray:
+    """
+    Which values look like dates: they match one of the common date shapes,
+    or parse with one of ``formats``. Vectorized over the whole series.
+    """
+    strings = _as_strings(values.reset_index(drop=True))
+    mask = np.array(strings.str.contains(_DATE_LIKE_RE, na=False), dtype=bool)
+    for fmt in formats:
+        if mask.all():
+            break
+        rest = ~mask
+        mask[rest] = _parses(strings[rest], fmt).notna().to_numpy()
+    return mask
+
+
+def date_like_ratio(values: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> float:
+    values = values.dropna()
+    if len(values) == 0:
+        return 0.0
+    return float(date_like_mask(values, formats).mean())
+
+
+def detect_date_formats(values: pd.Series, formats: Sequence[str] = DATE_FORMATS,
+                        sample_size: int = SAMPLE_SIZE) -> List[str]:
+    """
+    The formats a column actually uses, dominant first, from a sample of its
+    distinct values. A month-first format is swapped for its day-first twin
+    when the sample holds values only the day-first reading accepts (and
+    none that only the month-first one does), e.g. "25/04/2024".
+    """
+    sample = _as_strings(values.dropna()).drop_duplicates().head(sample_size).reset_index(drop=True)
+    if sample.empty:
+        return []
+
+    hits: Dict[str, np.ndarray] = {fmt: _parses(sample, fmt).notna().to_numpy() for fmt in formats}
+
+    order = list(formats)
+    for fmt, twin in _TWINS.items():
+        if fmt in hits and twin in hits and order.index(fmt) < order.index(twin):
+            only_fmt = (hits[fmt] & ~hits[twin]).sum()
+            only_twin = (hits[twin] & ~hits[fmt]).sum()
+            if only_twin > 0 and only_fmt == 0:
+                i, j = order.index(fmt), order.index(twin)
+                order[i], order[j] = order[j], order[i]
+
+    # Greedy cover: keep taking the format that parses the most still-unparsed values
+    chosen = []
+    remaining = np.ones(len(sample), dtype=bool)
+    while remaining.any():
+        best, best_count = None, 0
+        for fmt in order:
+            if fmt in chosen:
+                continue
+            count = int((hits[fmt] & remaining).sum())
+            if count > best_count:
+                best, best_count = fmt, count
+        if best is None:
+            break
+        chosen.append(best)
+        remaining &= ~hits[best]
+    return chosen
+
+
+def parse_dates(values: pd.Series, formats: Optional[Sequence[str]] = None,
+                candidate_formats: Sequence[str] = DATE_FORMATS) -> pd.Series:
+    """
+    Parse a whole column to datetime64: detect its formats once from a
+    sample, run one vectorized ``pd.to_datetime`` per format over the values
+    still unparsed, then let pandas infer whatever is left. Unparseable
+    values become NaT.
+    """
+    result = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    present = values.notna().to_numpy()
+    if not present.any():
+        return result
+
+    strings = _as_strings(values[present])
+    if formats is None:
+        formats = detect_date_formats(values, candidate_formats)
+
+    parsed = pd.Series(pd.NaT, index=strings.index, dtype='datetime64[ns]')
+    for fmt in formats:
+        todo = parsed.isna()
+        if not todo.any():
+            break
+        parsed[todo] = _parses(strings[todo], fmt)
+
+    todo = parsed.isna()
+    if todo.any():
+        # Rare stragglers: infer per distinct value, as the old per-row fallback did
+        leftovers = strings[todo]
+        uniques = leftovers.unique()
+        inferred = pd.to_datetime(pd.Series(uniques), errors='coerce', format='mixed')
+        parsed[todo] = leftovers.map(dict(zip(uniques, inferred))).astype('datetime64[ns]')
+
+    result[present] = parsed.to_numpy()
+    return result
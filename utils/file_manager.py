@@ -7,6 +7,8 @@ from typing import Optional
 import hashlib
 import mimetypes
 
+from utils.media_fetcher import UnexpectedMediaType, get_media_fetcher
+
 
 class FileManager:
     """Handles secure file download, storage, and cleanup for CSV processing."""
@@ -45,28 +47,23 @@ class FileManager:
             # Create user directory
             user_dir = self.create_user_temp_directory(user_id)
             
-            # Download file with Twilio authentication if provided
-            headers = {'User-Agent': 'FinnyBot/1.0'}
-            if twilio_auth:
-                response = requests.get(media_url, auth=twilio_auth, headers=headers, timeout=30)
-            else:
-                response = requests.get(media_url, headers=headers, timeout=30)
-            
-            if response.status_code != 200:
-                return {
-                    'success': False,
-                    'error': f'Failed to download file. Status code: {response.status_code}'
-                }
-            
             # Generate filename with timestamp
             import datetime
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"transactions_{timestamp}.csv"
             file_path = os.path.join(user_dir, filename)
             
-            # Save file
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # Stream to disk with Twilio authentication if provided. Only known binary formats (PDF,
+            # audio, images, ...) are refused here: cp1252 or UTF-16 exports sniff as "binary", and
+            # their encoding is left to csv_sniffer
+            try:
+                media = get_media_fetcher().fetch_to_file(media_url, file_path, auth=twilio_auth,
+                                                          expect={"text", "binary"})
+            except UnexpectedMediaType:
+                return {
+                    'success': False,
+                    'error': 'File is not a valid CSV format'
+                }
             
             # Validate file type
             if not self.validate_file_type(file_path):
@@ -79,7 +76,7 @@ class FileManager:
             return {
                 'success': True,
                 'file_path': file_path,
-                'file_size': len(response.content)
+                'file_size': media['size']
             }
             
         except requests.RequestException as e:
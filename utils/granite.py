@@ -1,5 +1,5 @@
 # Watsonx.ai Granite Model API (you will get this URL from IBM)
-GRANITE_ENDPOINT = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation" 
+GRANITE_ENDPOINT = "https://us-south.ml.cloud.ibm.com/ml/v1/text/generation"
 GRANITE_API_KEY = "Q64AAxJfpKRQzuXuSyTM7YyeAXkaGeZZ7HJYYCpwHV-3"
 
 # granite.py — For IBM Granite 13B via watsonx.ai
@@ -7,20 +7,47 @@ GRANITE_API_KEY = "Q64AAxJfpKRQzuXuSyTM7YyeAXkaGeZZ7HJYYCpwHV-3"
 import requests
 import json
 import os
+import threading
+import time
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from utils.llm_cache import get_llm_cache
 
 # -----------------------------------------
 # Configuration: Set via environment or hardcode
 # -----------------------------------------
 API_KEY = "Q64AAxJfpKRQzuXuSyTM7YyeAXkaGeZZ7HJYYCpwHV-3"
 PROJECT_ID = "6e2f5a1b-5e91-45e7-95c1-4d81614418e4"
-ML_API_BASE = "https://us-south.ml.cloud.ibm.com"
+ML_API_BASE = os.getenv("FINNY_ML_API_BASE", "https://us-south.ml.cloud.ibm.com")
+IAM_TOKEN_URL = os.getenv("FINNY_IAM_TOKEN_URL", "https://iam.cloud.ibm.com/identity/token")
 MODEL_ID = "ibm/granite-3-3-8b-instruct"
 VERSION = "2023-05-29"
+
+# Refresh the bearer token this many seconds before IAM says it expires
+TOKEN_REFRESH_MARGIN = 300
+HTTP_POOL_SIZE = 16
 # -----------------------------------------
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
 
-def get_access_token(api_key: str) -> str:
-    token_url = "https://iam.cloud.ibm.com/identity/token"
+
+def get_session() -> requests.Session:
+    """Shared, connection-pooled session for IAM and generation endpoints."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _request_token(api_key: str, token_url: str = IAM_TOKEN_URL,
+                   session: Optional[requests.Session] = None) -> dict:
     headers = {
         'Content-Type': 'application/x-www-form-urlencoded',
         'Accept': 'application/json'
@@ -30,20 +57,129 @@ def get_access_token(api_key: str) -> str:
         'apikey': api_key
     }
 
-    response = requests.post(token_url, headers=headers, data=data)
+    response = (session or get_session()).post(token_url, headers=headers, data=data, timeout=30)
     response.raise_for_status()
-    return response.json()["access_token"]
+    return response.json()
+
 
+def get_access_token(api_key: str) -> str:
+    return _request_token(api_key)["access_token"]
+
+
+class IAMTokenManager:
+    """
+    Caches the IAM bearer token until shortly before it expires and refreshes
+    it from a background timer so request threads rarely wait on IAM.
+    """
+
+    def __init__(self, api_key: str, token_url: str = IAM_TOKEN_URL,
+                 refresh_margin: float = TOKEN_REFRESH_MARGIN,
+                 session: Optional[requests.Session] = None,
+                 background_refresh: bool = True):
+        self.api_key = api_key
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.session = session or get_session()
+        self.background_refresh = background_refresh
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self.token_requests = 0
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    def get_token(self) -> str:
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if not self._is_fresh():
+                self._refresh_locked()
+            return self._token
+
+    def invalidate(self) -> None:
+        """Drop the cached token, e.g. after the API rejected it with 401."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _refresh_locked(self) -> None:
+        data = _request_token(self.api_key, self.token_url, self.session)
+        self.token_requests += 1
+        now = time.time()
+
+        self._token = data["access_token"]
+        if data.get("expires_in"):
+            self._expires_at = now + float(data["expires_in"])
+        elif data.get("expiration"):
+            self._expires_at = float(data["expiration"])
+        else:
+            # IAM tokens live for an hour; assume that if the response is silent
+            self._expires_at = now + 3600
+
+        if self.background_refresh:
+            self._schedule_refresh(max(self._expires_at - self.refresh_margin - now, 1.0))
+
+    def _schedule_refresh(self, delay: float) -> None:
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._refresh_locked()
+        except Exception as e:
+            print(f"⚠️ Background IAM token refresh failed: {e}")
+            # Retry soon; callers still fall back to a blocking refresh when stale
+            self._schedule_refresh(30.0)
+
+
+_token_manager: Optional[IAMTokenManager] = None
+_token_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> IAMTokenManager:
+    """Get the process-wide IAMTokenManager for API_KEY."""
+    global _token_manager
+    if _token_manager is None:
+        with _token_manager_lock:
+            if _token_manager is None:
+                _token_manager = IAMTokenManager(API_KEY)
+    return _token_manager
+
+
+def summarize_with_granite(prompt: str, temperature: float = 0.7, max_new_tokens: int = 700,
+                           use_cache: Optional[bool] = None) -> str:
+    parameters = {
+        "decoding_method": "greedy",
+        "max_new_tokens": max_new_tokens,
+        "temperature": temperature,
+        "repetition_penalty": 1.05
+    }
+    return get_llm_cache().get_or_generate(
+        MODEL_ID, prompt, parameters,
+        lambda: _generate_with_granite(prompt, parameters),
+        use_cache=use_cache
+    )
 
-def summarize_with_granite(prompt: str, temperature: float = 0.7, max_new_tokens: int = 700) -> str:
-    token = get_access_token(API_KEY)
+
+def _generate_with_granite(prompt: str, parameters: dict) -> str:
+    token_manager = get_token_manager()
+    session = get_session()
 
     endpoint = f"{ML_API_BASE}/ml/v1/text/generation"
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
 
     params = { "version": VERSION }
 
@@ -51,15 +187,21 @@ def summarize_with_granite(prompt: str, temperature: float = 0.7, max_new_tokens
         "input": prompt,
         "model_id": MODEL_ID,
         "project_id": PROJECT_ID,
-        "parameters": {
-            "decoding_method": "greedy",
-            "max_new_tokens": max_new_tokens,
-            "temperature": temperature,
-            "repetition_penalty": 1.05
-        }
+        "parameters": parameters
     }
 
-    response = requests.post(endpoint, headers=headers, params=params, json=payload)
+    for attempt in range(2):
+        headers = {
+            'Authorization': f'Bearer {token_manager.get_token()}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+        response = session.post(endpoint, headers=headers, params=params, json=payload)
+        if response.status_code == 401 and attempt == 0:
+            # Token revoked or expired early — fetch a new one and retry once
+            token_manager.invalidate()
+            continue
+        break
     response.raise_for_status()
 
     data = response.json()
@@ -73,4 +215,3 @@ def summarize_with_granite(prompt: str, temperature: float = 0.7, max_new_tokens
 if __name__ == "__main__":
     test_prompt = "Summarize what Schedule C tax form is used for."
     print(summarize_with_granite(test_prompt))
-
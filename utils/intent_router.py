@@ -5,14 +5,13 @@ from utils.business_profile import load_profile
 import subprocess
 import os
 import sys
+import threading
 import time
 from pathlib import Path
 from utils.business_profile import load_profile 
+from utils.intent_classifier import IntentClassifier, IntentMemo, KeywordMatcher
 from ledger.ledger_utils import load_ledger_summary
 
-# Import the generic help functionality
-from generic_help import WhatsAppBotIntegration
-
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 @dataclass
@@ -26,13 +25,15 @@ class IntentRouter:
     def __init__(self, bot_instance):
         self.bot = bot_instance
         self.route_patterns = self._initialize_patterns()
-        # Initialize the generic help integration
-        self.generic_help_bot = WhatsAppBotIntegration()
+        self.keyword_matcher = KeywordMatcher(self.route_patterns)
+        # The generic help integration builds a watsonx ModelInference, so it waits for the first general question
+        self._generic_help_bot = None
+        self._generic_help_lock = threading.Lock()
 
     def _initialize_patterns(self) -> Dict[str, Dict]:
         return {
             "loan_help": {
-                "keywords": ["loan", "borrow", "credit", "sba", "interest", "rate"],
+                "keywords": ["loan", "borrow", "lend", "credit", "sba", "interest", "rate"],
                 "function": self.bot.loan_advice,
                 "params_extractor": self._extract_loan_params,
                 "weight": 10
@@ -90,19 +91,21 @@ class IntentRouter:
             }
         }
 
+    @property
+    def generic_help_bot(self):
+        if self._generic_help_bot is None:
+            with self._generic_help_lock:
+                if self._generic_help_bot is None:
+                    from generic_help import WhatsAppBotIntegration
+                    self._generic_help_bot = WhatsAppBotIntegration()
+        return self._generic_help_bot
+
     def route_intent(self, user_input: str) -> RouteResult:
         user_input_clean = user_input.strip().lower()
-        intent_scores = {}
-
-        for intent_name, cfg in self.route_patterns.items():
-            score = 0
-            for kw in cfg["keywords"]:
-                if kw in user_input_clean:
-                    score += cfg["weight"]
-                    if len(kw.split()) > 1:
-                        score += 2
-            if score:
-                intent_scores[intent_name] = {"score": score, "config": cfg}
+        intent_scores = {
+            intent_name: {"score": score, "config": self.route_patterns[intent_name]}
+            for intent_name, score in self.keyword_matcher.scores(user_input_clean).items()
+        }
 
         if not intent_scores:
             # If no specific intent matches, default to general help
@@ -116,7 +119,7 @@ class IntentRouter:
         best_intent = max(intent_scores, key=lambda k: intent_scores[k]["score"])
         cfg = intent_scores[best_intent]["config"]
         score = intent_scores[best_intent]["score"]
-        max_score = len(cfg["keywords"]) * cfg["weight"]
+        max_score = self.keyword_matcher.max_scores[best_intent]
         confidence = min(score / max_score, 1.0)
         params = cfg["params_extractor"](user_input_clean)
 
@@ -131,6 +134,15 @@ class IntentRouter:
         result = self.route_intent(user_input)
         return result.function, result.params
 
+    def _result_for(self, intent: str, user_input: str, confidence: float) -> RouteResult:
+        cfg = self.route_patterns[intent]
+        return RouteResult(
+            function=cfg["function"],
+            params=cfg["params_extractor"](user_input),
+            confidence=confidence,
+            intent_type=intent
+        )
+
     # Custom extractors
 
     def _extract_loan_params(self, user_input: str) -> Dict[str, Any]:
@@ -283,8 +295,18 @@ class GraniteEnhancedRouter(IntentRouter):
         self.use_llm = bool(granite_endpoint and api_key)
         self.endpoint = granite_endpoint
         self.api_key = api_key
+        # Second tier between the keyword rules and Granite; learns from Granite's answers
+        self.classifier = IntentClassifier().fit(self.route_patterns)
+        # Granite's answers for recent messages, so a repeated phrasing doesn't call it again
+        self.memo = IntentMemo()
 
     def route_intent(self, user_input: str) -> RouteResult:
+        # Step 0: A message Granite classified recently keeps its intent (params are re-extracted, they depend on current data)
+        memoized = self.memo.get(user_input)
+        if memoized:
+            intent, confidence, _ = memoized
+            return self._result_for(intent, user_input, confidence)
+
         # Step 1: Try rule-based routing first
         rule_result = super().route_intent(user_input)
 
@@ -292,16 +314,26 @@ class GraniteEnhancedRouter(IntentRouter):
         if rule_result.confidence >= 0.7 or not self.use_llm:
             return rule_result
 
-        # Step 3: Try Granite-enhanced fallback
+        # Step 3: Local classifier, trained on the keywords, examples and past Granite answers.
+        # Not memoized: its guesses stay re-checkable as it learns, and it's cheap to ask again
+        predicted = self.classifier.predict(user_input)
+        if predicted:
+            intent, score = predicted
+            return self._result_for(intent, user_input, score)
+
+        # Step 4: Try Granite-enhanced fallback
         return self._fallback_to_granite(user_input, rule_result)
 
+    def _remember(self, user_input: str, intent: str, confidence: float) -> None:
+        """Keep a Granite classification: memoized for repeats and added to the classifier's training data."""
+        self.memo.put(user_input, intent, confidence, "granite")
+        self.classifier.add_example(user_input, intent)
+
     def _fallback_to_granite(self, user_input: str, fallback: RouteResult) -> RouteResult:
         print(user_input)
         try:
-            from granite.client import GraniteAPI
-            
-            # Initialize the API
-            granite = GraniteAPI()
+            # The bot's lazily built client, shared with every other Granite module
+            granite = self.bot.granite_client
 
             # Updated prompt with multiple examples to prevent bias
             prompt = f"""
@@ -327,7 +359,7 @@ class GraniteEnhancedRouter(IntentRouter):
            
             generated = granite.generate_text(
                 prompt=prompt,
-                max_tokens=500,
+                max_tokens=100,  # The answer is one short JSON object
                 temperature=0.5  # Slightly increase randomness
             )
             
@@ -350,14 +382,8 @@ class GraniteEnhancedRouter(IntentRouter):
                     print(f"Found intent: '{intent}'")
                     
                     if intent and intent in self.route_patterns:
-                        cfg = self.route_patterns[intent]
-                        params = cfg["params_extractor"](user_input)
-                        return RouteResult(
-                            function=cfg["function"],
-                            params=params,
-                            confidence=0.9,
-                            intent_type=intent
-                        )
+                        self._remember(user_input, intent, 0.9)
+                        return self._result_for(intent, user_input, 0.9)
                     else:
                         print(f"Intent '{intent}' not recognized or not in route patterns")
                 except json.JSONDecodeError as e:
@@ -369,14 +395,8 @@ class GraniteEnhancedRouter(IntentRouter):
                 for intent in self.route_patterns:
                     if intent in generated:
                         print(f"Found intent '{intent}' directly in response")
-                        cfg = self.route_patterns[intent]
-                        params = cfg["params_extractor"](user_input)
-                        return RouteResult(
-                            function=cfg["function"],
-                            params=params,
-                            confidence=0.7,
-                            intent_type=intent
-                        )
+                        self._remember(user_input, intent, 0.7)
+                        return self._result_for(intent, user_input, 0.7)
 
         except Exception as e:
             print(f"⚠ Granite fallback failed: {e}")
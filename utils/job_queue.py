@@ -0,0 +1,129 @@
+# utils/job_queue.py — Background job queue with per-user ordering
+
+import os
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+WEBHOOK_WORKERS = int(os.getenv("FINNY_WEBHOOK_WORKERS", "4"))
+WEBHOOK_MAX_PENDING = int(os.getenv("FINNY_WEBHOOK_MAX_PENDING", "1000"))
+
+
+class KeyedJobQueue:
+    """
+    Runs jobs on a pool of worker threads. Jobs submitted under the same key
+    (a WhatsApp user id) run one at a time in submission order; different
+    keys run in parallel.
+
+    ``queue_factory`` builds the queue of runnable keys that workers pull
+    from. It defaults to ``queue.Queue``, and any object with put/get
+    semantics can be swapped in.
+    """
+
+    def __init__(self, num_workers: int = WEBHOOK_WORKERS, max_pending: int = WEBHOOK_MAX_PENDING,
+                 queue_factory: Callable[[], Any] = queue.Queue, name: str = "job"):
+        self.num_workers = max(1, num_workers)
+        self.max_pending = max_pending
+        self.name = name
+
+        self._ready = queue_factory()
+        self._pending: Dict[Hashable, Deque[tuple]] = {}
+        self._active: set = set()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._workers = []
+        self._stopped = False
+
+        self.completed = 0
+        self.failed = 0
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"{name}-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @property
+    def pending(self) -> int:
+        return self._size
+
+    def submit(self, key: Hashable, fn: Callable, *args, **kwargs) -> None:
+        """Queue ``fn(*args, **kwargs)`` behind any earlier jobs for ``key``."""
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError(f"{self.name} queue is shut down")
+            if self._size >= self.max_pending:
+                raise queue.Full(f"{self.name} queue has {self._size} pending jobs")
+            self._pending.setdefault(key, deque()).append((fn, args, kwargs, time.time()))
+            self._size += 1
+            if key in self._active:
+                return  # The worker already draining this key will reach it
+            self._active.add(key)
+        self._ready.put(key)
+
+    def _worker_loop(self) -> None:
+        while True:
+            key = self._ready.get()
+            if key is None:
+                return
+
+            with self._lock:
+                fn, args, kwargs, _ = self._pending[key].popleft()
+
+            ok = True
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                ok = False
+                print(f"❌ {self.name} job for {key} failed: {e}")
+                traceback.print_exc()
+
+            with self._lock:
+                self._size -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if self._pending[key]:
+                    requeue = True
+                else:
+                    del self._pending[key]
+                    self._active.discard(key)
+                    requeue = False
+            if requeue:
+                # Back of the line so one chatty user can't starve the others
+                self._ready.put(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.num_workers,
+            "pending": self._size,
+            "active_users": len(self._active),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            self._stopped = True
+        for _ in self._workers:
+            self._ready.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join(timeout)
+
+
+_webhook_queue: Optional[KeyedJobQueue] = None
+_webhook_queue_lock = threading.Lock()
+
+
+def get_webhook_queue() -> KeyedJobQueue:
+    """Get the process-wide queue the Twilio webhook hands messages to."""
+    global _webhook_queue
+    if _webhook_queue is None:
+        with _webhook_queue_lock:
+            if _webhook_queue is None:
+                _webhook_queue = KeyedJobQueue(name="webhook")
+    return _webhook_queue
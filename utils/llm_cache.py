@@ -0,0 +1,203 @@
+# utils/llm_cache.py — Shared response cache for Granite / watsonx calls
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("FINNY_LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.getenv("FINNY_LLM_CACHE_TTL", "3600"))
+# Set to a file path (e.g. data/llm_cache.sqlite3) to persist entries across restarts
+LLM_CACHE_DB = os.getenv("FINNY_LLM_CACHE_DB")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so re-indented prompts share a cache entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def is_deterministic(params: Optional[Dict[str, Any]]) -> bool:
+    """
+    Greedy decoding (watsonx's default when no method is given) or a zero
+    temperature always yields the same text for the same prompt.
+    """
+    params = params or {}
+    method = params.get("decoding_method")
+    method = str(getattr(method, "value", method) or "").lower()
+    temperature = params.get("temperature")
+
+    if method == "greedy":
+        return True
+    if method and method != "greedy":
+        return temperature == 0
+    return temperature in (None, 0)
+
+
+class LLMResponseCache:
+    """
+    In-memory LRU of generated text with per-entry TTL, optionally backed by
+    an on-disk SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 default_ttl: float = LLM_CACHE_TTL,
+                 db_path: Optional[str] = LLM_CACHE_DB):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.db_path = db_path
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._open_db(db_path)
+
+    # ─── Keys ────────────────────────────────────
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        raw = json.dumps(
+            {"model": model_id, "prompt": normalize_prompt(prompt), "params": params or {}},
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ─── Disk tier ───────────────────────────────
+
+    def _open_db(self, db_path: str) -> None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at)")
+        self._db.commit()
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        row = self._db.execute(
+            "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+        self._db.commit()
+
+    # ─── Public API ──────────────────────────────
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._disk_get(key, now)
+                if row is not None:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._disk_set(key, value, expires_at)
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_generate(self, model_id: str, prompt: str, params: Optional[Dict[str, Any]],
+                        generate_fn: Callable[[], str], use_cache: Optional[bool] = None,
+                        ttl: Optional[float] = None) -> str:
+        """
+        Return the cached response for this call, or run ``generate_fn`` and
+        cache its result. ``use_cache=None`` caches only deterministic calls.
+        """
+        if use_cache is None:
+            use_cache = is_deterministic(params)
+        if not use_cache:
+            return generate_fn()
+
+        key = self.make_key(model_id, prompt, params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = generate_fn()
+        # Empty strings are how the clients report failures — never cache them
+        if isinstance(value, str) and value.strip():
+            self.set(key, value, ttl)
+        return value
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._entries.items() if exp <= now]
+            for k in expired:
+                del self._entries[k]
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                self._db.commit()
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Get the process-wide LLMResponseCache instance."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
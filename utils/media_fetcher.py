@@ -0,0 +1,182 @@
+# utils/media_fetcher.py — Streaming download of Twilio media attachments
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+MEDIA_MAX_BYTES = int(os.getenv("FINNY_MEDIA_MAX_BYTES", str(25 * 1024 * 1024)))
+MEDIA_RETRIES = int(os.getenv("FINNY_MEDIA_RETRIES", "3"))
+MEDIA_BACKOFF_SECONDS = float(os.getenv("FINNY_MEDIA_BACKOFF_SECONDS", "0.5"))
+MEDIA_TIMEOUT = (5, 30)  # (connect, read) seconds
+MEDIA_POOL_SIZE = int(os.getenv("FINNY_MEDIA_POOL_SIZE", "8"))
+CHUNK_SIZE = 64 * 1024
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Leading bytes -> kind, checked in order
+_SIGNATURES = [
+    (b"%PDF", "pdf"),
+    (b"OggS", "ogg"),
+    (b"#!AMR", "amr"),
+    (b"ID3", "mp3"),
+    (b"\xff\xfb", "mp3"),
+    (b"\xff\xf3", "mp3"),
+    (b"fLaC", "flac"),
+    (b"PK\x03\x04", "zip"),
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+]
+AUDIO_KINDS = {"ogg", "amr", "mp3", "wav", "flac", "m4a", "webm"}
+
+
+class MediaFetchError(requests.RequestException):
+    """A media download that failed for good (after any retries)."""
+
+
+class MediaTooLarge(MediaFetchError):
+    pass
+
+
+class UnexpectedMediaType(MediaFetchError):
+    pass
+
+
+class _Retryable(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def sniff_kind(head: bytes) -> str:
+    """Best guess at a file's type from its first bytes ("pdf", "ogg", "text", ...)."""
+    for signature, kind in _SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "m4a" if head[8:11] in (b"M4A", b"m4a") else "mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    sample = head[:1024]
+    if sample and b"\x00" not in sample:
+        try:
+            sample.decode("utf-8")
+            return "text"
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the sample is still text
+            if e.start >= len(sample) - 3:
+                return "text"
+    return "binary"
+
+
+class MediaFetcher:
+    """
+    Downloads attachments straight to disk over one pooled HTTP session.
+    The size limit is enforced while streaming, transient failures are
+    retried with exponential backoff, and the payload type is sniffed from
+    its first bytes rather than trusted from headers.
+    """
+
+    def __init__(self, max_bytes: int = MEDIA_MAX_BYTES, retries: int = MEDIA_RETRIES,
+                 backoff: float = MEDIA_BACKOFF_SECONDS, timeout=MEDIA_TIMEOUT, pool_size: int = MEDIA_POOL_SIZE):
+        self.max_bytes = max_bytes
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = "FinnyBot/1.0"
+
+    def fetch_to_file(self, url: str, dest, auth: Optional[tuple] = None, max_bytes: Optional[int] = None,
+                      expect: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Stream ``url`` into ``dest``. Returns {"path", "size", "content_type",
+        "kind", "sha256"}. ``expect`` lists acceptable sniffed kinds.
+        Raises MediaFetchError (a requests.RequestException) on failure.
+        """
+        dest = Path(dest)
+        limit = max_bytes or self.max_bytes
+        expect = set(expect) if expect else None
+
+        for attempt in range(self.retries + 1):
+            try:
+                return self._stream(url, dest, auth, limit, expect)
+            except _Retryable as e:
+                if attempt == self.retries:
+                    raise MediaFetchError(f"{e} (gave up after {attempt + 1} attempts)") from None
+                delay = e.retry_after if e.retry_after is not None else self.backoff * (2 ** attempt)
+                print(f"⚠️ Media download failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _stream(self, url: str, dest: Path, auth, limit: int, expect) -> Dict:
+        tmp_path = dest.with_name(dest.name + ".part")
+        try:
+            with self.session.get(url, auth=auth, stream=True, timeout=self.timeout, allow_redirects=True) as resp:
+                if resp.status_code in RETRY_STATUSES:
+                    retry_after = resp.headers.get("Retry-After")
+                    raise _Retryable(f"HTTP {resp.status_code}",
+                                     float(retry_after) if retry_after and retry_after.isdigit() else None)
+                if resp.status_code != 200:
+                    raise MediaFetchError(f"Failed to download media. Status code: {resp.status_code}")
+
+                declared = resp.headers.get("Content-Length")
+                if declared and declared.isdigit() and int(declared) > limit:
+                    raise MediaTooLarge(f"Media is {int(declared)} bytes, limit is {limit}")
+
+                digest = hashlib.sha256()
+                size, head = 0, b""
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        if not chunk:
+                            continue
+                        size += len(chunk)
+                        if size > limit:
+                            raise MediaTooLarge(f"Media exceeds the {limit}-byte limit")
+                        if len(head) < 1024:
+                            head += chunk[:1024 - len(head)]
+                            if expect and len(head) >= 16 and sniff_kind(head) not in expect:
+                                raise UnexpectedMediaType(f"Expected {'/'.join(sorted(expect))}, got {sniff_kind(head)}")
+                        digest.update(chunk)
+                        f.write(chunk)
+
+                kind = sniff_kind(head)
+                if expect and kind not in expect:
+                    raise UnexpectedMediaType(f"Expected {'/'.join(sorted(expect))}, got {kind}")
+                os.replace(tmp_path, dest)
+                return {
+                    "path": dest,
+                    "size": size,
+                    "content_type": resp.headers.get("Content-Type"),
+                    "kind": kind,
+                    "sha256": digest.hexdigest(),
+                }
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            raise _Retryable(type(e).__name__) from e
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+
+_fetcher: Optional[MediaFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_media_fetcher() -> MediaFetcher:
+    """Get the process-wide MediaFetcher (one connection pool for all downloads)."""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = MediaFetcher()
+    return _fetcher
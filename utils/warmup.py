@@ -0,0 +1,122 @@
+# utils/warmup.py — Optional parallel preloading of heavy components at process start
+
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Comma-separated component names, "all", or empty/"none" to rely on lazy loading
+WARMUP_COMPONENTS = os.getenv("FINNY_WARMUP", "")
+
+
+class WarmupManager:
+    """
+    Preloads registered components in parallel threads and records which are
+    warm and how long each took, for the /readyz endpoint.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], object]] = {}
+        self._probes: Dict[str, Callable[[], bool]] = {}
+        self._status: Dict[str, Dict] = {}
+        self._selected: List[str] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def register(self, name: str, loader: Callable[[], object],
+                 probe: Optional[Callable[[], bool]] = None) -> None:
+        """
+        ``loader`` builds the component; ``probe`` optionally reports whether
+        it is already loaded (e.g. lazily, by an earlier request).
+        """
+        self._loaders[name] = loader
+        if probe is not None:
+            self._probes[name] = probe
+
+    @property
+    def components(self) -> List[str]:
+        return list(self._loaders)
+
+    def resolve(self, spec: Optional[str]) -> List[str]:
+        """Turn an env-style spec ("all", "asr,forecaster", "") into component names."""
+        spec = (spec or "").strip().lower()
+        if not spec or spec == "none":
+            return []
+        if spec == "all":
+            return self.components
+        names = [n.strip() for n in spec.split(",") if n.strip()]
+        unknown = [n for n in names if n not in self._loaders]
+        if unknown:
+            print(f"⚠️ Unknown warm-up components ignored: {', '.join(unknown)}")
+        return [n for n in names if n in self._loaders]
+
+    def start(self, names: Iterable[str]) -> None:
+        """Warm the given components, one daemon thread each; returns immediately."""
+        with self._lock:
+            for name in names:
+                if name in self._status:
+                    continue
+                self._selected.append(name)
+                self._status[name] = {"state": "pending", "seconds": None, "error": None}
+                thread = threading.Thread(target=self._warm, args=(name,), name=f"warmup-{name}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        if self._selected:
+            print(f"🔥 Warming up: {', '.join(self._selected)}")
+
+    def _warm(self, name: str) -> None:
+        with self._lock:
+            self._status[name]["state"] = "warming"
+        start = time.perf_counter()
+        try:
+            self._loaders[name]()
+            state, error = "ready", None
+        except Exception as e:
+            state, error = "failed", str(e)
+            print(f"❌ Warm-up of {name} failed: {e}")
+        elapsed = round(time.perf_counter() - start, 3)
+        with self._lock:
+            self._status[name].update(state=state, seconds=elapsed, error=error)
+        if state == "ready":
+            print(f"✅ {name} warm in {elapsed}s")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in list(self._threads):
+            thread.join(None if deadline is None else max(0.0, deadline - time.time()))
+        return self.is_ready()
+
+    def is_ready(self) -> bool:
+        """True once every selected component has loaded (failures keep the worker unready)."""
+        with self._lock:
+            return all(s["state"] == "ready" for s in self._status.values())
+
+    def status(self) -> Dict:
+        with self._lock:
+            components = {name: dict(s) for name, s in self._status.items()}
+        # Components outside the warm-up set: report whether lazy loading got to them
+        for name in self._loaders:
+            if name not in components:
+                probe = self._probes.get(name)
+                warm = bool(probe and probe())
+                components[name] = {"state": "ready" if warm else "cold", "seconds": None, "error": None}
+        return {
+            "ready": all(components[n]["state"] == "ready" for n in self._selected),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "components": components,
+        }
+
+
+_manager: Optional[WarmupManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_warmup_manager() -> WarmupManager:
+    """Get the process-wide WarmupManager instance."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = WarmupManager()
+    return _manager